@@ -0,0 +1,284 @@
+import asyncio
+import signal
+
+from protocol import HEADER, MAX_FRAME_SIZE, PUSH_ID, ProtocolError, encode_frame
+from logs import request_log, server_log
+from server_auth import (FRAMED_REQUEST_LOG_MESSAGE, REQUEST_LOG_MESSAGE, SNAPSHOT_READ_COMMANDS, DictionaryServer,
+                         encode_response, is_stream, keep_alive)
+from slowlog import RequestTrace
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def raise_fd_limit():
+    """Raise the open-file soft limit to the hard limit (Unix only)"""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or hard > soft:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+
+class AsyncDictionaryServer(DictionaryServer):
+    """Dictionary server running every connection on one asyncio event loop
+
+    Dùng chung bộ lệnh process_request với engine thread. Lệnh đọc snapshot chạy
+    ngay trên event loop; các lệnh khác chạy trong thread pool nên việc ghi file /
+    chờ lock không chặn event loop.
+    """
+
+    def __init__(self, *args, shutdown_timeout=5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shutdown_timeout = shutdown_timeout
+        self._connections = set()
+        self._inflight = set()
+
+    def start(self):
+        """Start the server (blocks until SIGINT/SIGTERM)"""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+            print("Server closed")
+
+    async def serve(self):
+        raise_fd_limit()
+        loop = asyncio.get_running_loop()
+        stopping = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stopping.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C sinh KeyboardInterrupt
+
+        server = await asyncio.start_server(
+            self._on_connect, self.host, self.port,
+            backlog=self.backlog, reuse_address=True, reuse_port=self.reuse_port
+        )
+        self.print_banner('asyncio')
+        try:
+            await stopping.wait()
+        finally:
+            print("\n\nServer shutting down...")
+            await self._graceful_stop(server)
+
+    async def _graceful_stop(self, server):
+        # 1. Ngừng nhận kết nối mới
+        server.close()
+        # 2. Chờ các request đang xử lý trả lời xong
+        if self._inflight:
+            await asyncio.wait(set(self._inflight), timeout=self.shutdown_timeout)
+        # 3. Đóng các kết nối còn lại
+        for task in list(self._connections):
+            task.cancel()
+        if self._connections:
+            await asyncio.wait(set(self._connections), timeout=self.shutdown_timeout)
+        await server.wait_closed()
+
+    def _on_connect(self, reader, writer):
+        self.client_count += 1
+        task = asyncio.ensure_future(self.handle_client_async(reader, writer, self.client_count))
+        self._connections.add(task)
+        task.add_done_callback(self._connections.discard)
+
+    def _track(self, coro):
+        """Run a request as a task that shutdown waits for"""
+        task = asyncio.ensure_future(coro)
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+        return task
+
+    async def _read(self, coro, idle=True):
+        return await asyncio.wait_for(coro, self.idle_timeout if idle else None)
+
+    async def _process(self, data, user_role, username, trace=None):
+        loop = asyncio.get_running_loop()
+        try:
+            # Lệnh đọc snapshot chạy thẳng trên event loop, khỏi tốn một lượt chuyển thread.
+            # TRA không thấy từ phải tìm gợi ý (tốn CPU) nên để executor làm
+            parts = data.split('|', 2)
+            command = parts[0].upper()
+            if command in SNAPSHOT_READ_COMMANDS and not (
+                    command == 'TRA' and len(parts) > 1 and parts[1].lower().strip() not in self.snapshot):
+                return self.process_request(data, user_role, username, trace)
+            return await loop.run_in_executor(self.executor, self.process_request, data, user_role, username, trace)
+        except Exception as e:
+            return f"ERROR|Internal error: {e}"
+
+    async def handle_client_async(self, reader, writer, client_id):
+        """Handle individual client connection"""
+        address = writer.get_extra_info('peername')
+        server_log.info("Client #%s connected from %s", client_id, address)
+        self.metrics.add('connections_total')
+        self.metrics.add('connections_active')
+
+        try:
+            writer.write(self.welcome_message().encode('utf-8'))
+            await writer.drain()
+
+            auth_data = (await self._read(reader.read(1024))).decode('utf-8').strip()
+            if auth_data.upper().startswith('RESUME|'):
+                # Chỉ một phép HMAC: chạy ngay trên event loop
+                auth_response, username, user_role, framed = self.handshake(auth_data)
+            else:
+                # Hash mật khẩu (PBKDF2) tốn cỡ 0.1s: không được chặn event loop
+                auth_response, username, user_role, framed = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.handshake, auth_data)
+            if username:
+                server_log.info("Client #%s: user '%s' logged in as %s", client_id, username, user_role)
+
+            writer.write(auth_response.encode('utf-8'))
+            await writer.drain()
+            if not username:
+                return
+
+            if framed:
+                await self.serve_framed_async(reader, writer, client_id, username, user_role)
+                return
+
+            while True:
+                raw = await self._read(reader.read(4096))
+                trace = RequestTrace()
+                self.metrics.add('bytes_in', len(raw))
+                data = raw.decode('utf-8').strip()
+                trace.lap('decode')
+                if not data:
+                    break
+
+                request_log.info(REQUEST_LOG_MESSAGE, client_id, username, user_role, data)
+                # shield: khi tắt server, request đang chạy vẫn được trả lời
+                response = await asyncio.shield(self._track(self._process(data, user_role, username, trace)))
+                if is_stream(response):
+                    response.close()
+                    response = "ERROR|Streaming requires the FRAMED protocol"
+                payload = encode_response(response)
+                trace.lap('serialize')
+                writer.write(payload)
+                self.metrics.add('bytes_out', len(payload))
+                await writer.drain()
+                trace.lap('send')
+                self.slow_log.finish(trace)
+
+                if data.upper() == 'QUIT':
+                    break
+
+        except asyncio.TimeoutError:
+            server_log.info("Client #%s idle timeout", client_id)
+        except asyncio.CancelledError:
+            pass
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            server_log.warning("Client #%s error: %s", client_id, e)
+        finally:
+            self.metrics.add('connections_active', -1)
+            writer.close()
+            server_log.info("Client #%s disconnected", client_id)
+
+    async def serve_framed_async(self, reader, writer, client_id, username, user_role):
+        """Read framed requests and answer each one as soon as it is done"""
+        inflight = asyncio.Semaphore(self.max_inflight)
+        write_lock = asyncio.Lock()
+        pending = set()
+        loop = asyncio.get_running_loop()
+        subscription = None
+        deliverer = None
+        wake = asyncio.Event()
+
+        def wakeup():
+            # Event được phát từ thread của writer, chuyển về event loop
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass  # Event loop đã đóng
+
+        async def deliver():
+            # Event dồn lại (và được gộp) trong lúc drain() chờ client đọc chậm
+            while True:
+                await wake.wait()
+                wake.clear()
+                for message in subscription.drain():
+                    await reply(PUSH_ID, message)
+
+        async def reply(request_id, response, trace=None):
+            frame = encode_frame(request_id, response)
+            if trace is not None:
+                trace.lap('serialize')
+            async with write_lock:
+                writer.write(frame)
+                await writer.drain()
+            if trace is not None:
+                trace.lap('send')
+            self.metrics.add('bytes_out', len(frame))
+
+        async def run(request_id, data, trace):
+            try:
+                response = await self._process(data, user_role, username, trace)
+                if is_stream(response):
+                    # Lấy từng chunk trong thread pool; drain() tạo backpressure khi client đọc chậm
+                    loop = asyncio.get_running_loop()
+                    while True:
+                        message = await loop.run_in_executor(self.executor, next, response, None)
+                        if message is None:
+                            break
+                        trace.lap('handler')
+                        await reply(request_id, message, trace)
+                else:
+                    await reply(request_id, response, trace)
+                self.slow_log.finish(trace)
+            except ConnectionError:
+                pass
+            finally:
+                inflight.release()
+
+        try:
+            while True:
+                try:
+                    # Kết nối chỉ nghe event thì im lặng là bình thường: không áp idle timeout
+                    header = await self._read(reader.readexactly(HEADER.size), idle=subscription not in self.events)
+                except asyncio.IncompleteReadError:
+                    break
+                trace = RequestTrace()
+                length, request_id = HEADER.unpack(header)
+                if length > MAX_FRAME_SIZE:
+                    raise ProtocolError(f"Frame too large ({length} bytes)")
+                payload = await self._read(reader.readexactly(length))
+                trace.lap('recv')
+                self.metrics.add('bytes_in', HEADER.size + length)
+                data = payload.decode('utf-8').strip()
+                trace.lap('decode')
+                request_log.info(FRAMED_REQUEST_LOG_MESSAGE, client_id, username, user_role, request_id, data)
+
+                if data.upper() == 'QUIT':
+                    await reply(request_id, await self._process(data, user_role, username))
+                    break
+
+                if data.split('|', 1)[0].upper() in ('SUBSCRIBE', 'UNSUBSCRIBE'):
+                    subscription, response = self.update_subscription(subscription, data, user_role, wakeup)
+                    await reply(request_id, response)
+                    if subscription is not None and deliverer is None:
+                        sock = writer.get_extra_info('socket')
+                        if sock is not None:
+                            keep_alive(sock)
+                        deliverer = asyncio.ensure_future(deliver())
+                    continue
+
+                await inflight.acquire()
+                task = self._track(run(request_id, data, trace))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            if subscription is not None:
+                self.events.unsubscribe(subscription)
+                deliverer.cancel()
+            # Trả lời nốt các request đã nhận trước khi đóng kết nối
+            if pending:
+                await asyncio.wait(set(pending), timeout=self.shutdown_timeout)
@@ -0,0 +1,146 @@
+"""Password hashing, the user store and signed session tokens
+
+Quản lý tài khoản: python auth.py set USERNAME ROLE [--users-file users.json]
+(hỏi mật khẩu, tạo mới hoặc đổi mật khẩu / role của tài khoản).
+"""
+import argparse
+import base64
+import getpass
+import hashlib
+import hmac
+import json
+import os
+import time
+
+PBKDF2_ITERATIONS = 200000  # Đủ chậm để dò mật khẩu tốn kém; RESUME không phải chạy lại
+SALT_SIZE = 16
+SESSION_TTL = 24 * 3600  # Giây một token còn hiệu lực
+ROLES = ('admin', 'user')
+# Tài khoản demo tạo khi chưa có users.json (mật khẩu chỉ được lưu dạng hash)
+DEFAULT_USERS = {
+    'admin': ('admin123', 'admin'),
+    'user1': ('user123', 'user'),
+    'user2': ('user123', 'user'),
+}
+
+
+def b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def hash_password(password, salt=None, iterations=PBKDF2_ITERATIONS):
+    """'pbkdf2_sha256$iterations$salt$hash' with a random salt"""
+    salt = os.urandom(SALT_SIZE) if salt is None else salt
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${b64encode(salt)}${b64encode(digest)}"
+
+
+def verify_password(password, stored):
+    try:
+        algorithm, iterations, salt, expected = stored.split('$')
+        if algorithm != 'pbkdf2_sha256':
+            return False
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), b64decode(salt), int(iterations))
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(b64encode(digest), expected)
+
+
+def load_users(path):
+    """{username: {'password_hash', 'role'}}, created with the demo accounts if missing"""
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    users = {name: {'password_hash': hash_password(password), 'role': role}
+             for name, (password, role) in DEFAULT_USERS.items()}
+    save_users(path, users)
+    print(f"✓ Created {path} with the demo accounts")
+    return users
+
+
+def save_users(path, users):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(users, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_secret(path):
+    """Session signing key from `path`, generated on first use
+
+    Key nằm trong file để token còn dùng được sau khi server khởi động lại và giữa
+    các worker của cùng một thư mục.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    secret = os.urandom(32)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Tiến trình khác vừa tạo xong
+        with open(path, 'rb') as f:
+            return f.read()
+    with os.fdopen(fd, 'wb') as f:
+        f.write(secret)
+    return secret
+
+
+class SessionTokens:
+    """HMAC-signed session tokens carrying username, role and expiry
+
+    Kiểm tra token chỉ cần một phép HMAC, không tra kho tài khoản; đổi role hay xoá
+    tài khoản chỉ có hiệu lực với token cấp sau đó (token cũ hết hạn sau `ttl`).
+    """
+
+    def __init__(self, secret, ttl=SESSION_TTL):
+        self.secret = secret
+        self.ttl = ttl
+
+    def _sign(self, payload):
+        return b64encode(hmac.new(self.secret, payload.encode('ascii'), hashlib.sha256).digest())
+
+    def issue(self, username, role):
+        payload = b64encode(json.dumps({"u": username, "r": role, "exp": int(time.time() + self.ttl)},
+                                       separators=(',', ':')).encode('utf-8'))
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, token):
+        """(username, role) for a valid unexpired token, else None"""
+        payload, sep, signature = token.partition('.')
+        try:
+            if not sep or not hmac.compare_digest(self._sign(payload), signature):
+                return None
+            data = json.loads(b64decode(payload))
+        except (ValueError, TypeError):
+            return None  # Ký tự lạ / base64 hỏng
+        if data.get('exp', 0) < time.time():
+            return None
+        return data['u'], data['r']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create an account or change its password / role")
+    parser.add_argument('action', choices=['set'])
+    parser.add_argument('username')
+    parser.add_argument('role', choices=ROLES)
+    parser.add_argument('--users-file', default='users.json')
+    args = parser.parse_args()
+
+    users = load_users(args.users_file)
+    password = getpass.getpass(f"Password for {args.username}: ")
+    if not password or password != getpass.getpass("Repeat: "):
+        raise SystemExit("Passwords are empty or do not match")
+    users[args.username] = {'password_hash': hash_password(password), 'role': args.role}
+    save_users(args.users_file, users)
+    print(f"✓ Saved {args.username} ({args.role}); restart the server to apply")
+
+
+if __name__ == "__main__":
+    main()
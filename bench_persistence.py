@@ -0,0 +1,94 @@
+"""Benchmark: APPROVE throughput under each journal sync policy
+
+Chạy: python bench_persistence.py --approvals 2000 --threads 8 [--batch] [--json]
+
+--batch duyệt tất cả bằng một lệnh APPROVE_BATCH thay vì từng APPROVE.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+from journal import SYNC_POLICIES
+from server_auth import DictionaryServer
+
+
+def run_policy(policy, approvals, threads, interval_ms, batch=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            server = DictionaryServer(
+                dict_file=os.path.join(tmp, 'dictionary.json'),
+                pending_file=os.path.join(tmp, 'pending.json'),
+                journal_file=os.path.join(tmp, 'journal.log'),
+                users_file=os.path.join(tmp, 'users.json'),
+                session_key_file=os.path.join(tmp, 'session.key'),
+                sync_policy=policy, sync_interval_ms=interval_ms
+            )
+            for i in range(approvals):
+                server.process_request(f"THEM|benchword{i}:meaning {i}", 'user', 'user1')
+        request_ids = list(server.pending)
+        commits_before = server.journal.commits
+
+        def worker(ids):
+            for request_id in ids:
+                server.process_request(f"APPROVE|{request_id}", 'admin', 'admin')
+
+        start = time.perf_counter()
+        if batch:
+            server.process_request(f"APPROVE_BATCH|ids={','.join(request_ids)}", 'admin', 'admin')
+        else:
+            workers = [threading.Thread(target=worker, args=(request_ids[i::threads],)) for i in range(threads)]
+            for t in workers:
+                t.start()
+            for t in workers:
+                t.join()
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.shutdown()
+        shutdown_time = time.perf_counter() - start
+
+        commits = server.journal.commits - commits_before
+        return {
+            'policy': policy,
+            'approvals': len(request_ids),
+            'threads': 1 if batch else threads,
+            'batch': batch,
+            'seconds': round(elapsed, 4),
+            'approvals_per_sec': round(len(request_ids) / elapsed, 1),
+            'journal_writes': commits,
+            'records_per_write': round(len(request_ids) / commits, 1) if commits else None,
+            'shutdown_seconds': round(shutdown_time, 4),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--approvals', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--sync-interval-ms', type=int, default=50)
+    parser.add_argument('--policy', choices=SYNC_POLICIES, action='append',
+                        help="Chỉ chạy chính sách này (có thể lặp lại)")
+    parser.add_argument('--batch', action='store_true', help="Dùng một lệnh APPROVE_BATCH")
+    parser.add_argument('--json', action='store_true', help="In kết quả dạng JSON")
+    args = parser.parse_args()
+
+    results = [run_policy(p, args.approvals, args.threads, args.sync_interval_ms, args.batch)
+               for p in (args.policy or SYNC_POLICIES)]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'policy':<10}{'approvals/s':>14}{'writes':>10}{'rec/write':>11}{'shutdown s':>12}")
+    for r in results:
+        print(f"{r['policy']:<10}{r['approvals_per_sec']:>14}{r['journal_writes']:>10}"
+              f"{str(r['records_per_write']):>11}{r['shutdown_seconds']:>12}")
+
+
+if __name__ == "__main__":
+    main()
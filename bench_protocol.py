@@ -0,0 +1,262 @@
+"""Benchmark: throughput and latency of the real protocol under concurrent clients
+
+Chạy: python bench_protocol.py --clients 16 --seconds 10 --words 10000
+      [--mix TRA=90,LIST=1,THEM=4,SUA=3,APPROVE=2] [--engine asyncio] [--workers 2] [--json]
+
+Khởi động server_auth.py trên một cổng trống trong thư mục tạm (từ điển sinh sẵn
+--words từ), rồi cho --clients client đồng thời LOGIN và gửi lệnh theo tỉ lệ --mix.
+Mỗi client chờ trả lời rồi mới gửi lệnh tiếp (closed loop); các client được chia cho
+--processes tiến trình để bản thân bộ sinh tải không bị GIL giới hạn. Kết quả: số
+lệnh/giây và độ trễ p50/p99 theo từng lệnh, --json để so sánh giữa các lần chạy.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from protocol import FramedClient
+
+COMMANDS = ('TRA', 'LIST', 'THEM', 'SUA', 'APPROVE')
+DEFAULT_MIX = 'TRA=90,LIST=1,THEM=4,SUA=3,APPROVE=2'
+USERS = (('user1', 'user123'), ('user2', 'user123'))
+ADMIN = ('admin', 'admin123')
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server_auth.py')
+
+
+def parse_mix(value):
+    """'TRA=90,LIST=1' -> {'TRA': 90.0, 'LIST': 1.0}"""
+    mix = {}
+    for item in value.split(','):
+        command, sep, weight = item.partition('=')
+        command = command.strip().upper()
+        if not sep or command not in COMMANDS:
+            raise argparse.ArgumentTypeError(f"Expected COMMAND=weight with COMMAND in {', '.join(COMMANDS)}, got '{item}'")
+        try:
+            mix[command] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid weight '{weight}'")
+    if sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("Mix needs at least one positive weight")
+    return mix
+
+
+def free_port(host):
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+def start_server(tmp, host, words, server_args):
+    """Write a dictionary of `words` entries into `tmp` and start server_auth.py there"""
+    with open(os.path.join(tmp, 'dictionary.json'), 'w', encoding='utf-8') as f:
+        json.dump({f"word{i}": f"nghĩa thứ {i} của từ word{i}" for i in range(words)}, f, ensure_ascii=False)
+    port = free_port(host)
+    # Tắt log từng request: đo server, không đo stdout
+    # Tắt hạn mức ghi mặc định: đo khả năng của server, không đo rate limit (bật lại qua --server-args)
+    command = [sys.executable, SERVER_SCRIPT, '--host', host, '--port', str(port),
+               '--request-log-sample', '0', '--user-write-rate', '0', '--global-write-rate', '0'] + server_args
+    process = subprocess.Popen(command, cwd=tmp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return process, port
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode}: {shlex.join(command)}")
+            if time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("Server did not start within 60s")
+            time.sleep(0.1)
+
+
+class SimulatedClient:
+    """One user connection (plus an admin one when the mix approves) issuing random commands"""
+
+    def __init__(self, client_id, host, port, mix, words, seed):
+        self.client_id = client_id
+        self.rng = random.Random(seed + client_id)
+        self.words = words
+        self.commands = list(mix)
+        self.weights = [mix[c] for c in self.commands]
+        self.user = FramedClient(host, port)
+        self.user.login(*USERS[client_id % len(USERS)])
+        self.admin = None
+        if 'APPROVE' in mix:
+            self.admin = FramedClient(host, port)
+            self.admin.login(*ADMIN)
+        self.submitted = []  # ID các yêu cầu THEM/SUA của client này, chờ APPROVE
+        self.counter = 0
+
+    def close(self):
+        self.user.close()
+        if self.admin is not None:
+            self.admin.close()
+
+    def request(self, client, command, data, stats):
+        start = time.perf_counter()
+        response = client.request(data)
+        elapsed = time.perf_counter() - start
+        entry = stats.setdefault(command, {'latencies': [], 'errors': 0, 'busy': 0})
+        entry['latencies'].append(elapsed)
+        if response.startswith('ERROR'):
+            entry['errors'] += 1
+        elif response.startswith('BUSY'):
+            entry['busy'] += 1
+        return response
+
+    def submit(self, command, stats):
+        """THEM a new word / SUA an existing one, remember the pending ID"""
+        self.counter += 1
+        if command == 'THEM':
+            data = f"THEM|bench{self.client_id}x{self.counter}:nghĩa thử {self.counter}"
+        else:
+            word = f"word{self.rng.randrange(self.words)}" if self.words else f"bench{self.client_id}"
+            data = f"SUA|{word}:nghĩa sửa {self.client_id}-{self.counter}"
+        response = self.request(self.user, command, data, stats)
+        _, sep, request_id = response.rpartition('\nID: ')
+        if sep:
+            self.submitted.append(request_id.strip())
+
+    def step(self, stats):
+        command = self.rng.choices(self.commands, self.weights)[0]
+        if command == 'TRA':
+            word = f"word{self.rng.randrange(self.words)}" if self.words else 'word0'
+            self.request(self.user, command, f"TRA|{word}", stats)
+        elif command == 'LIST':
+            self.request(self.user, command, "LIST", stats)
+        elif command in ('THEM', 'SUA'):
+            self.submit(command, stats)
+        else:
+            if not self.submitted:
+                # Chưa có gì để duyệt: gửi một THEM trước (được tính là THEM)
+                self.submit('THEM', stats)
+            if self.submitted:
+                self.request(self.admin, command, f"APPROVE|{self.submitted.pop(0)}", stats)
+
+
+def run_clients(host, port, client_ids, mix, words, seconds, seed):
+    """Runs in a load-generator process: drive `client_ids` for `seconds`, return raw latencies"""
+    clients = [SimulatedClient(i, host, port, mix, words, seed) for i in client_ids]
+    results = [{} for _ in clients]
+    deadline = time.perf_counter() + seconds
+
+    def loop(client, stats):
+        try:
+            while time.perf_counter() < deadline:
+                client.step(stats)
+        except Exception as e:
+            stats.setdefault('_failed', []).append(repr(e))
+
+    threads = [threading.Thread(target=loop, args=(c, r)) for c, r in zip(clients, results)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for c in clients:
+        c.close()
+    return results
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+def summarize(results, seconds):
+    """Merge per-client stats into per-command throughput and latency"""
+    merged = {}
+    failures = []
+    for stats in results:
+        failures += stats.pop('_failed', [])
+        for command, entry in stats.items():
+            target = merged.setdefault(command, {'latencies': [], 'errors': 0, 'busy': 0})
+            target['latencies'] += entry['latencies']
+            target['errors'] += entry['errors']
+            target['busy'] += entry['busy']
+
+    def describe(latencies, errors, busy):
+        latencies.sort()
+        return {
+            'count': len(latencies),
+            'ops_per_sec': round(len(latencies) / seconds, 1),
+            'errors': errors,
+            'busy': busy,
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+            'max_ms': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        }
+
+    commands = {c: describe(e['latencies'], e['errors'], e['busy']) for c, e in sorted(merged.items())}
+    everything = [x for e in merged.values() for x in e['latencies']]
+    total = describe(everything, sum(e['errors'] for e in merged.values()), sum(e['busy'] for e in merged.values()))
+    return commands, total, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--words', type=int, default=10000, help="Số từ trong từ điển sinh sẵn")
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help=f"Tỉ lệ lệnh, vd. TRA=90,LIST=1 (mặc định {DEFAULT_MIX})")
+    parser.add_argument('--processes', type=int, default=min(4, os.cpu_count() or 1),
+                        help="Số tiến trình sinh tải")
+    parser.add_argument('--engine', choices=['threads', 'asyncio'], default='threads')
+    parser.add_argument('--workers', type=int, default=0, help="--workers của server")
+    parser.add_argument('--server-args', default='', help="Tham số thêm cho server, vd. \"--sync interval\"")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help="In kết quả dạng JSON")
+    args = parser.parse_args()
+
+    server_args = ['--engine', args.engine, '--workers', str(args.workers)] + shlex.split(args.server_args)
+    processes = max(1, min(args.processes, args.clients))
+    groups = [list(range(args.clients))[i::processes] for i in range(processes)]
+    with tempfile.TemporaryDirectory() as tmp:
+        server, port = start_server(tmp, args.host, args.words, server_args)
+        try:
+            with multiprocessing.get_context('spawn').Pool(processes) as pool:
+                jobs = [pool.apply_async(run_clients, (args.host, port, group, args.mix, args.words, args.seconds, args.seed))
+                        for group in groups]
+                results = [stats for job in jobs for stats in job.get()]
+        finally:
+            server.terminate()
+            server.wait()
+
+    commands, total, failures = summarize(results, args.seconds)
+    report = {
+        'engine': args.engine,
+        'workers': args.workers,
+        'clients': args.clients,
+        'words': args.words,
+        'seconds': args.seconds,
+        'mix': args.mix,
+        'total': total,
+        'commands': commands,
+        'client_failures': failures,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{args.clients} clients, {args.words} words, engine {args.engine}, workers {args.workers}, {args.seconds}s")
+    print(f"{'command':<10}{'ops/s':>10}{'errors':>8}{'busy':>8}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, r in list(commands.items()) + [('total', total)]:
+        print(f"{name:<10}{r['ops_per_sec']:>10}{r['errors']:>8}{r['busy']:>8}{r['mean_ms']:>10}{r['p50_ms']:>10}"
+              f"{r['p99_ms']:>10}{r['max_ms']:>10}")
+    for failure in failures:
+        print(f"✗ Client failed: {failure}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark: TRA latency while APPROVE runs continuously
+
+Chạy: python bench_snapshot.py --words 200000 --readers 4 --seconds 3 [--locked-reads] [--json]
+
+--locked-reads bắt reader lấy chung lock với writer (cách làm trước khi có snapshot)
+để so sánh.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from server_auth import DictionaryServer
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def run_phase(server, words, readers, seconds, with_writer, locked_reads):
+    stop = threading.Event()
+    latencies = [[] for _ in range(readers)]
+    approvals = [0]
+
+    def reader(out):
+        rng = random.Random(len(out))
+        while not stop.is_set():
+            request = f"TRA|{rng.choice(words)}"
+            start = time.perf_counter()
+            if locked_reads:
+                with server.lock:
+                    server.process_request(request, 'user', 'user1')
+            else:
+                server.process_request(request, 'user', 'user1')
+            out.append(time.perf_counter() - start)
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            word = f"newword{i}"
+            server.process_request(f"THEM|{word}:meaning {i}", 'user', 'user1')
+            request_id = next(k for k, v in list(server.pending.items()) if v['word'] == word)
+            server.process_request(f"APPROVE|{request_id}", 'admin', 'admin')
+            approvals[0] += 1
+            i += 1
+
+    threads = [threading.Thread(target=reader, args=(latencies[i],)) for i in range(readers)]
+    if with_writer:
+        threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    values = sorted(v for out in latencies for v in out)
+    us = lambda v: round(v * 1e6, 1)
+    return {
+        'writer': with_writer,
+        'lookups_per_sec': round(len(values) / seconds, 1),
+        'p50_us': us(percentile(values, 50)),
+        'p99_us': us(percentile(values, 99)),
+        'max_us': us(values[-1] if values else 0),
+        'approvals_per_sec': round(approvals[0] / seconds, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--words', type=int, default=200000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--locked-reads', action='store_true')
+    parser.add_argument('--json', action='store_true', help="In kết quả dạng JSON")
+    args = parser.parse_args()
+
+    words = [f"word{i}" for i in range(args.words)]
+    with tempfile.TemporaryDirectory() as tmp:
+        dict_file = os.path.join(tmp, 'dictionary.json')
+        with open(dict_file, 'w', encoding='utf-8') as f:
+            json.dump({w: f"nghĩa của {w}" for w in words}, f, ensure_ascii=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            server = DictionaryServer(
+                dict_file=dict_file,
+                pending_file=os.path.join(tmp, 'pending.json'),
+                journal_file=os.path.join(tmp, 'journal.log'),
+                users_file=os.path.join(tmp, 'users.json'),
+                session_key_file=os.path.join(tmp, 'session.key'),
+            )
+        results = [run_phase(server, words, args.readers, args.seconds, w, args.locked_reads)
+                   for w in (False, True)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'phase':<12}{'lookups/s':>12}{'p50 us':>10}{'p99 us':>10}{'max us':>12}{'approvals/s':>13}")
+    for r in results:
+        phase = 'approving' if r['writer'] else 'idle'
+        print(f"{phase:<12}{r['lookups_per_sec']:>12}{r['p50_us']:>10}{r['p99_us']:>10}"
+              f"{r['max_us']:>12}{r['approvals_per_sec']:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark: dictionary load time and memory, JSON dict vs memory-mapped .sst
+
+Chạy: python bench_startup.py --words 1000000 [--lookups 10000] [--json]
+
+Mỗi định dạng được đo trong một tiến trình riêng: thời gian mở file, thời gian
+tra `--lookups` từ ngẫu nhiên và RSS đỉnh (chỉ có trên Unix).
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from sstable import SSTABLE_SUFFIX, SSTable, write_sstable
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def measure(path, lookups):
+    """Runs in a child process: load `path`, look up random words, report JSON"""
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if path.endswith(SSTABLE_SUFFIX):
+        dictionary = SSTable(path)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            dictionary = json.load(f)
+    load_seconds = time.perf_counter() - start
+
+    rng = random.Random(1)
+    words = [f"word{rng.randrange(len(dictionary))}" for _ in range(lookups)]
+    start = time.perf_counter()
+    found = sum(1 for w in words if dictionary.get(w) is not None)
+    lookup_seconds = time.perf_counter() - start
+
+    rss = peak_rss_mb()
+    print(json.dumps({
+        'format': 'sst' if path.endswith(SSTABLE_SUFFIX) else 'json',
+        'file_mb': round(os.path.getsize(path) / 1e6, 1),
+        'load_seconds': round(load_seconds, 3),
+        'lookup_us': round(lookup_seconds / lookups * 1e6, 2),
+        'found': found,
+        'rss_mb': None if rss is None else round(rss - baseline, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--words', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=10000)
+    parser.add_argument('--json', action='store_true', help="In kết quả dạng JSON")
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.lookups)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        data = {f"word{i}": f"nghĩa thứ {i} của từ word{i}" for i in range(args.words)}
+        json_path = os.path.join(tmp, 'dictionary.json')
+        sst_path = os.path.join(tmp, 'dictionary' + SSTABLE_SUFFIX)
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        write_sstable(sst_path, sorted(data.items()))
+        del data
+
+        for path in (json_path, sst_path):
+            out = subprocess.run([sys.executable, __file__, '--measure', path, '--lookups', str(args.lookups)],
+                                 check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(out))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'format':<8}{'file MB':>10}{'load s':>10}{'lookup us':>12}{'RSS MB':>10}")
+    for r in results:
+        print(f"{r['format']:<8}{r['file_mb']:>10}{r['load_seconds']:>10}{r['lookup_us']:>12}{str(r['rss_mb']):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,50 @@
-import socket
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import json
+import bisect
+import queue
+from collections import OrderedDict
+from events import RESYNC_EVENT
+from protocol import FramedClient
 
 # Cấu hình kết nối mặc định
 DEFAULT_HOST = 'localhost'
 DEFAULT_PORT = 5555
+PENDING_PAGE_SIZE = 1000
+LOOKUP_CACHE_SIZE = 2000  # Số câu trả lời TRA giữ lại trong client
+CONNECTION_LOST_EVENT = 'EVENT|connection_lost'  # FramedClient báo kết nối đã đóng (không đến từ server)
+
+
+class LookupCache:
+    """LRU các câu trả lời TRA (cả SUCCESS lẫn NOTFOUND), bỏ đi khi từ điển thay đổi"""
+
+    def __init__(self, size=LOOKUP_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, word):
+        resp = self.entries.get(word)
+        if resp is not None:
+            self.entries.move_to_end(word)
+        return resp
+
+    def put(self, word, resp):
+        self.entries[word] = resp
+        self.entries.move_to_end(word)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, words):
+        """Từ điển sang phiên bản mới: bỏ các từ vừa đổi và mọi NOTFOUND (từ mới có thể
+        chính là từ đó, hoặc làm danh sách gợi ý khác đi)"""
+        for word in words:
+            self.entries.pop(word, None)
+        for word in [w for w, resp in self.entries.items() if resp.startswith("NOTFOUND")]:
+            del self.entries[word]
+
+    def clear(self):
+        self.entries.clear()
+
 
 class DictionaryClientGUI:
     def __init__(self, root):
@@ -13,10 +52,18 @@ class DictionaryClientGUI:
         self.root.title("Ứng dụng Từ điển Online")
         self.root.geometry("900x650")
         
-        self.socket = None
+        self.client = None
         self.user_role = None
         self.username = None
         self.connected = False
+        self.host = None
+        # Bản sao danh sách từ đã tải: (host, version, {word: meaning}), giữ qua các lần đăng nhập
+        self.dict_cache = None
+        # Event server đẩy về (thread đọc socket) chờ được xử lý trên thread giao diện
+        self.events = queue.Queue()
+        self.subscribed = False
+        # Chỉ dùng khi đã SUBSCRIBE: event 'dict' cho biết lúc nào phải bỏ cache
+        self.lookup_cache = LookupCache()
         
         # Style cho giao diện đẹp hơn
         self.style = ttk.Style()
@@ -105,8 +152,18 @@ class DictionaryClientGUI:
         self.search_entry = ttk.Entry(input_frame, width=40, font=("Arial", 11))
         self.search_entry.pack(side=tk.LEFT, padx=5)
         self.search_entry.bind('<Return>', lambda e: self.do_lookup()) # Enter để tìm
+        self.search_entry.bind('<KeyRelease>', self.on_search_key) # Gợi ý khi gõ
         
         ttk.Button(input_frame, text="Tìm kiếm", command=self.do_lookup).pack(side=tk.LEFT, padx=5)
+        # Tra ngược: nhập nghĩa tiếng Việt (có hoặc không dấu) để tìm từ tiếng Anh
+        self.reverse_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(input_frame, text="Việt → Anh", variable=self.reverse_var).pack(side=tk.LEFT, padx=5)
+        
+        # Danh sách gợi ý (PREFIX), bấm đúp để tra
+        self.suggest_list = tk.Listbox(self.tab_search, height=5, font=("Arial", 10))
+        self.suggest_list.pack(fill=tk.X)
+        self.suggest_list.bind('<Double-Button-1>', self.on_suggestion_pick)
+        self.suggest_job = None
         
         self.result_area = scrolledtext.ScrolledText(self.tab_search, height=15, font=("Arial", 11))
         self.result_area.pack(fill=tk.BOTH, expand=True, pady=10)
@@ -124,6 +181,9 @@ class DictionaryClientGUI:
         self.tree_dict.heading("meaning", text="Định nghĩa")
         self.tree_dict.column("word", width=200, anchor=tk.W)
         self.tree_dict.column("meaning", width=500, anchor=tk.W)
+        # Các từ đang hiển thị theo đúng thứ tự dòng trong bảng: chèn bằng bisect mà
+        # không phải lấy lại toàn bộ get_children() mỗi lần cập nhật
+        self.tree_words = []
         
         # Scrollbar
         scrollbar = ttk.Scrollbar(self.tab_list, orient=tk.VERTICAL, command=self.tree_dict.yview)
@@ -152,11 +212,23 @@ class DictionaryClientGUI:
         ttk.Button(btn_frame, text="Gửi yêu cầu SỬA", command=lambda: self.send_contrib("SUA")).pack(side=tk.LEFT, padx=10)
 
     def build_admin_tab(self):
-        ttk.Button(self.tab_admin, text=" Tải danh sách chờ", command=self.load_pending_list).pack(anchor=tk.W, pady=(0, 5))
+        # Lọc theo từ / người gửi để không phải tải cả hàng đợi
+        filter_frame = ttk.Frame(self.tab_admin)
+        filter_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Button(filter_frame, text=" Tải danh sách chờ", command=self.load_pending_list).pack(side=tk.LEFT)
+        ttk.Label(filter_frame, text="Từ:").pack(side=tk.LEFT, padx=(15, 5))
+        self.pending_word_filter = ttk.Entry(filter_frame, width=15)
+        self.pending_word_filter.pack(side=tk.LEFT)
+        ttk.Label(filter_frame, text="Người gửi:").pack(side=tk.LEFT, padx=(15, 5))
+        self.pending_user_filter = ttk.Entry(filter_frame, width=15)
+        self.pending_user_filter.pack(side=tk.LEFT)
+        self.pending_count_lbl = ttk.Label(filter_frame, text="")
+        self.pending_count_lbl.pack(side=tk.RIGHT)
         
         # Bảng Pending
         columns = ("id", "type", "word", "content", "user", "time")
-        self.tree_pending = ttk.Treeview(self.tab_admin, columns=columns, show="headings")
+        # Chọn nhiều dòng (Ctrl/Shift + click) để duyệt hàng loạt
+        self.tree_pending = ttk.Treeview(self.tab_admin, columns=columns, show="headings", selectmode="extended")
         
         self.tree_pending.heading("id", text="ID")
         self.tree_pending.heading("type", text="Loại")
@@ -188,72 +260,299 @@ class DictionaryClientGUI:
         pwd = self.pass_entry.get()
         
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((host, DEFAULT_PORT))
-            
-            # Nhận Welcome
-            self.socket.recv(1024)
+            # Nhận Welcome và thương lượng chế độ FRAMED
+            self.client = FramedClient(host, DEFAULT_PORT)
             
             # Gửi Login
-            self.socket.send(f"LOGIN|{user}|{pwd}".encode('utf-8'))
-            resp = self.socket.recv(1024).decode('utf-8')
+            resp = self.client.login(user, pwd)
             
             if resp.startswith("SUCCESS"):
                 parts = resp.split('|')
                 self.user_role = parts[1]
                 self.username = user
+                self.host = host
+                self.lookup_cache.clear()
                 self.connected = True
                 self.setup_dashboard_ui() # Chuyển sang màn hình chính
                 
                 # Tự động tải danh sách từ
                 self.root.after(100, self.load_dictionary_list)
+                self.subscribe_events()
             else:
                 messagebox.showerror("Lỗi", resp)
-                self.socket.close()
+                self.client.close()
+                self.client = None
                 
         except Exception as e:
             messagebox.showerror("Kết nối thất bại", str(e))
 
+    def subscribe_events(self):
+        """Nhận event từ server thay vì bấm tải lại / hỏi PENDING định kỳ"""
+        if not self.client.framed:
+            return
+        self.events = queue.Queue()
+        self.client.on_push = self.events.put
+        self.client.on_close = self.on_connection_lost
+        resp = self.send_request("SUBSCRIBE")
+        self.subscribed = bool(resp and resp.startswith("SUBSCRIBED"))
+        if self.subscribed:
+            if self.user_role == 'admin':
+                self.root.after(100, self.load_pending_list)
+            self.root.after(200, self.poll_events)
+
+    def on_connection_lost(self):
+        # Gọi từ thread đọc của FramedClient: chuyển về vòng poll_events của Tk
+        self.events.put(CONNECTION_LOST_EVENT)
+
+    def poll_events(self):
+        if not self.subscribed:
+            return
+        reload_dict = reload_pending = False
+        while True:
+            try:
+                message = self.events.get_nowait()
+            except queue.Empty:
+                break
+            parts = message.split('|', 2)
+            topic = parts[1] if len(parts) > 1 else ''
+            if topic == 'dict':
+                # Gộp nhiều event thành một lần CHANGES
+                reload_dict = True
+            elif topic == 'pending' and hasattr(self, 'tree_pending'):
+                event = json.loads(parts[2])
+                if event['op'] == 'added':
+                    item = event['item']
+                    filters = self.pending_filters()
+                    if filters.get('word', item['word']) != item['word'] or filters.get('user', item['username']) != item['username']:
+                        continue
+                    if not self.tree_pending.exists(item['id']):
+                        self.insert_pending_row(item)
+                elif self.tree_pending.exists(event['id']):
+                    self.tree_pending.delete(event['id'])
+            elif topic == 'connection_lost':
+                # Server đóng kết nối (khởi động lại, mạng...): không còn event nên cache
+                # có thể đã cũ. Nối lại ngay; reconnect() xếp một RESYNC để tải lại
+                if self.client is not None and self.client.closed and not self.reconnect():
+                    messagebox.showerror("Lỗi mạng", "Mất kết nối tới server")
+                    self.logout()
+                    return
+            elif topic == 'resync':
+                # Client nhận chậm, server đã bỏ bớt event: tải lại
+                reload_dict = reload_pending = True
+        if reload_dict:
+            self.load_dictionary_list()
+        if reload_pending and self.user_role == 'admin':
+            self.load_pending_list()
+        if self.subscribed:
+            self.root.after(200, self.poll_events)
+
     def send_request(self, data):
-        if not self.socket: return None
+        if not self.client: return None
         try:
-            self.socket.send(data.encode('utf-8'))
-            # Tăng buffer size để nhận JSON dài
-            response = self.socket.recv(65536).decode('utf-8') 
-            return response
+            # Chế độ FRAMED: đọc đủ độ dài message, không lo bị cắt khi JSON lớn
+            return self.client.request(data)
         except Exception as e:
-            messagebox.showerror("Lỗi mạng", str(e))
-            self.logout()
-            return None
+            error = e
+        # Mất kết nối (mạng chập chờn, server khởi động lại): nối lại bằng token rồi gửi lại một lần
+        if self.reconnect():
+            try:
+                return self.client.request(data)
+            except Exception as e:
+                error = e
+        messagebox.showerror("Lỗi mạng", str(error))
+        self.logout()
+        return None
+
+    def reconnect(self):
+        """Mở kết nối mới và RESUME bằng token phiên, không cần nhập lại mật khẩu"""
+        token = self.client.token if self.client else None
+        if not token:
+            return False
+        self.client.close()
+        try:
+            client = FramedClient(self.host, DEFAULT_PORT)
+            resp = client.resume(token)
+        except Exception:
+            return False
+        if not resp.startswith("SUCCESS"):
+            client.close()
+            return False
+        self.client = client
+        if self.subscribed:
+            # poll_events vẫn đang chạy: đăng ký lại trên kết nối mới, và tải lại
+            # vì các event phát ra trong lúc mất kết nối đã bị lỡ
+            self.lookup_cache.clear()
+            client.on_push = self.events.put
+            client.on_close = self.on_connection_lost
+            try:
+                client.request("SUBSCRIBE")
+            except Exception:
+                return False
+            self.events.put(RESYNC_EVENT)
+        return True
 
     def do_lookup(self):
         word = self.search_entry.get()
         if not word: return
-        resp = self.send_request(f"TRA|{word}")
+        if self.reverse_var.get():
+            self.do_reverse_lookup(word)
+            return
+        resp = self.lookup(word)
+        if resp is None: return
         
         self.result_area.delete(1.0, tk.END)
         if resp.startswith("SUCCESS"):
             content = resp.split('|', 1)[1]
             self.result_area.insert(tk.END, content, 'success')
+        elif resp.startswith("NOTFOUND"):
+            parts = resp.split('|')
+            self.result_area.insert(tk.END, parts[1], 'error')
+            if len(parts) > 2 and parts[2]:
+                # Gợi ý từ gần đúng, đưa luôn vào danh sách gợi ý để bấm chọn
+                self.result_area.insert(tk.END, f"\n\nCó phải bạn muốn tìm: {parts[2].replace(',', ', ')}?")
+                self.suggest_list.delete(0, tk.END)
+                for w in parts[2].split(','):
+                    self.suggest_list.insert(tk.END, w)
         else:
             self.result_area.insert(tk.END, resp, 'error')
 
+    def lookup(self, word):
+        """TRA có cache: trả lời tại chỗ từ cache hoặc bản sao danh sách từ nếu còn mới"""
+        # Không nhận event (chưa SUBSCRIBE, hoặc kết nối vừa mất) thì không biết khi nào
+        # dữ liệu cũ: luôn hỏi server
+        if not self.subscribed or self.client is None or self.client.closed:
+            return self.send_request(f"TRA|{word}")
+        key = word.lower().strip()
+        resp = self.lookup_cache.get(key)
+        if resp is not None:
+            return resp
+        if self.dict_cache and self.dict_cache[0] == self.host and key in self.dict_cache[2]:
+            # Từ đã có trong bảng LIST (được cập nhật theo CHANGES)
+            resp = f"SUCCESS|{key}: {self.dict_cache[2][key]}"
+        else:
+            resp = self.send_request(f"TRA|{word}")
+            if resp is None:
+                return None
+        if resp.startswith(("SUCCESS", "NOTFOUND")):
+            self.lookup_cache.put(key, resp)
+        return resp
+
+    def do_reverse_lookup(self, text):
+        resp = self.send_request(f"TIM|{text}|20")
+        self.result_area.delete(1.0, tk.END)
+        if resp and resp.startswith("TIM_DATA"):
+            items = json.loads(resp.split('|', 1)[1])
+            if not items:
+                self.result_area.insert(tk.END, f"Không tìm thấy từ nào có nghĩa '{text}'", 'error')
+            for item in items:
+                self.result_area.insert(tk.END, f"{item['word']}: {item['meaning']}\n", 'success')
+        elif resp:
+            self.result_area.insert(tk.END, resp, 'error')
+
+    def on_search_key(self, event):
+        if event.keysym in ('Return', 'Up', 'Down') or self.reverse_var.get():
+            return
+        # Chờ người dùng gõ xong một chút rồi mới hỏi server
+        if self.suggest_job:
+            self.root.after_cancel(self.suggest_job)
+        self.suggest_job = self.root.after(150, self.update_suggestions)
+
+    def update_suggestions(self):
+        self.suggest_job = None
+        self.suggest_list.delete(0, tk.END)
+        prefix = self.search_entry.get().strip()
+        if not prefix or '|' in prefix:
+            return
+        resp = self.send_request(f"PREFIX|{prefix}|10")
+        if resp and resp.startswith("PREFIX_DATA"):
+            for item in json.loads(resp.split('|', 1)[1]):
+                self.suggest_list.insert(tk.END, item['word'])
+
+    def on_suggestion_pick(self, event):
+        selected = self.suggest_list.curselection()
+        if not selected:
+            return
+        self.search_entry.delete(0, tk.END)
+        self.search_entry.insert(0, self.suggest_list.get(selected[0]))
+        self.do_lookup()
+
     def load_dictionary_list(self):
-        resp = self.send_request("LIST")
-        if resp and resp.startswith("LIST_DATA"):
-            try:
-                json_str = resp.split('|', 1)[1]
-                data = json.loads(json_str)
-                
-                # Xóa dữ liệu cũ trong bảng
-                for item in self.tree_dict.get_children():
-                    self.tree_dict.delete(item)
+        if not self.client: return
+        host = self.host
+        try:
+            if self.dict_cache and self.dict_cache[0] == host:
+                # Đã có bản sao: chỉ lấy các thay đổi kể từ phiên bản đang có
+                version, meanings = self.dict_cache[1], self.dict_cache[2]
+                if not self.tree_words:
+                    self.fill_dictionary_tree(meanings)
+                resp = self.client.request(f"CHANGES|{version}")
+                header, _, body = resp.partition('|')
+                if header == "CHANGES_DATA":
+                    data = json.loads(body)
+                    self.apply_dictionary_changes(data['changes'])
+                    self.dict_cache = (host, data['version'], meanings)
+                    return
                 
-                # Thêm dữ liệu mới
-                for item in data:
-                    self.tree_dict.insert("", tk.END, values=(item['word'], item['meaning']))
-            except Exception as e:
-                print(f"Lỗi parse JSON: {e}")
+                # RESYNC: bản sao quá cũ, tải lại toàn bộ
+                resp = self.client.request(f"LIST|if_version={version}")
+                header, _, body = resp.partition('|')
+                if header == "LIST_DATA":
+                    data, _, version = body.rpartition('|')
+                    meanings = {item['word']: item['meaning'] for item in json.loads(data)}
+                    self.dict_cache = (host, int(version), meanings)
+                    self.fill_dictionary_tree(meanings)
+                elif header != "NOT_MODIFIED":
+                    print(f"Lỗi tải danh sách: {body}")
+                return
+            
+            # Lần đầu: nhận danh sách theo từng chunk thay vì một message JSON khổng lồ
+            self.tree_dict.delete(*self.tree_words)
+            self.tree_words = []
+            meanings = {}
+            for resp in self.client.stream("LIST|stream|chunk=1000"):
+                header, _, body = resp.partition('|')
+                if header in ("LIST_CHUNK", "LIST_DATA"):
+                    for item in json.loads(body):
+                        meanings[item['word']] = item['meaning']
+                        self.tree_words.append(item['word'])  # Server gửi theo thứ tự chữ cái
+                        self.tree_dict.insert("", tk.END, iid=item['word'], values=(item['word'], item['meaning']))
+                    self.root.update_idletasks()
+                elif header == "LIST_END":
+                    fields = body.split('|')
+                    if len(fields) > 1:
+                        self.dict_cache = (host, int(fields[1]), meanings)
+                elif header == "ERROR":
+                    print(f"Lỗi tải danh sách: {body}")
+        except ValueError as e:
+            print(f"Lỗi parse JSON: {e}")
+        except Exception as e:
+            messagebox.showerror("Lỗi mạng", str(e))
+            self.logout()
+
+    def fill_dictionary_tree(self, meanings):
+        self.lookup_cache.clear()
+        self.tree_dict.delete(*self.tree_words)
+        self.tree_words = sorted(meanings)
+        for word in self.tree_words:
+            self.tree_dict.insert("", tk.END, iid=word, values=(word, meanings[word]))
+
+    def apply_dictionary_changes(self, changes):
+        """Sửa trực tiếp các dòng thay đổi thay vì vẽ lại cả bảng (mỗi dòng có iid = từ)"""
+        if not changes:
+            return
+        self.lookup_cache.invalidate(change['word'] for change in changes)
+        meanings = self.dict_cache[2]
+        words = self.tree_words
+        for change in sorted(changes, key=lambda c: c['word']):
+            word, meaning = change['word'], change['meaning']
+            meanings[word] = meaning
+            index = bisect.bisect_left(words, word)
+            if index < len(words) and words[index] == word:
+                self.tree_dict.item(word, values=(word, meaning))
+                continue
+            # Chèn đúng vị trí theo thứ tự chữ cái
+            words.insert(index, word)
+            self.tree_dict.insert("", index, iid=word, values=(word, meaning))
 
     def send_contrib(self, action):
         w = self.contrib_word.get()
@@ -270,35 +569,52 @@ class DictionaryClientGUI:
         else:
             messagebox.showerror("Lỗi", resp)
 
+    def pending_filters(self):
+        filters = {}
+        word = self.pending_word_filter.get().strip().lower()
+        user = self.pending_user_filter.get().strip()
+        if word and '|' not in word:
+            filters['word'] = word
+        if user and '|' not in user:
+            filters['user'] = user
+        return filters
+
     def load_pending_list(self):
-        resp = self.send_request("PENDING")
-        if resp and resp.startswith("PENDING_DATA"):
+        # Chỉ lấy trang đầu (tối đa 1000 yêu cầu) khớp bộ lọc
+        filters = self.pending_filters()
+        query = ''.join(f"|{key}={value}" for key, value in filters.items())
+        resp = self.send_request(f"PENDING{query}|limit={PENDING_PAGE_SIZE}")
+        if resp and resp.startswith("PENDING_PAGE"):
             try:
                 json_str = resp.split('|', 1)[1]
-                data = json.loads(json_str)
+                page = json.loads(json_str)
                 
                 for item in self.tree_pending.get_children():
                     self.tree_pending.delete(item)
                     
-                for req in data:
-                    # Logic hiển thị nội dung tùy loại
-                    content = req.get('meaning', '')
-                    if req['type'] == 'update':
-                        content = f"{req['old_meaning']} -> {req['new_meaning']}"
-                        
-                    self.tree_pending.insert("", tk.END, values=(
-                        req.get('id', ''), # ID thực (bị ẩn)
-                        req['type'],
-                        req['word'],
-                        content,
-                        req['username'],
-                        req['timestamp']
-                    ))
+                for req in page['items']:
+                    self.insert_pending_row(req)
+                self.pending_count_lbl.config(text=f"{len(page['items'])} / {page['total']} yêu cầu")
             except Exception as e:
                 print(f"Lỗi parse JSON Pending: {e}")
         elif resp and "Access denied" in resp:
              messagebox.showerror("Quyền hạn", "Bạn không phải Admin")
 
+    def insert_pending_row(self, req):
+        # Logic hiển thị nội dung tùy loại
+        content = req.get('meaning', '')
+        if req['type'] == 'update':
+            content = f"{req['old_meaning']} -> {req['new_meaning']}"
+            
+        self.tree_pending.insert("", tk.END, iid=req['id'], values=(
+            req['id'], # ID thực (bị ẩn)
+            req['type'],
+            req['word'],
+            content,
+            req['username'],
+            req['timestamp']
+        ))
+
     def process_pending(self, action):
         # Lấy dòng đang chọn
         selected = self.tree_pending.selection()
@@ -306,6 +622,10 @@ class DictionaryClientGUI:
             messagebox.showwarning("Chọn dòng", "Vui lòng chọn một yêu cầu để xử lý")
             return
         
+        if len(selected) > 1:
+            self.process_pending_batch(action, selected)
+            return
+        
         # Lấy ID từ cột ẩn (cột đầu tiên)
         item_values = self.tree_pending.item(selected[0])['values']
         req_id = item_values[0] # ID nằm ở index 0
@@ -313,23 +633,36 @@ class DictionaryClientGUI:
         resp = self.send_request(f"{action}|{req_id}")
         if resp.startswith("SUCCESS"):
             messagebox.showinfo("Thành công", resp.split('|', 1)[1])
-            self.load_pending_list() # Tải lại danh sách sau khi duyệt
-            self.load_dictionary_list() # Tải lại danh sách từ (để cập nhật tab 2)
+            if not self.subscribed:
+                # Đã đăng ký event thì server tự đẩy thay đổi về, không cần tải lại
+                self.load_pending_list() # Tải lại danh sách sau khi duyệt
+                self.load_dictionary_list() # Tải lại danh sách từ (để cập nhật tab 2)
         else:
             messagebox.showerror("Lỗi", resp)
 
+    def process_pending_batch(self, action, selected):
+        # iid của mỗi dòng chính là ID yêu cầu; cả lô được duyệt trong một lần ghi
+        resp = self.send_request(f"{action}_BATCH|ids={','.join(selected)}")
+        if not resp:
+            return
+        if not resp.startswith("BATCH_RESULT"):
+            messagebox.showerror("Lỗi", resp)
+            return
+        data = json.loads(resp.split('|', 1)[1])
+        done = [r['id'] for r in data['results'] if r['status'] != 'not_found']
+        verb = "Đã duyệt" if action == "APPROVE" else "Đã từ chối"
+        messagebox.showinfo("Thành công", f"{verb} {len(done)} yêu cầu"
+                            + (f", {data['not_found']} yêu cầu không còn tồn tại" if data['not_found'] else ""))
+        if not self.subscribed:
+            self.load_pending_list()
+            self.load_dictionary_list()
+
     def logout(self):
-        # Gửi lệnh QUIT về server
-        try:
-            if self.socket and self.connected:
-                self.socket.send("QUIT".encode('utf-8'))
-        except:
-            pass
-        
-        # Đóng kết nối
-        if self.socket: 
-            self.socket.close()
-            self.socket = None
+        # Gửi lệnh QUIT về server và đóng kết nối
+        if self.client:
+            self.client.close()
+            self.client = None
+        self.subscribed = False
         
         # Reset trạng thái
         self.connected = False
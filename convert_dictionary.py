@@ -0,0 +1,46 @@
+"""Convert the dictionary between JSON and the memory-mapped .sst format
+
+Chạy: python convert_dictionary.py dictionary.json dictionary.sst
+      python convert_dictionary.py dictionary.sst dictionary.json   (chiều ngược lại)
+
+Sau đó khởi động server với --dict-file dictionary.sst. Journal chỉ chứa thay
+đổi sau lần compact gần nhất, nên hãy chuyển đổi khi server đang tắt.
+"""
+import argparse
+import json
+import os
+import time
+
+from sstable import SSTABLE_SUFFIX, SSTable, write_sstable
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source')
+    parser.add_argument('target')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.source.endswith(SSTABLE_SUFFIX):
+        table = SSTable(args.source)
+        data = dict(table.items())
+        table.close()
+    else:
+        with open(args.source, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+    if args.target.endswith(SSTABLE_SUFFIX):
+        count = write_sstable(args.target, sorted(data.items()))
+    else:
+        tmp_path = args.target + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, args.target)
+        count = len(data)
+
+    print(f"✓ Wrote {count} words to {args.target} in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize(args.source) / 1e6:.1f} MB -> {os.path.getsize(args.target) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+# Chủ đề có thể đăng ký: hàng đợi duyệt (chỉ admin) và thay đổi từ điển
+TOPICS = ('pending', 'dict')
+ADMIN_TOPICS = {'pending'}
+MAX_QUEUED_EVENTS = 1000  # Vượt quá thì bỏ hết, báo client tải lại (EVENT|resync)
+RESYNC_EVENT = 'EVENT|resync'
+
+
+class Subscription:
+    """Per-connection event buffer that coalesces events for slow subscribers
+
+    Mỗi event có một key (id yêu cầu, từ...). Khi client chưa kịp nhận, event
+    mới cùng key thay thế event cũ nên client chậm chỉ nhận trạng thái mới nhất.
+    Nếu số event chờ vượt max_events thì bỏ hết và gửi một EVENT|resync.
+
+    `wakeup` được gọi (ngoài lock) khi buffer chuyển từ rỗng sang có dữ liệu;
+    engine dùng nó để đánh thức phần gửi của kết nối.
+    """
+
+    def __init__(self, topics, wakeup, max_events=MAX_QUEUED_EVENTS):
+        self.topics = set(topics)
+        self.wakeup = wakeup
+        self.max_events = max_events
+        self.coalesced = 0  # Số event bị gộp / bỏ vì client chậm
+        self._lock = threading.Lock()
+        self._buffer = OrderedDict()
+        self._overflowed = False
+
+    def push(self, topic, key, message):
+        """Queue an event without blocking"""
+        with self._lock:
+            was_empty = not self._buffer and not self._overflowed
+            if self._buffer.pop((topic, key), None) is not None:
+                self.coalesced += 1
+            self._buffer[(topic, key)] = message
+            if len(self._buffer) > self.max_events:
+                self.coalesced += len(self._buffer)
+                self._buffer.clear()
+                self._overflowed = True
+        if was_empty:
+            self.wakeup()
+
+    def drain(self):
+        """Take every queued message, oldest first"""
+        with self._lock:
+            messages = list(self._buffer.values())
+            self._buffer.clear()
+            if self._overflowed:
+                messages.insert(0, RESYNC_EVENT)
+                self._overflowed = False
+        return messages
+
+
+class EventBus:
+    """Fan-out of server events to the subscribed connections"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def __contains__(self, subscription):
+        return subscription in self._subscriptions
+
+    def publish(self, topic, key, message):
+        """Hand an event to every subscriber of `topic` (never blocks on the network)"""
+        with self._lock:
+            targets = [s for s in self._subscriptions if topic in s.topics]
+        for subscription in targets:
+            subscription.push(topic, key, message)
+
+    def __len__(self):
+        return len(self._subscriptions)
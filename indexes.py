@@ -0,0 +1,385 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+
+
+class SortedKeys:
+    """Read operations shared by sorted key sequences
+
+    Lớp con cần có __len__, key_at(i), position(key, after) và iter_from(start).
+    """
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def position_after(self, key):
+        """Index of the first key strictly greater than `key`"""
+        return self.position(key, after=True)
+
+    def slice(self, start, limit):
+        result = []
+        if limit <= 0:
+            return result
+        for key in self.iter_from(start):
+            result.append(key)
+            if len(result) >= limit:
+                break
+        return result
+
+    def prefix(self, prefix, limit):
+        """Up to `limit` keys starting with `prefix`, in order"""
+        result = []
+        for key in self.iter_from(self.position(prefix)):
+            if not key.startswith(prefix) or len(result) >= limit:
+                break
+            result.append(key)
+        return result
+
+    def range(self, low, high, limit):
+        """Up to `limit` keys with low <= key <= high (empty bound = open)"""
+        result = []
+        for key in self.iter_from(self.position(low) if low else 0):
+            if (high and key > high) or len(result) >= limit:
+                break
+            result.append(key)
+        return result
+
+
+class SortedIndex(SortedKeys):
+    """Immutable sorted index of dictionary keys, stored as a list of chunks
+
+    Giống một B-tree hai tầng: các key được chia thành chunk đã sắp xếp (tối đa
+    2*CHUNK_SIZE phần tử). Tìm kiếm bằng bisect: O(log n) để định vị + O(k) để
+    lấy k kết quả. inserted() trả về index mới (copy-on-write) chỉ sao chép danh
+    sách chunk và các chunk bị chèn, index cũ vẫn dùng được cho reader đang đọc.
+    """
+
+    CHUNK_SIZE = 512
+
+    def __init__(self, keys=(), _chunks=None):
+        if _chunks is None:
+            keys = sorted(keys)
+            _chunks = [keys[i:i + self.CHUNK_SIZE] for i in range(0, len(keys), self.CHUNK_SIZE)]
+        self.chunks = _chunks
+        self.maxes = [chunk[-1] for chunk in _chunks]
+        # offsets[i] = vị trí toàn cục của phần tử đầu tiên trong chunk i
+        self.offsets = []
+        total = 0
+        for chunk in _chunks:
+            self.offsets.append(total)
+            total += len(chunk)
+        self.size = total
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield from chunk
+
+    def __contains__(self, key):
+        ci = bisect.bisect_left(self.maxes, key)
+        if ci == len(self.chunks):
+            return False
+        chunk = self.chunks[ci]
+        i = bisect.bisect_left(chunk, key)
+        return i < len(chunk) and chunk[i] == key
+
+    def inserted(self, keys):
+        """New index with `keys` added (keys already present are ignored)"""
+        chunks = list(self.chunks)
+        maxes = list(self.maxes)
+        copied = set()
+        for key in sorted(set(keys)):
+            if not chunks:
+                chunks.append([key])
+                maxes.append(key)
+                copied.add(0)
+                continue
+            ci = min(bisect.bisect_left(maxes, key), len(chunks) - 1)
+            if ci not in copied:
+                chunks[ci] = list(chunks[ci])
+                copied.add(ci)
+            chunk = chunks[ci]
+            i = bisect.bisect_left(chunk, key)
+            if i < len(chunk) and chunk[i] == key:
+                continue
+            chunk.insert(i, key)
+            maxes[ci] = chunk[-1]
+            if len(chunk) > 2 * self.CHUNK_SIZE:
+                # Tách chunk quá lớn làm đôi
+                half = len(chunk) // 2
+                chunks[ci:ci + 1] = [chunk[:half], chunk[half:]]
+                maxes[ci:ci + 1] = [chunk[half - 1], chunk[-1]]
+                copied = {c if c < ci else c + 1 for c in copied} | {ci, ci + 1}
+        return SortedIndex(_chunks=chunks)
+
+    def position(self, key, after=False):
+        """Global index of the first key >= key (or > key when after=True)"""
+        find = bisect.bisect_right if after else bisect.bisect_left
+        ci = find(self.maxes, key)
+        if ci == len(self.chunks):
+            return self.size
+        return self.offsets[ci] + find(self.chunks[ci], key)
+
+    def key_at(self, i):
+        """Key at global position i"""
+        ci = bisect.bisect_right(self.offsets, i) - 1
+        return self.chunks[ci][i - self.offsets[ci]]
+
+    def iter_from(self, start):
+        """Iterate keys starting at global position `start`"""
+        if start >= self.size:
+            return
+        ci = bisect.bisect_right(self.offsets, start) - 1
+        yield from self.chunks[ci][start - self.offsets[ci]:]
+        for chunk in self.chunks[ci + 1:]:
+            yield from chunk
+
+
+class MergedIndex(SortedKeys):
+    """Sorted union of a large read-only index and a small SortedIndex of extra keys
+
+    Dùng khi từ điển gốc nằm trong SSTable (đã sắp xếp sẵn trên đĩa): chỉ các từ
+    thêm sau khi khởi động mới nằm trong bộ nhớ. inserted() là copy-on-write như
+    SortedIndex.
+    """
+
+    def __init__(self, base, extra=None):
+        self.base = base
+        self.extra = extra if extra is not None else SortedIndex()
+
+    def __len__(self):
+        return len(self.base) + len(self.extra)
+
+    def __contains__(self, key):
+        return key in self.extra or key in self.base
+
+    def inserted(self, keys):
+        """New index with `keys` added (keys already present are ignored)"""
+        return MergedIndex(self.base, self.extra.inserted([k for k in keys if k not in self.base]))
+
+    def position(self, key, after=False):
+        return self.base.position(key, after) + self.extra.position(key, after)
+
+    def key_at(self, i):
+        return next(self.iter_from(i))
+
+    def _split(self, start):
+        """(i, j): the first `start` merged keys are base[:i] + extra[:j]"""
+        lo, hi = max(0, start - len(self.extra)), min(start, len(self.base))
+        while lo < hi:
+            i = (lo + hi) // 2
+            if self.extra.key_at(start - i - 1) > self.base.key_at(i):
+                lo = i + 1  # Cần lấy thêm từ base
+            else:
+                hi = i
+        return lo, start - lo
+
+    def iter_from(self, start):
+        if start >= len(self):
+            return iter(())
+        i, j = self._split(start)
+        return heapq.merge(self.base.iter_from(i), self.extra.iter_from(j))
+
+
+def edit_distance(a, b):
+    """Levenshtein distance between two strings"""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    """Symmetric-delete index over dictionary keys for "did you mean" suggestions
+
+    Mỗi từ được đăng ký dưới chính nó và mọi biến thể xoá 1 ký tự. Khi tra, các
+    biến thể xoá 1 ký tự của từ cần tìm chỉ ra tập ứng viên nhỏ, sau đó mới tính
+    edit distance thật. Chi phí mỗi lần tra phụ thuộc độ dài từ chứ không phụ
+    thuộc kích thước từ điển. Tìm được mọi từ cách 1 lỗi và các lỗi đôi phổ biến
+    (thay 2 ký tự, đảo chỗ, thêm + bớt).
+
+    Đổi lại, index tốn nhiều bộ nhớ: một từ dài n ký tự chiếm tới n + 1 key, mỗi
+    key kèm một set, cỡ 1.5-2 KB mỗi từ (khoảng 600 MB cho 300 nghìn từ), lớn hơn
+    nhiều so với chính từ điển.
+
+    Lock nội bộ chỉ giữ trong lúc sửa / sao chép vài set nhỏ, không bao giờ qua I/O.
+    """
+
+    def __init__(self, words=()):
+        self._lock = threading.Lock()
+        self.variants = {}
+        self.size = 0
+        self.add_many(words)
+
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def deletes(word):
+        """The word itself plus every variant with one character removed"""
+        return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+    def add(self, word):
+        """Register word (no-op if already present)"""
+        self._add_batch([(word, self.deletes(word))])
+
+    def add_many(self, words, batch_size=1000):
+        """Register many words, taking the lock once per batch"""
+        batch = []
+        for word in words:
+            batch.append((word, self.deletes(word)))
+            if len(batch) >= batch_size:
+                self._add_batch(batch)
+                batch = []
+        self._add_batch(batch)
+
+    def _add_batch(self, batch):
+        with self._lock:
+            for word, variants in batch:
+                if word in self.variants.get(word, ()):
+                    continue
+                for variant in variants:
+                    self.variants.setdefault(variant, set()).add(word)
+                self.size += 1
+
+    def search(self, word, max_distance, limit):
+        """Up to `limit` words within max_distance, nearest first"""
+        variants = self.deletes(word)
+        candidates = set()
+        with self._lock:
+            for variant in variants:
+                candidates.update(self.variants.get(variant, ()))
+        scored = []
+        for candidate in candidates:
+            d = edit_distance(word, candidate)
+            if d <= max_distance:
+                scored.append((d, candidate))
+        scored.sort()
+        return [w for _, w in scored[:limit]]
+
+
+def fold_diacritics(text):
+    """Lowercase and strip Vietnamese diacritics: 'Máy Tính' -> 'may tinh'"""
+    text = text.lower().replace('đ', 'd')
+    return ''.join(c for c in unicodedata.normalize('NFD', text) if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """Folded word tokens of a meaning or query"""
+    return re.findall(r'\w+', fold_diacritics(text))
+
+
+class InvertedIndex:
+    """Token -> words index over meanings, for Vietnamese -> English search
+
+    Nghĩa được tách thành token đã bỏ dấu, nên "may tinh" khớp "máy tính".
+    Kết quả xếp hạng theo: số token khớp, tổng idf của token khớp (chia theo độ
+    dài nghĩa); trong nhóm ứng viên tốt nhất, nghĩa chứa nguyên cụm được ưu tiên.
+    Giữ token của mọi nghĩa trong bộ nhớ: cỡ 1 KB mỗi từ.
+    """
+
+    COMMON_TOKEN_DOCS = 5000  # Token xuất hiện trong nhiều nghĩa hơn số này coi như "từ dừng"
+
+    def __init__(self, entries=()):
+        self._lock = threading.Lock()
+        self.postings = {}
+        self.doc_tokens = {}
+        self.add_missing(entries)
+
+    def __len__(self):
+        return len(self.doc_tokens)
+
+    def add_missing(self, entries, batch_size=1000):
+        """Index (word, meaning) pairs whose word is not indexed yet
+
+        Dùng khi dựng index ở thread nền: nghĩa do set() (APPROVE) ghi vào luôn mới
+        hơn nên không bị ghi đè. Lock được giữ theo từng lô.
+        """
+        batch = []
+        for word, meaning in entries:
+            batch.append((word, tuple(tokenize(meaning))))
+            if len(batch) >= batch_size:
+                self._add_batch(batch)
+                batch = []
+        self._add_batch(batch)
+
+    def _add_batch(self, batch):
+        with self._lock:
+            for word, tokens in batch:
+                if word in self.doc_tokens:
+                    continue
+                self.doc_tokens[word] = tokens
+                for token in tokens:
+                    self.postings.setdefault(token, set()).add(word)
+
+    def set(self, word, meaning):
+        """Index (or re-index) the meaning of a word"""
+        tokens = tuple(tokenize(meaning))
+        with self._lock:
+            old_tokens = self.doc_tokens.get(word, ())
+            for token in set(old_tokens) - set(tokens):
+                docs = self.postings[token]
+                docs.discard(word)
+                if not docs:
+                    del self.postings[token]
+            for token in set(tokens) - set(old_tokens):
+                self.postings.setdefault(token, set()).add(word)
+            self.doc_tokens[word] = tokens
+
+    def search(self, query, limit):
+        """Up to `limit` words whose meaning matches query, best first"""
+        query_tokens = tokenize(query)
+        with self._lock:
+            total = len(self.doc_tokens) or 1
+            # Token hiếm trước: chúng quyết định tập ứng viên. Sao chép (nhanh, trong C) các
+            # posting sẽ duyệt; posting rất lớn chỉ dùng để kiểm tra "word in docs".
+            postings = sorted((self.postings[t] for t in set(query_tokens) if t in self.postings), key=len)
+            postings = [set(docs) if i == 0 or len(docs) <= self.COMMON_TOKEN_DOCS else docs
+                        for i, docs in enumerate(postings)]
+
+        if postings and len(postings[0]) > self.COMMON_TOKEN_DOCS:
+            # Mọi token đều rất phổ biến (kiểu "của"): chỉ chấm điểm các nghĩa ngắn nhất
+            doc_len = lambda w: len(self.doc_tokens.get(w, ()))
+            postings[0] = heapq.nsmallest(self.COMMON_TOKEN_DOCS, postings[0], key=doc_len)
+
+        matched = {}
+        for docs in postings:
+            idf = math.log(1 + total / len(docs))
+            if matched and len(docs) > self.COMMON_TOKEN_DOCS:
+                # Token phổ biến chỉ cộng điểm cho ứng viên đã có, không mở rộng tập ứng viên
+                for word, (count, score) in matched.items():
+                    if word in docs:
+                        matched[word] = (count + 1, score + idf)
+                continue
+            for word in docs:
+                count, score = matched.get(word, (0, 0.0))
+                matched[word] = (count + 1, score + idf)
+
+        def rank(item):
+            word, (count, score) = item
+            # Nghĩa ngắn gọn được ưu tiên hơn nghĩa dài có cùng token
+            return -count, -score / math.sqrt(len(self.doc_tokens.get(word, ())) or 1), word
+
+        shortlist = [rank(item) for item in heapq.nsmallest(limit * 4, matched.items(), key=rank)]
+        if len(query_tokens) > 1:
+            shortlist.sort(key=lambda r: (r[0], not self._contains_phrase(self.doc_tokens.get(r[2], ()), query_tokens), r[1], r[2]))
+        return [(word, round(-neg_score, 4)) for _, neg_score, word in shortlist[:limit]]
+
+    @staticmethod
+    def _contains_phrase(tokens, phrase):
+        n = len(phrase)
+        return any(list(tokens[i:i + n]) == phrase for i in range(len(tokens) - n + 1))
@@ -0,0 +1,204 @@
+import json
+import os
+import threading
+import time
+
+from logs import server_log
+
+# Chính sách đồng bộ xuống đĩa:
+#   always   - request chờ đến khi bản ghi đã fsync (nhiều request dùng chung một fsync)
+#   interval - fsync định kỳ mỗi sync_interval giây, request không chờ
+#   shutdown - chỉ ghi vào OS định kỳ, fsync khi đóng server
+SYNC_POLICIES = ('always', 'interval', 'shutdown')
+# Bản ghi đầu mỗi segment mới, mang trạng thái cần giữ qua lần compact (không tính vào entries)
+CHECKPOINT_OP = 'checkpoint'
+RETRY_DELAY = 0.5  # Giây chờ trước khi thread nền thử ghi lại sau lỗi (đĩa đầy...)
+ERROR_LOG_INTERVAL = 30  # Lỗi kéo dài chỉ được ghi log lại sau ngần này giây
+
+
+class JournalWriteError(Exception):
+    """Raised by Journal.wait() when the record could not be written to disk"""
+
+
+class Journal:
+    """Append-only log of mutations, one JSON object per line
+
+    Server ghi mỗi thay đổi (gửi yêu cầu, duyệt, từ chối) thành một dòng thay vì
+    ghi lại toàn bộ file JSON. Định kỳ server gộp (compact) journal vào
+    dictionary.json / pending.json rồi bỏ phần journal cũ.
+
+    Việc ghi file do một thread nền đảm nhận (group commit): các bản ghi từ
+    nhiều thread được gom lại và ghi + fsync một lần. Ghi lỗi thì các dòng được
+    trả lại buffer để thử lại, còn request đang chờ nhận JournalWriteError.
+    """
+
+    def __init__(self, path, sync_policy='always', sync_interval=0.05):
+        if sync_policy not in SYNC_POLICIES:
+            raise ValueError(f"Unknown sync policy: {sync_policy}")
+        self.path = path
+        self.rotated_path = path + '.1'
+        self.sync_policy = sync_policy
+        self.sync_interval = sync_interval
+        self.entries = 0
+        self.commits = 0  # Số lần ghi xuống file (mỗi lần có thể gồm nhiều bản ghi)
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._buffer = []
+        self._appended = 0
+        self._synced = 0
+        self._closed = False
+        self._error = None  # Lỗi của lần ghi gần nhất (None khi lần ghi đó thành công)
+        self._torn = False  # Lần ghi lỗi có thể đã để lại nửa dòng ở cuối file
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def replay(self):
+        """Yield every record, rotated segment first, skipping a torn last line"""
+        for path in (self.rotated_path, self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Dòng ghi dở do server bị tắt đột ngột
+                        server_log.warning("Skipping corrupt journal line in %s", path)
+                        continue
+                    if path == self.path and record.get('op') != CHECKPOINT_OP:
+                        self.entries += 1
+                    yield record
+
+    def append(self, record):
+        """Queue one record, return a ticket for wait()"""
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._cond:
+            self._buffer.append(line)
+            self._appended += 1
+            self.entries += 1
+            if self.sync_policy == 'always':
+                self._cond.notify_all()
+            return self._appended
+
+    def wait(self, ticket):
+        """Block until the record is durable (only under the 'always' policy)
+
+        Gọi sau khi đã nhả lock của server để các request khác kịp gom vào cùng lần fsync.
+        """
+        if self.sync_policy != 'always':
+            return
+        with self._cond:
+            while self._synced < ticket and not self._closed:
+                if self._error is not None:
+                    raise JournalWriteError(self._error)
+                self._cond.wait()
+
+    def _write_pending(self, fsync):
+        """Write buffered lines to the current segment (caller holds _io_lock)"""
+        with self._cond:
+            lines, self._buffer = self._buffer, []
+            upto = self._appended
+        if lines:
+            try:
+                # Xuống dòng trước để phần ghi dở lần trước thành một dòng hỏng riêng (replay bỏ qua)
+                self._file.write(('\n' if self._torn else '') + ''.join(lines))
+                self._file.flush()
+                if fsync:
+                    os.fsync(self._file.fileno())
+            except Exception as e:
+                with self._cond:
+                    self._buffer[:0] = lines
+                    self._error = e
+                    self._torn = True
+                    self._cond.notify_all()
+                # Bỏ file object có buffer ở trạng thái không rõ, lần sau ghi lại từ đầu các dòng này
+                try:
+                    self._file.close()
+                except Exception:
+                    pass
+                self._file = open(self.path, 'a', encoding='utf-8')
+                raise
+            self._torn = False
+            self.commits += 1
+        with self._cond:
+            self._synced = max(self._synced, upto)
+            self._error = None
+            self._cond.notify_all()
+
+    def _flush_loop(self):
+        failures = 0  # Số lần ghi lỗi liên tiếp
+        logged_at = 0.0
+        while True:
+            with self._cond:
+                if self.sync_policy == 'always':
+                    while not self._buffer and not self._closed:
+                        self._cond.wait()
+                else:
+                    self._cond.wait(self.sync_interval)
+                if self._closed:
+                    return
+            try:
+                with self._io_lock:
+                    self._write_pending(fsync=self.sync_policy != 'shutdown')
+            except Exception as e:
+                # Thử lại mỗi RETRY_DELAY giây nhưng không ghi log lần nào cũng như lần nào
+                failures += 1
+                now = time.monotonic()
+                if failures == 1 or now - logged_at >= ERROR_LOG_INTERVAL:
+                    server_log.error("Error writing journal (%d failed attempts, retrying): %s", failures, e)
+                    logged_at = now
+                time.sleep(RETRY_DELAY)
+                continue
+            if failures:
+                server_log.info("Journal writes recovered after %d failed attempts", failures)
+                failures = 0
+
+    def flush(self):
+        """Write and fsync everything appended so far"""
+        with self._io_lock:
+            self._write_pending(fsync=True)
+
+    def rotate(self, checkpoint=None):
+        """Start a new segment; the old one is kept until discard_rotated()
+
+        `checkpoint` (dict) được ghi + fsync ngay đầu segment mới.
+        """
+        with self._io_lock:
+            # Các bản ghi đang chờ thuộc về segment cũ (đã có trong snapshot)
+            self._write_pending(fsync=True)
+            self._file.close()
+            if os.path.exists(self.rotated_path):
+                # Lần compact trước thất bại: nối tiếp vào segment cũ, không ghi đè
+                with open(self.rotated_path, 'a', encoding='utf-8') as dst, \
+                        open(self.path, 'r', encoding='utf-8') as src:
+                    dst.write(src.read())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.rotated_path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if checkpoint is not None:
+                record = dict(checkpoint, op=CHECKPOINT_OP)
+                self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            with self._cond:
+                self.entries = len(self._buffer)
+
+    def discard_rotated(self):
+        """Drop the rotated segment once a snapshot covers it"""
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def close(self):
+        """Flush, fsync and stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        with self._io_lock:
+            self._write_pending(fsync=True)
+            self._file.close()
@@ -0,0 +1,129 @@
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+
+# Logger của server: sự kiện kết nối / lỗi, và log từng request (có thể lấy mẫu hoặc tắt)
+server_log = logging.getLogger('dictionary.server')
+request_log = logging.getLogger('dictionary.request')
+
+LOG_QUEUE_SIZE = 10000  # Hàng đợi đầy thì bỏ record (và đếm) thay vì chặn request
+LOG_BATCH_SIZE = 500  # Số record tối đa ghi trong một lần write + flush
+TEXT_FORMAT = '[%(asctime)s] %(levelname)s %(message)s'
+DATE_FORMAT = '%H:%M:%S'
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message"""
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: records that do not fit are counted and dropped"""
+
+    def __init__(self, log_queue, metrics=None):
+        super().__init__(log_queue)
+        self.metrics = metrics
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Không format trên thread của request: record được format ở thread ghi log
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.metrics is not None:
+                self.metrics.add('log_dropped')
+
+
+class BatchLogWriter(threading.Thread):
+    """Background thread that formats queued records and writes them in batches"""
+
+    def __init__(self, log_queue, stream, formatter, batch_size=LOG_BATCH_SIZE):
+        super().__init__(name='log-writer', daemon=True)
+        self.queue = log_queue
+        self.stream = stream
+        self.formatter = formatter
+        self.batch_size = batch_size
+
+    def run(self):
+        while True:
+            record = self.queue.get()
+            batch = [record]
+            while record is not None and len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(record)
+            lines = []
+            for item in batch:
+                if item is None:
+                    continue
+                try:
+                    lines.append(self.formatter.format(item))
+                except Exception as e:
+                    lines.append(f"✗ Bad log record {item.msg!r}: {e}")
+            if lines:
+                try:
+                    self.stream.write('\n'.join(lines) + '\n')
+                    self.stream.flush()
+                except (OSError, ValueError):
+                    pass  # stdout đã đóng
+            if batch[-1] is None:
+                return
+
+    def stop(self):
+        """Write what is still queued, then end the thread"""
+        self.queue.put(None)
+        self.join()
+
+
+class RequestSampler(logging.Filter):
+    """Let through a fraction `rate` of per-request records (0 = none, 1 = all)"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return self.rate >= 1 or random.random() < self.rate
+
+
+def setup_logging(level='INFO', log_file=None, log_format='text', request_sample=1.0, metrics=None):
+    """Route the server loggers through a bounded queue to a batch writer thread
+
+    Trả về writer; gọi writer.stop() khi tắt để ghi nốt các record còn trong hàng đợi.
+    """
+    formatter = JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT, DATE_FORMAT)
+    stream = open(log_file, 'a', encoding='utf-8') if log_file else sys.stdout
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    handler = DroppingQueueHandler(log_queue, metrics)
+
+    root = logging.getLogger('dictionary')
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    root.propagate = False
+    # rate 0 tắt hẳn log từng request: logger bị vô hiệu nên mỗi lần gọi chỉ tốn một phép kiểm tra
+    request_log.disabled = request_sample <= 0
+    request_log.filters[:] = [RequestSampler(request_sample)] if 0 < request_sample < 1 else []
+
+    writer = BatchLogWriter(log_queue, stream, formatter)
+    writer.start()
+    return writer
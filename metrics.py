@@ -0,0 +1,228 @@
+import collections
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from slowlog import add_stage
+
+# Biên trên của các bucket độ trễ (giây), kiểu 1-2-5 như Prometheus: 10µs ... 10s
+LATENCY_BUCKETS = tuple(m * 10.0 ** e for e in range(-5, 1) for m in (1, 2, 5)) + (10.0,)
+GAUGES = {'connections_active'}
+
+
+def escape_label(value):
+    """Escape a Prometheus label value (backslash, double quote, newline)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with approximate percentiles
+
+    Ghi một giá trị chỉ tốn một lần tìm nhị phân trên ~20 biên và một lock ngắn,
+    đủ rẻ cho đường nóng TRA. Percentile được nội suy tuyến tính trong bucket.
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Bucket cuối: lớn hơn biên cuối
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def observe(self, value):
+        i = bisect_left(self.bounds, value)
+        # acquire/release thay cho `with`: rẻ hơn một chút trên đường nóng
+        self._lock.acquire()
+        self.counts[i] += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+        self._lock.release()
+
+    def percentile(self, p):
+        """Approximate p-th percentile (0-100), 0.0 when empty"""
+        with self._lock:
+            counts = list(self.counts)
+            maximum = self.max
+        count = sum(counts)
+        if not count:
+            return 0.0
+        rank = p / 100 * count
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else maximum
+                return min(lower + (upper - lower) * (rank - seen) / n, maximum)
+            seen += n
+        return maximum
+
+    def summary(self):
+        """Count, mean and percentiles in milliseconds"""
+        count = self.count
+        return {
+            "count": count,
+            "mean_ms": round(self.sum / count * 1000, 3) if count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+    def prometheus(self, name, labels):
+        """Lines of a Prometheus histogram (cumulative buckets, _sum, _count)"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        count = sum(counts)
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.bounds + (float('inf'),), counts):
+            cumulative += n
+            le = '+Inf' if bound == float('inf') else f"{bound:g}"
+            lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{le}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {total}")
+        lines.append(f"{name}_count{suffix} {count}")
+        return lines
+
+
+class Metrics:
+    """Counters and latency histograms of one server process"""
+
+    def __init__(self, commands=()):
+        self.started = time.time()
+        # Chỉ các lệnh này có nhãn riêng; tên lạ từ client gộp vào OTHER để số nhãn không phình ra
+        self.known_commands = frozenset(commands)
+        self.counters = collections.Counter()  # bytes_in, bytes_out, connections_total, connections_active
+        self.commands = {}  # lệnh -> Histogram
+        self.errors = collections.Counter()  # lệnh -> số reply ERROR
+        self.timers = collections.defaultdict(dict)  # loại -> nhãn -> Histogram (lock_wait, lock_hold, save)
+        self._lock = threading.Lock()
+
+    def add(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def observe_command(self, command, seconds, error=False):
+        if command not in self.known_commands:
+            command = 'OTHER'
+        histogram = self.commands.get(command)
+        if histogram is None:
+            with self._lock:
+                histogram = self.commands.setdefault(command, Histogram())
+        histogram.observe(seconds)
+        if error:
+            with self._lock:
+                self.errors[command] += 1
+
+    def timer(self, kind, label):
+        """Histogram for one kind of timing (e.g. lock_wait / 'dictionary'), created on first use"""
+        with self._lock:
+            histogram = self.timers[kind].get(label)
+            if histogram is None:
+                histogram = self.timers[kind][label] = Histogram()
+        return histogram
+
+    def snapshot(self):
+        """Every metric as a JSON-ready dict"""
+        with self._lock:
+            counters = dict(self.counters)
+            errors = dict(self.errors)
+            commands = dict(self.commands)
+            timers = {kind: dict(labels) for kind, labels in self.timers.items()}
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "counters": counters,
+            "commands": {c: dict(h.summary(), errors=errors.get(c, 0)) for c, h in sorted(commands.items())},
+            "timers": {kind: {label: h.summary() for label, h in sorted(labels.items())}
+                       for kind, labels in sorted(timers.items())},
+        }
+
+    def prometheus(self, prefix='dictionary_', gauges=None):
+        """Prometheus text exposition format; `gauges` adds extra name -> value gauges"""
+        with self._lock:
+            counters = dict(self.counters)
+            errors = dict(self.errors)
+            commands = dict(self.commands)
+            timers = {kind: dict(labels) for kind, labels in self.timers.items()}
+        lines = [f"# TYPE {prefix}uptime_seconds gauge", f"{prefix}uptime_seconds {time.time() - self.started:.1f}"]
+        for name, value in sorted(dict(counters, **(gauges or {})).items()):
+            kind = 'counter' if name in counters and name not in GAUGES else 'gauge'
+            metric = f"{prefix}{name}_total" if kind == 'counter' else f"{prefix}{name}"
+            lines += [f"# TYPE {metric} {kind}", f"{metric} {value}"]
+        lines.append(f"# TYPE {prefix}command_seconds histogram")
+        for command, histogram in sorted(commands.items()):
+            lines += histogram.prometheus(f"{prefix}command_seconds", f'command="{escape_label(command)}"')
+        lines.append(f"# TYPE {prefix}command_errors_total counter")
+        for command, count in sorted(errors.items()):
+            lines.append(f'{prefix}command_errors_total{{command="{escape_label(command)}"}} {count}')
+        for kind, labels in sorted(timers.items()):
+            lines.append(f"# TYPE {prefix}{kind}_seconds histogram")
+            for label, histogram in sorted(labels.items()):
+                lines += histogram.prometheus(f"{prefix}{kind}_seconds", f'name="{escape_label(label)}"')
+        return '\n'.join(lines) + '\n'
+
+
+class InstrumentedLock:
+    """threading.Lock that records how long callers wait for it and hold it
+
+    Thời gian chờ cũng được cộng vào trace của request hiện tại (SLOWLOG).
+    """
+
+    def __init__(self, name, metrics):
+        self._lock = threading.Lock()
+        self._wait = metrics.timer('lock_wait', name)
+        self._hold = metrics.timer('lock_hold', name)
+        self._acquired_at = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self._acquired_at = now = time.perf_counter()
+            self._wait.observe(now - start)
+            add_stage('lock_wait', now - start)
+        return acquired
+
+    def release(self):
+        held = time.perf_counter() - self._acquired_at
+        self._lock.release()
+        self._hold.observe(held)
+
+    def locked(self):
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def start_http_exporter(address, render):
+    """Serve `render()` as text at http://address/metrics in a background thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Prometheus scrape định kỳ, không in log
+
+    httpd = ThreadingHTTPServer(address, Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
@@ -0,0 +1,106 @@
+class PendingStore:
+    """Pending requests keyed by a monotonic id, with secondary indexes
+
+    ID là số tăng dần ("1", "2", ...) nên hai yêu cầu gửi cùng giây không ghi đè
+    nhau; ID cũ dạng word_timestamp trong pending.json vẫn được giữ nguyên.
+    Các index phụ (theo từ, người gửi, loại) là dict id -> None nên vẫn giữ thứ
+    tự gửi, cho phép lọc và phân trang mà không quét cả hàng đợi.
+
+    Không tự khoá: server chỉ dùng store khi đang giữ pending_lock.
+    """
+
+    INDEXED_FIELDS = ('word', 'username', 'type')
+
+    def __init__(self, requests=None, next_id=1):
+        self.requests = {}
+        self.indexes = {field: {} for field in self.INDEXED_FIELDS}
+        self.by_content = {}  # (type, word, nghĩa mới) -> id, phát hiện gửi trùng
+        self.next_id = next_id
+        self.revision = 0  # Tăng mỗi lần thêm / xoá, để biết có cần ghi lại pending.json
+        for request_id, request in (requests or {}).items():
+            self.add(request, request_id)
+
+    def __len__(self):
+        return len(self.requests)
+
+    def __contains__(self, request_id):
+        return request_id in self.requests
+
+    def __iter__(self):
+        return iter(self.requests)
+
+    def __getitem__(self, request_id):
+        return self.requests[request_id]
+
+    def __delitem__(self, request_id):
+        self.pop(request_id)
+
+    def items(self):
+        return self.requests.items()
+
+    def to_dict(self):
+        return dict(self.requests)
+
+    @staticmethod
+    def content_key(request):
+        meaning = request['meaning'] if request['type'] == 'add' else request['new_meaning']
+        return request['type'], request['word'], meaning
+
+    def add(self, request, request_id=None):
+        """Store a request under `request_id` (or a new id), return the id"""
+        if request_id is None:
+            request_id = str(self.next_id)
+        if request_id.isdigit():
+            self.next_id = max(self.next_id, int(request_id) + 1)
+        if request_id in self.requests:
+            self.pop(request_id)
+        self.requests[request_id] = request
+        for field in self.INDEXED_FIELDS:
+            self.indexes[field].setdefault(request[field], {})[request_id] = None
+        self.by_content[self.content_key(request)] = request_id
+        self.revision += 1
+        return request_id
+
+    def pop(self, request_id, default=None):
+        """Remove and return a request (default if unknown)"""
+        request = self.requests.pop(request_id, None)
+        if request is None:
+            return default
+        for field in self.INDEXED_FIELDS:
+            ids = self.indexes[field][request[field]]
+            del ids[request_id]
+            if not ids:
+                del self.indexes[field][request[field]]
+        key = self.content_key(request)
+        if self.by_content.get(key) == request_id:
+            del self.by_content[key]
+        self.revision += 1
+        return request
+
+    def submission_key(self, request_id):
+        """Sort key putting ids in submission order (legacy word_timestamp ids first)"""
+        if request_id.isdigit():
+            return 1, int(request_id)
+        return 0, self.requests[request_id]['timestamp'], request_id
+
+    def find_duplicate(self, request):
+        """Id of a pending request with the same type, word and meaning, or None"""
+        return self.by_content.get(self.content_key(request))
+
+    def query(self, word=None, username=None, type=None, before=None):
+        """Yield (id, request) matching every given filter, in submission order"""
+        filters = {field: value for field, value in
+                   (('word', word), ('username', username), ('type', type)) if value is not None}
+        if filters:
+            # Duyệt index nhỏ nhất, kiểm tra các điều kiện còn lại trên từng yêu cầu
+            candidates = min((self.indexes[f].get(v, {}) for f, v in filters.items()), key=len)
+        else:
+            candidates = self.requests
+        for request_id in candidates:
+            request = self.requests[request_id]
+            if any(request[f] != v for f, v in filters.items()):
+                continue
+            # timestamp dạng 'YYYY-MM-DD HH:MM:SS' nên so sánh chuỗi là đủ ('2024-05-01' cũng được)
+            if before is not None and request['timestamp'] >= before:
+                continue
+            yield request_id, request
@@ -0,0 +1,324 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from events import RESYNC_EVENT, TOPICS, Subscription
+from logs import setup_logging
+from server_auth import DictionaryServer
+from slowlog import add_stage
+from snapshot import DictionarySnapshot
+from sstable import SSTABLE_SUFFIX, SSTable
+
+# Lệnh cần trạng thái chỉ writer có (hàng đợi duyệt, journal): worker chuyển tiếp nguyên văn
+FORWARDED_COMMANDS = {'THEM', 'SUA', 'PENDING', 'APPROVE', 'REJECT', 'APPROVE_BATCH', 'REJECT_BATCH'}
+FOLLOW_TIMEOUT = 1.0  # Giây; writer kiểm tra version và gửi heartbeat khi không có event
+READ_YOUR_WRITES_TIMEOUT = 1.0
+
+
+class WriterService:
+    """Internal endpoint the read workers use to reach the writer process
+
+    Chạy trong tiến trình chính (writer duy nhất giữ journal và hàng đợi duyệt);
+    replica (replication.py) cũng nối vào đây qua mạng. Mỗi kết nối là một
+    multiprocessing Connection có xác thực bằng authkey, nhận các tin nhắn:
+      ('request', request, role, username) -> (version, response)
+      ('bootstrap', full)                  -> trạng thái để dựng snapshot
+      ('follow', version, name)            -> luồng ('changes', version, changes) /
+                                              ('event', message) / ('heartbeat', version)
+    """
+
+    def __init__(self, server, address=('127.0.0.1', 0), authkey=None):
+        self.server = server
+        self.authkey = authkey or os.urandom(32)
+        self.listener = Listener(address, authkey=self.authkey)
+        self.address = self.listener.address
+        self.followers = {}  # id -> {"name", "address", "version"} của các worker / replica đang theo dõi
+        self._followers_lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def close(self):
+        self.listener.close()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except AuthenticationError:
+                continue
+            except OSError:
+                return  # Listener đã đóng
+            address = self.listener.last_accepted
+            threading.Thread(target=self._serve, args=(conn, address), daemon=True).start()
+
+    def _serve(self, conn, address):
+        try:
+            while True:
+                message = conn.recv()
+                if message[0] == 'request':
+                    _, request, role, username = message
+                    try:
+                        response = self.server.process_request(request, role, username)
+                    except Exception as e:
+                        response = f"ERROR|Internal error: {e}"
+                    # Version sau khi ghi: worker chờ snapshot của nó theo kịp rồi mới trả lời client
+                    conn.send((self.server.snapshot.version, response))
+                elif message[0] == 'bootstrap':
+                    conn.send(self.bootstrap(message[1]))
+                elif message[0] == 'follow':
+                    self._follow(conn, message[1], message[2], address)
+                    return
+        except (EOFError, OSError):
+            pass  # Worker đã thoát
+        finally:
+            conn.close()
+
+    def bootstrap(self, full=False):
+        """Current dictionary state for a new worker or replica
+
+        Với file .sst worker tự mmap file (các tiến trình dùng chung page cache),
+        writer chỉ gửi các thay đổi nằm trong bộ nhớ; với JSON, hoặc khi bên kia
+        không đọc được file (full=True, replica ở máy khác), thì gửi cả từ điển.
+        """
+        snapshot = self.server.snapshot
+        full = full or isinstance(snapshot.base, dict)
+        if full:
+            words = snapshot.to_dict()
+        else:
+            words = dict(snapshot.overlay)
+            words.update(snapshot.delta)
+        return {'version': snapshot.version, 'full': full, 'words': words}
+
+    def _follow(self, conn, version, name, address):
+        """Stream dictionary changes and pending-queue events to one follower"""
+        wake = threading.Event()
+        subscription = Subscription(TOPICS, wake.set)
+        follower = {"name": name, "address": f"{address[0]}:{address[1]}", "version": version}
+        with self._followers_lock:
+            self.followers[id(follower)] = follower
+        self.server.events.subscribe(subscription)
+        try:
+            while True:
+                if self.server.snapshot.version != version:
+                    version, changes = self.server.collect_changes(version)
+                    conn.send(('changes', version, changes))
+                    follower['version'] = version
+                for message in subscription.drain():
+                    # Event từ điển đã có trong 'changes', worker tự phát lại cho client của nó
+                    if not message.startswith('EVENT|dict|'):
+                        conn.send(('event', message))
+                if not wake.wait(FOLLOW_TIMEOUT):
+                    # Không có gì mới: heartbeat cho bên kia đo độ trễ, và để phát hiện kết nối chết
+                    conn.send(('heartbeat', self.server.snapshot.version))
+                wake.clear()
+        finally:
+            self.server.events.unsubscribe(subscription)
+            with self._followers_lock:
+                del self.followers[id(follower)]
+
+    def status(self):
+        """Followers with how many versions each one is behind"""
+        version = self.server.snapshot.version
+        with self._followers_lock:
+            followers = [dict(f) for f in self.followers.values()]
+        for follower in followers:
+            follower['lag_versions'] = version - follower['version']
+        return followers
+
+
+class ReadWorkerMixin:
+    """Serve reads from a local snapshot and forward writes to the writer process
+
+    Worker không có journal hay hàng đợi: khởi động bằng 'bootstrap' rồi nhận các
+    thay đổi qua 'follow' và publish chúng với đúng version của writer, nên
+    CHANGES / LIST|if_version cho cùng kết quả dù client kết nối vào tiến trình nào.
+    """
+
+    role = 'worker'
+    full_bootstrap = False  # True: luôn nhận cả từ điển thay vì tự mmap file .sst
+
+    def __init__(self, *args, writer_address, authkey, **kwargs):
+        self.writer_address = writer_address
+        self.authkey = authkey
+        self._writer_conns = threading.local()  # Mỗi thread một kết nối tới writer
+        self._version_changed = threading.Condition()
+        self.writer_version = 0  # Version mới nhất writer đã báo
+        self.last_contact = time.monotonic()
+        self.connected = False
+        kwargs.setdefault('reuse_port', True)
+        super().__init__(*args, **kwargs)
+
+    def call_writer(self, message):
+        conn = getattr(self._writer_conns, 'conn', None)
+        if conn is not None:
+            try:
+                conn.send(message)
+                return conn.recv()
+            except (EOFError, OSError):
+                # Kết nối cũ đã chết (writer khởi động lại): nối lại và gửi lại một lần
+                conn.close()
+        self._writer_conns.conn = None
+        conn = Client(self.writer_address, authkey=self.authkey)
+        try:
+            conn.send(message)
+            response = conn.recv()
+        except (EOFError, OSError):
+            conn.close()
+            raise
+        self._writer_conns.conn = conn
+        return response
+
+    def load_data(self):
+        self.snapshot = self.bootstrap()
+        self._changes_floor = self.snapshot.version
+        if self.search_indexes:
+            threading.Thread(target=self.build_search_indexes, args=(self.snapshot,), daemon=True).start()
+        else:
+            self.indexes_ready.set()
+        threading.Thread(target=self._follow_writer, args=(self.snapshot.version,), daemon=True).start()
+
+    def bootstrap(self):
+        """Build a snapshot from the writer's current state"""
+        # Mở file trước khi hỏi writer: file khi đó không thể mới hơn trạng thái writer trả về
+        use_file = self.dict_file.endswith(SSTABLE_SUFFIX) and not self.full_bootstrap
+        table = SSTable(self.dict_file) if use_file else None
+        state = self.call_writer(('bootstrap', self.full_bootstrap))
+        if state['full']:
+            if table is not None:
+                table.close()
+            return DictionarySnapshot(state['words'], version=state['version'])
+        return DictionarySnapshot(table, version=state['version'], overlay=state['words'])
+
+    def follower_name(self):
+        return f"worker {os.getpid()}"
+
+    def _follow_writer(self, version):
+        while True:
+            try:
+                conn = Client(self.writer_address, authkey=self.authkey)
+                # Nối lại thì theo dõi tiếp từ snapshot hiện có
+                conn.send(('follow', self.snapshot.version, self.follower_name()))
+                self.connected = True
+                while True:
+                    message = conn.recv()
+                    self.last_contact = time.monotonic()
+                    if message[0] == 'event':
+                        self.relay_event(message[1])
+                    elif message[0] == 'heartbeat':
+                        self.writer_version = max(self.writer_version, message[1])
+                    else:
+                        self.apply_changes(message[1], message[2])
+            except (EOFError, OSError) as e:
+                self.connected = False
+                self.writer_lost(e)
+
+    def writer_lost(self, error):
+        """Called when the follow connection drops; return to reconnect"""
+        # Không còn writer thì cũng không còn ai nhận lệnh ghi: dừng worker
+        print(f"✗ Worker {os.getpid()} lost the writer process, exiting")
+        os._exit(1)
+
+    def apply_changes(self, version, changes):
+        """Publish the writer's changes up to `version` (None: reload everything)"""
+        if changes is None:
+            # Worker tụt quá xa so với change log của writer: dựng lại snapshot
+            # (kể cả khi version nhỏ hơn: writer đã khởi tạo lại dữ liệu)
+            snapshot = self.bootstrap()
+            with self.lock:
+                self.snapshot = snapshot
+                self.changes.clear()
+                self._changes_floor = snapshot.version
+            self.writer_version = max(self.writer_version, snapshot.version)
+            self.events.publish('dict', 'resync', RESYNC_EVENT)
+            if self.search_indexes:
+                self.build_search_indexes(snapshot)
+        else:
+            with self.lock:
+                # Writer có thể gửi lại thay đổi cũ hơn snapshot (sau khi dựng lại): bỏ qua
+                if version > self.snapshot.version:
+                    self.publish({c['word']: c['meaning'] for c in changes}, version)
+            self.writer_version = max(self.writer_version, version)
+        with self._version_changed:
+            self._version_changed.notify_all()
+
+    def relay_event(self, message):
+        """Re-publish a pending-queue event from the writer to local subscribers"""
+        if message == RESYNC_EVENT:
+            self.events.publish('pending', 'resync', message)
+            return
+        _, topic, body = message.split('|', 2)
+        event = json.loads(body)
+        self.events.publish(topic, event['id'] if 'id' in event else event['item']['id'], message)
+
+    def wait_for_version(self, version, timeout=READ_YOUR_WRITES_TIMEOUT):
+        with self._version_changed:
+            self._version_changed.wait_for(lambda: self.snapshot.version >= version, timeout)
+
+    def execute_request(self, request, role, username):
+        if request.split('|', 1)[0].upper() not in FORWARDED_COMMANDS:
+            return super().execute_request(request, role, username)
+        start = time.perf_counter()
+        try:
+            version, response = self.call_writer(('request', request, role, username))
+        except (EOFError, OSError):
+            return "ERROR|Writer unavailable, try again later"
+        # Client vừa APPROVE rồi TRA ngay phải thấy từ mới dù đọc ở worker này
+        self.wait_for_version(version)
+        add_stage('forward', time.perf_counter() - start)
+        return response
+
+    def replication_status(self):
+        status = super().replication_status()
+        status.update({
+            "role": self.role,
+            "writer": f"{self.writer_address[0]}:{self.writer_address[1]}",
+            "connected": self.connected,
+            "writer_version": self.writer_version,
+            "lag_versions": max(0, self.writer_version - self.snapshot.version),
+            "last_contact_seconds": round(time.monotonic() - self.last_contact, 1),
+        })
+        return status
+
+    def print_banner(self, engine):
+        print(f"✓ Worker {os.getpid()} serving {len(self.snapshot)} words on {self.host}:{self.port} ({engine})")
+
+    def shutdown(self):
+        # Không có journal để compact: chỉ chờ các request đang chạy
+        self.executor.shutdown(wait=True)
+
+
+def with_engine(mixin, engine):
+    """Server class combining `mixin` with the threads or asyncio engine"""
+    if engine == 'asyncio':
+        from async_server import AsyncDictionaryServer as engine_class
+    else:
+        engine_class = DictionaryServer
+    return type(mixin.__name__.replace('Mixin', ''), (mixin, engine_class), {})
+
+
+def run_worker(engine, options, writer_address, authkey, log_options):
+    """Entry point of a worker process"""
+    server = with_engine(ReadWorkerMixin, engine)(writer_address=writer_address, authkey=authkey, **options)
+    log_writer = setup_logging(metrics=server.metrics, **log_options)
+    try:
+        server.start()
+    finally:
+        log_writer.stop()
+
+
+def start_workers(count, engine, options, service, log_options):
+    """Spawn `count` read workers listening on the writer's port"""
+    # spawn thay vì fork: tiến trình chính đã có nhiều thread (journal, compactor...)
+    context = multiprocessing.get_context('spawn')
+    workers = []
+    for _ in range(count):
+        process = context.Process(target=run_worker, args=(engine, options, service.address, service.authkey, log_options),
+                                  daemon=True)
+        process.start()
+        workers.append(process)
+    return workers
@@ -0,0 +1,229 @@
+import queue
+import socket
+import struct
+import threading
+from concurrent.futures import Future
+
+# Framed protocol: mỗi message = header 8 byte (độ dài payload, request id) + payload UTF-8.
+# Chế độ này được thương lượng trong bước WELCOME/LOGIN, client cũ vẫn dùng text thuần.
+FRAMED_FLAG = 'FRAMED'
+HEADER = struct.Struct('!II')
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+PUSH_ID = 0  # Request id dành riêng cho message server tự đẩy về
+
+
+class ProtocolError(Exception):
+    """Raised when the peer sends a malformed frame"""
+
+
+def encode_frame(request_id, payload):
+    """Build a frame from a request id and a str/bytes payload"""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    return HEADER.pack(len(payload), request_id) + payload
+
+
+def recv_exact(sock, size):
+    """Read exactly `size` bytes, return None if the connection closes first"""
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(min(size - len(buf), 1 << 20))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_header(sock):
+    """Read one frame header, return (payload length, request_id) or None on EOF"""
+    header = recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    length, request_id = HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Frame too large ({length} bytes)")
+    return length, request_id
+
+
+def recv_frame(sock):
+    """Read one frame, return (request_id, payload bytes) or None on EOF"""
+    header = recv_header(sock)
+    if header is None:
+        return None
+    length, request_id = header
+    payload = recv_exact(sock, length)
+    if payload is None:
+        return None
+    return request_id, payload
+
+
+def send_frame(sock, request_id, payload):
+    """Send one frame, return its size in bytes"""
+    frame = encode_frame(request_id, payload)
+    sock.sendall(frame)
+    return len(frame)
+
+
+def is_stream_end(message):
+    """True for the last message of a streamed reply (*_END header or ERROR)"""
+    header = message.split('|', 1)[0]
+    return header.endswith('_END') or header == 'ERROR'
+
+
+class FramedClient:
+    """Client connection supporting pipelined requests
+
+    Nếu server không hỗ trợ FRAMED thì tự động quay về chế độ text cũ
+    (mỗi lần một request, không pipelining).
+    """
+
+    def __init__(self, host, port, timeout=10):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.welcome = self.sock.recv(1024).decode('utf-8')
+        self.framed = FRAMED_FLAG in self.welcome.split('|')[2:]
+        self.on_push = None
+        self.on_close = None  # Gọi (từ thread đọc) khi kết nối FRAMED bị đóng, vì bất kỳ lý do gì
+        self.token = None  # Token phiên server cấp khi đăng nhập
+        self._next_id = 1
+        self._waiting = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._reader = None
+        self._closed = False
+
+    @property
+    def closed(self):
+        """True once the framed reader has stopped (server closed the connection, network error...)"""
+        return self._closed
+
+    def login(self, username, password):
+        """Send LOGIN and return the server's reply"""
+        return self._authenticate(f"LOGIN|{username}|{password}")
+
+    def resume(self, token):
+        """Send RESUME with a session token from an earlier login, return the reply"""
+        return self._authenticate(f"RESUME|{token}")
+
+    def _authenticate(self, message):
+        if self.framed:
+            message += f"|{FRAMED_FLAG}"
+        self.sock.send(message.encode('utf-8'))
+        resp = self.sock.recv(1024).decode('utf-8')
+        if resp.startswith("SUCCESS"):
+            # SUCCESS|role|message|token: token dùng cho RESUME khi kết nối lại
+            fields = resp.split('|')
+            self.token = fields[3] if len(fields) > 3 else None
+            if self.framed:
+                self.sock.settimeout(None)
+                self._reader = threading.Thread(target=self._read_loop, daemon=True)
+                self._reader.start()
+        return resp
+
+    def submit(self, data):
+        """Send a request without waiting, return a Future for the reply"""
+        future = Future()
+        if not self.framed:
+            try:
+                self.sock.send(data.encode('utf-8'))
+                future.set_result(self.sock.recv(65536).decode('utf-8'))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self._send(data, self._waiting, future)
+        return future
+
+    def _send(self, data, registry, waiter):
+        """Register `waiter` under a new request id and send the frame"""
+        with self._lock:
+            if self._closed:
+                raise ConnectionError("Connection closed")
+            request_id = self._next_id
+            self._next_id = self._next_id % 0xFFFFFFFF + 1
+            registry[request_id] = waiter
+        try:
+            with self._send_lock:
+                send_frame(self.sock, request_id, data)
+        except Exception:
+            with self._lock:
+                registry.pop(request_id, None)
+            raise
+
+    def request(self, data, timeout=None):
+        """Send a request and wait for its reply"""
+        return self.submit(data).result(timeout)
+
+    def stream(self, data, timeout=None):
+        """Send a streaming request (e.g. LIST|stream), yield each reply message
+
+        Dừng sau message kết thúc (header dạng *_END) hoặc ERROR.
+        """
+        if not self.framed:
+            yield self.request(data, timeout)
+            return
+        messages = queue.Queue()
+        self._send(data, self._streams, messages)
+        while True:
+            message = messages.get(timeout=timeout)
+            if isinstance(message, Exception):
+                raise message
+            yield message
+            if is_stream_end(message):
+                break
+
+    def pipeline(self, requests, timeout=None):
+        """Send many requests back to back, return replies in request order"""
+        futures = [self.submit(data) for data in requests]
+        return [f.result(timeout) for f in futures]
+
+    def _read_loop(self):
+        error = ConnectionError("Connection closed by server")
+        try:
+            while True:
+                frame = recv_frame(self.sock)
+                if frame is None:
+                    break
+                request_id, payload = frame
+                text = payload.decode('utf-8')
+                if request_id == PUSH_ID:
+                    if self.on_push:
+                        self.on_push(text)
+                    continue
+                with self._lock:
+                    future = self._waiting.pop(request_id, None)
+                    stream = self._streams.get(request_id)
+                    if stream is not None and is_stream_end(text):
+                        del self._streams[request_id]
+                if future:
+                    future.set_result(text)
+                elif stream is not None:
+                    stream.put(text)
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                self._closed = True
+                waiting, self._waiting = self._waiting, {}
+                streams, self._streams = self._streams, {}
+            for future in waiting.values():
+                future.set_exception(error)
+            for stream in streams.values():
+                stream.put(error)
+            if self.on_close:
+                self.on_close()
+
+    def close(self):
+        """Send QUIT (best effort) and close the socket"""
+        try:
+            if self.framed:
+                with self._send_lock:
+                    send_frame(self.sock, self._next_id, "QUIT")
+            else:
+                self.sock.send("QUIT".encode('utf-8'))
+        except Exception:
+            pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except Exception:
+            pass
+        self.sock.close()
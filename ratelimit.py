@@ -0,0 +1,74 @@
+import collections
+import threading
+import time
+
+# Lệnh ghi dùng ngân sách riêng: mỗi lệnh giữ pending_lock và chờ ghi journal
+WRITE_COMMANDS = {'THEM', 'SUA', 'APPROVE', 'REJECT', 'APPROVE_BATCH', 'REJECT_BATCH'}
+BURST_SECONDS = 2.0  # Bucket chứa tối đa lượng token của 2 giây: cho phép một đợt ngắn
+MAX_TRACKED_USERS = 10000  # Giới hạn số bucket theo user, bỏ bucket lâu không dùng nhất
+# Hạn mức mặc định của server chạy từ dòng lệnh (tạo DictionaryServer trực tiếp thì không giới hạn)
+DEFAULT_USER_WRITE_RATE = 10
+DEFAULT_GLOBAL_WRITE_RATE = 200
+
+
+class RateLimiter:
+    """Token buckets (rate per second) keyed by an id, in bounded memory
+
+    Mỗi key chỉ tốn [tokens, thời điểm cập nhật]; quá `max_keys` thì bucket ít dùng
+    nhất bị bỏ (key đó được coi như có bucket đầy khi quay lại).
+    """
+
+    def __init__(self, rate, burst_seconds=BURST_SECONDS, max_keys=MAX_TRACKED_USERS):
+        self.rate = rate
+        self.burst = max(1.0, rate * burst_seconds)
+        self.max_keys = max_keys
+        self._buckets = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key=None):
+        """Spend one token of `key`'s bucket; 0.0 if allowed, else seconds until one is free"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return 0.0
+            bucket[0] = tokens
+            return (1 - tokens) / self.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class AdmissionControl:
+    """Per-user and global request budgets, separate for reads and writes (0 = unlimited)
+
+    Kiểm tra bucket của user trước: request bị từ chối vì user vượt hạn mức thì
+    không tiêu token của ngân sách chung, nên một script quá tải không làm người
+    khác bị chặn theo.
+    """
+
+    def __init__(self, user_read=0, user_write=0, global_read=0, global_write=0):
+        self.limits = {"user_read": user_read, "user_write": user_write,
+                       "global_read": global_read, "global_write": global_write}
+        self.user = {'read': RateLimiter(user_read), 'write': RateLimiter(user_write)}
+        self.overall = {'read': RateLimiter(global_read), 'write': RateLimiter(global_write)}
+        self.enabled = any(rate > 0 for rate in self.limits.values())
+
+    def check(self, username, command):
+        """0.0 to admit the request, else the suggested retry delay in seconds"""
+        kind = 'write' if command in WRITE_COMMANDS else 'read'
+        return self.user[kind].take(username) or self.overall[kind].take()
+
+    def status(self):
+        return dict(self.limits, tracked_users=len(self.user['read']) + len(self.user['write']))
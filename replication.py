@@ -0,0 +1,57 @@
+import time
+
+from logs import server_log
+from prefork import ReadWorkerMixin
+
+RECONNECT_DELAY = 2.0  # Giây chờ trước khi nối lại primary
+
+
+def parse_address(value):
+    """'host:port' -> (host, port)"""
+    host, sep, port = value.rpartition(':')
+    if not sep or not port.isdigit():
+        raise ValueError(f"Expected host:port, got '{value}'")
+    return host or 'localhost', int(port)
+
+
+class ReplicaMixin(ReadWorkerMixin):
+    """Copy of a primary server that serves reads locally and forwards writes
+
+    Giống worker của --workers nhưng nối tới primary qua TCP (--replication-port
+    của primary, xác thực bằng khoá chung): tải toàn bộ từ điển một lần rồi nhận
+    các thay đổi kèm version của primary. Mất kết nối thì vẫn phục vụ dữ liệu cũ
+    và tự nối lại; REPLICATION cho biết replica đang chậm bao nhiêu version.
+    """
+
+    role = 'replica'
+    full_bootstrap = True  # File từ điển của primary có thể ở máy khác
+
+    def load_data(self):
+        while True:
+            try:
+                return super().load_data()
+            except (EOFError, OSError) as e:
+                print(f"✗ Primary {self.primary_label()} unavailable ({e}), retrying in {RECONNECT_DELAY}s")
+                time.sleep(RECONNECT_DELAY)
+
+    def primary_label(self):
+        return f"{self.writer_address[0]}:{self.writer_address[1]}"
+
+    def follower_name(self):
+        return f"replica {self.host}:{self.port}"
+
+    def writer_lost(self, error):
+        server_log.warning("Lost primary %s (%r), serving version %s and retrying in %ss",
+                           self.primary_label(), error, self.snapshot.version, RECONNECT_DELAY)
+        time.sleep(RECONNECT_DELAY)
+
+    def print_banner(self, engine):
+        print(f"\n{'='*60}")
+        print(f"📖 Dictionary Replica Started (v2.0)")
+        print(f"{'='*60}")
+        print(f"Engine: {engine}")
+        print(f"Host: {self.host}")
+        print(f"Port: {self.port}")
+        print(f"Primary: {self.primary_label()}")
+        print(f"Words in dictionary: {len(self.snapshot)} (version {self.snapshot.version})")
+        print(f"\nWaiting for connections...\n")
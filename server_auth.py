@@ -1,30 +1,180 @@
+import argparse
+import collections
+import itertools
+import base64
 import socket
+import sys
 import threading
+import time
 import json
 import os
+import queue
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from auth import SESSION_TTL, SessionTokens, load_secret, load_users, verify_password
+from events import ADMIN_TOPICS, TOPICS, EventBus, Subscription
+from indexes import FuzzyIndex, InvertedIndex
+from journal import CHECKPOINT_OP, SYNC_POLICIES, Journal, JournalWriteError
+from logs import request_log, server_log, setup_logging
+from metrics import InstrumentedLock, Metrics, start_http_exporter
+from pending_store import PendingStore
+from protocol import FRAMED_FLAG, HEADER, PUSH_ID, encode_frame, recv_exact, recv_header
+from ratelimit import DEFAULT_GLOBAL_WRITE_RATE, DEFAULT_USER_WRITE_RATE, AdmissionControl
+from slowlog import DEFAULT_SLOWLOG_SIZE, DEFAULT_SLOWLOG_THRESHOLD_MS, RequestTrace, SlowLog, add_stage, current_trace
+from snapshot import DictionarySnapshot
+from sstable import SSTABLE_SUFFIX, SSTable, write_sstable
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+DEFAULT_PREFIX_LIMIT = 20
+DEFAULT_SEARCH_LIMIT = 20
+DEFAULT_CHUNK_SIZE = 500
+SUGGESTION_LIMIT = 5
+MAX_WORD_LENGTH = 50  # Từ dài hơn không thể có trong từ điển (validate_input)
+MAX_BATCH_SIZE = 10000
+CHANGE_LOG_SIZE = 10000  # Số thay đổi gần nhất giữ lại cho CHANGES
+# Lệnh chỉ đọc snapshot, nhanh và không bao giờ chờ lock/I/O
+SNAPSHOT_READ_COMMANDS = {'TRA', 'TRA_BATCH', 'PREFIX', 'RANGE'}
+# Mọi lệnh của giao thức: tên khác bị gộp thành OTHER trong số liệu
+COMMANDS = SNAPSHOT_READ_COMMANDS | {
+    'LIST', 'TIM', 'CHANGES', 'PENDING', 'THEM', 'SUA', 'APPROVE', 'REJECT', 'APPROVE_BATCH', 'REJECT_BATCH',
+    'REPLICATION', 'STATS', 'SLOWLOG', 'SUBSCRIBE', 'UNSUBSCRIBE', 'QUIT'}
+LOG_PREVIEW = 200  # Số ký tự tối đa của request được in ra log
+# Cắt request bằng %.Ns: việc cắt chuỗi chỉ diễn ra ở thread ghi log
+REQUEST_LOG_MESSAGE = f"Client #%s %s (%s): %.{LOG_PREVIEW}s"
+FRAMED_REQUEST_LOG_MESSAGE = f"Client #%s %s (%s) #%s: %.{LOG_PREVIEW}s"
+MAX_CHUNK_SIZE = 5000
+
+
+def parse_options(arg_string):
+    """Parse request arguments like 'offset=0|limit=50|stream' into a dict"""
+    options = {}
+    for part in arg_string.split('|'):
+        part = part.strip()
+        if not part:
+            continue
+        key, sep, value = part.partition('=')
+        options[key.strip().lower()] = value.strip() if sep else True
+    return options
+
+
+def int_option(options, key, default, maximum):
+    """Read a positive int option clamped to `maximum`, raise ValueError if invalid"""
+    value = options.get(key, default)
+    if value is True:
+        raise ValueError(f"Option '{key}' needs a value")
+    value = int(value)
+    if value < 0:
+        raise ValueError(f"Option '{key}' must be positive")
+    return min(value, maximum)
+
+
+def limit_arg(args, index, default):
+    """Read an optional positional limit argument, clamped to MAX_PAGE_SIZE"""
+    if len(args) <= index or not args[index].strip():
+        return default
+    value = int(args[index])
+    if value < 1:
+        raise ValueError("limit must be at least 1")
+    return min(value, MAX_PAGE_SIZE)
+
+
+def encode_cursor(word):
+    return base64.urlsafe_b64encode(word.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    # validate=True: ký tự lạ là lỗi, không bị bỏ qua âm thầm (sẽ thành trang đầu)
+    return base64.b64decode(cursor.encode('ascii'), altchars=b'-_', validate=True).decode('utf-8')
+
+
+# Trong outbox của kết nối FRAMED: báo thread writer gửi các event đang chờ
+DRAIN_EVENTS = object()
+
+
+def is_stream(response):
+    """True when process_request returned a generator of messages"""
+    return not isinstance(response, (str, bytes))
+
+
+def encode_response(response):
+    """Reply as bytes (process_request may return pre-encoded bytes)"""
+    return response if isinstance(response, bytes) else response.encode('utf-8')
+
+def keep_alive(sock):
+    """Turn on TCP keepalive so the kernel drops subscribers whose peer vanished"""
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    except OSError:
+        pass
+
 
 class DictionaryServer:
-    def __init__(self, host='localhost', port=5555, dict_file='dictionary.json', pending_file='pending.json'):
+    def __init__(self, host='localhost', port=5555, dict_file='dictionary.json', pending_file='pending.json',
+                 worker_threads=16, max_inflight=64, backlog=128, idle_timeout=300,
+                 journal_file='journal.log', compact_every=1000, sync_policy='always', sync_interval_ms=50,
+                 reuse_port=False, slowlog_threshold_ms=DEFAULT_SLOWLOG_THRESHOLD_MS, slowlog_size=DEFAULT_SLOWLOG_SIZE,
+                 users_file='users.json', session_secret=None, session_key_file='session.key', session_ttl=SESSION_TTL,
+                 rate_limits=None, search_indexes=None):
         self.host = host
         self.port = port
+        self.backlog = backlog
+        self.reuse_port = reuse_port  # Cho phép nhiều tiến trình (--workers) cùng nghe một cổng
+        self.idle_timeout = idle_timeout or None  # Giây; 0/None = không giới hạn
         self.dict_file = dict_file
         self.pending_file = pending_file
-        self.dictionary = {}
-        self.pending = {}
-        self.lock = threading.Lock()
-        self.pending_lock = threading.Lock()
+        self.journal_file = journal_file
+        self.compact_every = compact_every
+        self.sync_policy = sync_policy
+        self.sync_interval_ms = sync_interval_ms
+        self.journal = None
+        # Pool xử lý request pipelined của các kết nối FRAMED
+        self.executor = ThreadPoolExecutor(max_workers=worker_threads, thread_name_prefix='request')
+        self.max_inflight = max_inflight
+        # Reader đọc snapshot bất biến không cần lock; APPROVE dựng snapshot mới rồi thay thế
+        self.snapshot = DictionarySnapshot({})
+        self.pending = PendingStore()
+        # Hai index dưới tốn cỡ 3 KB mỗi từ, nhiều hơn cả từ điển: với .sst chỉ dựng khi
+        # được yêu cầu (search_indexes=True), nếu không RSS sẽ không còn nhỏ
+        if search_indexes is None:
+            search_indexes = not dict_file.endswith(SSTABLE_SUFFIX)
+        self.search_indexes = search_indexes
+        # Gợi ý "có phải bạn muốn tìm" khi TRA không thấy; tra ngược Việt -> Anh theo nghĩa (TIM)
+        self.fuzzy_index = FuzzyIndex() if search_indexes else None
+        self.meaning_index = InvertedIndex() if search_indexes else None
+        self.indexes_ready = threading.Event()  # Set khi hai index trên đã dựng xong (hoặc bị tắt)
+        self.metrics = Metrics(COMMANDS)  # Số liệu cho lệnh STATS / --metrics-port
+        self.slow_log = SlowLog(slowlog_threshold_ms, slowlog_size)  # Request chậm kèm thời gian từng giai đoạn (SLOWLOG)
+        # Hạn mức request theo user và toàn server (đọc / ghi riêng); admin không bị giới hạn.
+        # rate_limits=None: không giới hạn (hạn mức mặc định chỉ áp dụng qua dòng lệnh)
+        self.admission = AdmissionControl(**(rate_limits or {}))
+        self.lock = InstrumentedLock('dictionary', self.metrics)  # Chỉ dành cho writer (publish snapshot)
+        # Các thay đổi gần nhất (version, word, meaning, op) cho CHANGES; mọi thay đổi có
+        # version > _changes_floor đều còn trong log
+        self.changes = collections.deque()
+        self._changes_floor = 0
+        # LIST_DATA đã mã hoá sẵn của phiên bản gần nhất: (version, bytes)
+        self._list_cache = None
+        self._list_cache_lock = threading.Lock()
+        self.pending_lock = InstrumentedLock('pending', self.metrics)
+        self.events = EventBus()  # Kết nối FRAMED đăng ký nhận event (SUBSCRIBE)
+        self.writer_services = []  # prefork.WriterService cho worker (--workers) / replica (--replication-port)
         self.client_count = 0
         
-        # User credentials (in production, use hashed passwords and database)
-        self.users = {
-            'admin': {'password': 'admin123', 'role': 'admin'},
-            'user1': {'password': 'user123', 'role': 'user'},
-            'user2': {'password': 'user123', 'role': 'user'}
-        }
+        # Tài khoản với mật khẩu đã hash (PBKDF2 có salt); users.json được tạo với tài khoản demo nếu chưa có
+        self.users_file = users_file
+        self.users = load_users(users_file)
+        # Token phiên ký bằng HMAC: RESUME kiểm tra token mà không cần hash lại mật khẩu
+        self.sessions = SessionTokens(session_secret or load_secret(session_key_file), session_ttl)
         
         self.load_data()
+        
+        # Thread nền gộp journal vào file JSON khi journal đủ dài
+        self._compact_event = threading.Event()
+        self._stopping = False
+        self._compactor = threading.Thread(target=self._compact_loop, daemon=True)
+        self._compactor.start()
     
     def validate_input(self, word, meaning):
         """Validate word and meaning input"""
@@ -33,8 +183,8 @@ class DictionaryServer:
             return False, "Word and meaning cannot be empty"
         
         # Kiểm tra độ dài
-        if len(word) > 50:
-            return False, "Word too long (maximum 50 characters)"
+        if len(word) > MAX_WORD_LENGTH:
+            return False, f"Word too long (maximum {MAX_WORD_LENGTH} characters)"
         if len(meaning) > 500:
             return False, "Meaning too long (maximum 500 characters)"
         
@@ -52,27 +202,41 @@ class DictionaryServer:
         
         return True, "Valid"
         
-    def load_data(self):
-        """Load dictionary and pending requests from files"""
-        # Load dictionary
+    def load_dictionary(self):
+        """Read the dictionary file: a dict for JSON, a lazily read SSTable for .sst"""
         if os.path.exists(self.dict_file):
             try:
-                with open(self.dict_file, 'r', encoding='utf-8') as f:
-                    self.dictionary = json.load(f)
-                print(f"✓ Loaded {len(self.dictionary)} words from {self.dict_file}")
+                if self.dict_file.endswith(SSTABLE_SUFFIX):
+                    # Chỉ mmap file, từ được đọc khi cần nên khởi động gần như tức thì
+                    dictionary = SSTable(self.dict_file)
+                else:
+                    with open(self.dict_file, 'r', encoding='utf-8') as f:
+                        dictionary = json.load(f)
+                print(f"✓ Loaded {len(dictionary)} words from {self.dict_file}")
             except Exception as e:
                 print(f"✗ Error loading dictionary: {e}")
-                self.dictionary = {}
+                dictionary = {}
         else:
-            self.dictionary = {
+            dictionary = {
                 'hello': 'xin chào',
                 'world': 'thế giới',
                 'python': 'ngôn ngữ lập trình Python',
                 'computer': 'máy tính',
                 'network': 'mạng máy tính'
             }
-            self.save_dictionary()
-            print(f"✓ Created new dictionary with {len(self.dictionary)} default words")
+            self.save_dictionary(DictionarySnapshot(dictionary))
+            print(f"✓ Created new dictionary with {len(dictionary)} default words")
+        return dictionary
+    
+    def load_data(self):
+        """Load dictionary and pending requests from files"""
+        dictionary = self.load_dictionary()
+        if isinstance(dictionary, dict):
+            loading, overlay = dictionary, None
+        else:
+            # SSTable chỉ đọc: thay đổi từ journal nằm trong overlay của snapshot
+            overlay = {}
+            loading = collections.ChainMap(overlay, dictionary)
         
         # Load pending requests
         if os.path.exists(self.pending_file):
@@ -81,86 +245,725 @@ class DictionaryServer:
                     data = json.load(f)
                     # Ensure it's a dictionary
                     if isinstance(data, dict):
-                        self.pending = data
+                        self.pending = PendingStore(data)
                     else:
-                        self.pending = {}
+                        self.pending = PendingStore()
                 print(f"✓ Loaded {len(self.pending)} pending requests from {self.pending_file}")
             except Exception as e:
                 print(f"✗ Error loading pending: {e}")
-                self.pending = {}
+                self.pending = PendingStore()
         else:
-            self.pending = {}
+            self.pending = PendingStore()
             self.save_pending()
             print(f"✓ Created new pending file")
+        
+        # Replay journal: các thay đổi sau lần compact gần nhất
+        self.journal = Journal(self.journal_file, self.sync_policy, self.sync_interval_ms / 1000)
+        replayed = 0
+        self._loaded_version = 0
+        self.changes.clear()
+        for record in self.journal.replay():
+            self.apply_record(record, loading)
+            replayed += 1
+        if replayed:
+            print(f"✓ Replayed {replayed} journal records from {self.journal_file}")
+        
+        self.snapshot = DictionarySnapshot(dictionary, version=self._loaded_version, overlay=overlay)
+        if not self.changes:
+            self._changes_floor = self.snapshot.version
+        # Trạng thái đã có trong file JSON: compact bỏ qua file không đổi. Sau khi replay
+        # thì file cũ hơn bộ nhớ nên lần compact đầu tiên luôn ghi cả hai
+        self._saved_version = None if replayed else self.snapshot.version
+        self._saved_pending_revision = None if replayed else self.pending.revision
+        # Index gợi ý / tra ngược dựng ở thread nền để server nhận kết nối ngay
+        if self.search_indexes:
+            threading.Thread(target=self.build_search_indexes, args=(self.snapshot,), daemon=True).start()
+        else:
+            self.indexes_ready.set()
+    
+    def build_search_indexes(self, snapshot):
+        """Fill the fuzzy and meaning indexes from a snapshot (background thread)"""
+        start = time.perf_counter()
+        try:
+            self.fuzzy_index.add_many(word for word, _ in snapshot.iter_items())
+            self.meaning_index.add_missing(snapshot.iter_items())
+            print(f"✓ Built search indexes for {len(snapshot)} words in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            server_log.error("Error building search indexes: %s", e)
+        finally:
+            self.indexes_ready.set()
+    
+    def apply_record(self, record, dictionary):
+        """Apply one journal record to the pending queue and a dictionary being loaded"""
+        op = record.get('op')
+        if op == 'submit':
+            self.pending.add(record['request'], record['id'])
+        elif op == 'approve':
+            change = 'update' if record['word'] in dictionary else 'add'
+            dictionary[record['word']] = record['meaning']
+            self.pending.pop(record['id'], None)
+            version = record.get('version', self._loaded_version + 1)
+            if not self.changes:
+                self._changes_floor = version - 1
+            self.record_change(version, record['word'], record['meaning'], change)
+            self._loaded_version = version
+        elif op == 'reject':
+            self.pending.pop(record['id'], None)
+        elif op == 'approve_batch':
+            version = record['version']
+            if not self.changes:
+                self._changes_floor = version - 1
+            for item in record['items']:
+                change = 'update' if item['word'] in dictionary else 'add'
+                dictionary[item['word']] = item['meaning']
+                self.pending.pop(item['id'], None)
+                self.record_change(version, item['word'], item['meaning'], change)
+            self._loaded_version = version
+        elif op == 'reject_batch':
+            for request_id in record['ids']:
+                self.pending.pop(request_id, None)
+        elif op == CHECKPOINT_OP:
+            self._loaded_version = max(self._loaded_version, record.get('version', 0))
+            # ID đã cấp không bao giờ dùng lại, kể cả khi yêu cầu đã được duyệt và compact
+            self.pending.next_id = max(self.pending.next_id, record.get('next_pending_id', 1))
+    
+    def publish(self, changes, version=None):
+        """Swap in a snapshot with `changes` applied (caller holds self.lock)"""
+        old = self.snapshot
+        self.snapshot = old.with_changes(changes, version)
+        for word, meaning in changes.items():
+            op = 'update' if word in old else 'add'
+            self.record_change(self.snapshot.version, word, meaning, op)
+            self.notify('dict', word, {"op": op, "word": word, "meaning": meaning, "version": self.snapshot.version})
+        # Index phụ cập nhật sau khi publish; reader bỏ qua từ chưa có trong snapshot của nó
+        if not self.search_indexes:
+            return
+        for word, meaning in changes.items():
+            self.fuzzy_index.add(word)
+            self.meaning_index.set(word, meaning)
+    
+    def notify(self, topic, key, event):
+        """Push an event to subscribers (called under the lock that orders the change)"""
+        if len(self.events):
+            self.events.publish(topic, key, f"EVENT|{topic}|{json.dumps(event, ensure_ascii=False)}")
+    
+    def update_subscription(self, subscription, data, role, wakeup):
+        """Handle SUBSCRIBE|topic,... / UNSUBSCRIBE on a framed connection
+
+        Trả về (subscription, response); subscription được tạo ở lần SUBSCRIBE đầu tiên.
+        """
+        command, _, arg = data.partition('|')
+        if command.upper() == 'UNSUBSCRIBE':
+            if subscription is not None:
+                self.events.unsubscribe(subscription)
+            return subscription, "UNSUBSCRIBED"
+        
+        # Không ghi chủ đề: đăng ký mọi chủ đề mà role được phép
+        topics = [t.strip().lower() for t in arg.split(',') if t.strip()]
+        topics = topics or [t for t in TOPICS if role == 'admin' or t not in ADMIN_TOPICS]
+        unknown = [t for t in topics if t not in TOPICS]
+        if unknown:
+            return subscription, f"ERROR|Unknown topic: {','.join(unknown)}"
+        if role != 'admin' and ADMIN_TOPICS.intersection(topics):
+            return subscription, "ERROR|Access denied. Admin only"
+        
+        if subscription is None:
+            subscription = Subscription(topics, wakeup)
+        else:
+            subscription.topics = set(topics)
+        self.events.subscribe(subscription)
+        return subscription, f"SUBSCRIBED|{','.join(topics)}"
+    
+    def record_change(self, version, word, meaning, op):
+        """Append to the bounded change log (caller holds self.lock or is loading)"""
+        self.changes.append((version, word, meaning, op))
+        while len(self.changes) > CHANGE_LOG_SIZE:
+            self._changes_floor = self.changes.popleft()[0]
+    
+    def changes_since(self, since):
+        """CHANGES_DATA with every add/update after version `since`, or RESYNC"""
+        version, changes = self.collect_changes(since)
+        if changes is None:
+            return f"RESYNC|{version}"
+        data = {"version": version, "changes": changes}
+        return f"CHANGES_DATA|{json.dumps(data, ensure_ascii=False)}"
+    
+    def collect_changes(self, since):
+        """(current version, [{word, meaning, op}] after `since`); None instead of a list means resync"""
+        with self.lock:
+            version = self.snapshot.version
+            floor = self._changes_floor
+            log = []
+            if floor <= since < version:
+                # Log xếp theo version: chỉ chép phần sau `since`, duyệt từ cuối (người theo dõi
+                # thường chỉ chậm vài thay đổi) thay vì sao chép cả log dưới lock
+                for change in reversed(self.changes):
+                    if change[0] <= since:
+                        break
+                    log.append(change)
+                log.reverse()
+        
+        if since < floor or since > version:
+            # Client quá cũ (log đã bị cắt) hoặc lạ (server khởi tạo lại): tải lại toàn bộ
+            return version, None
+        
+        latest = {}
+        for change_version, word, meaning, op in log:
+            # Một từ đổi nhiều lần chỉ gửi trạng thái cuối; vẫn là 'add' nếu client chưa có
+            first_op = latest[word]['op'] if word in latest else op
+            latest[word] = {"word": word, "meaning": meaning, "op": first_op}
+        return version, list(latest.values())
+    
+    def log_mutation(self, record):
+        """Append a mutation to the journal (caller holds the matching lock)
+
+        Trả về ticket; gọi self.journal.wait(ticket) sau khi nhả lock.
+        """
+        ticket = self.journal.append(record)
+        if self.journal.entries >= self.compact_every:
+            self._compact_event.set()
+        return ticket
+    
+    def wait_durable(self, ticket):
+        """Wait until the journal record `ticket` is on disk (the request's 'persist' stage)"""
+        start = time.perf_counter()
+        self.journal.wait(ticket)
+        add_stage('persist', time.perf_counter() - start)
     
-    def save_dictionary(self):
-        """Save dictionary data to file"""
+    def write_json_atomic(self, path, data):
+        """Write JSON to a temp file then rename it over `path`"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    
+    def save_dictionary(self, snapshot=None):
+        """Save a dictionary snapshot to file (JSON, or an SSTable for .sst files)"""
+        snapshot = self.snapshot if snapshot is None else snapshot
+        start = time.perf_counter()
         try:
-            with open(self.dict_file, 'w', encoding='utf-8') as f:
-                json.dump(self.dictionary, f, ensure_ascii=False, indent=2)
+            if self.dict_file.endswith(SSTABLE_SUFFIX):
+                write_sstable(self.dict_file, snapshot.iter_items())
+            else:
+                self.write_json_atomic(self.dict_file, snapshot.to_dict())
             return True
         except Exception as e:
-            print(f"✗ Error saving dictionary: {e}")
+            server_log.error("Error saving dictionary: %s", e)
             return False
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.timer('save', 'dictionary').observe(elapsed)
+            add_stage('persist', elapsed)
     
-    def save_pending(self):
+    def save_pending(self, data=None):
         """Save pending requests to file"""
+        start = time.perf_counter()
         try:
-            with open(self.pending_file, 'w', encoding='utf-8') as f:
-                json.dump(self.pending, f, ensure_ascii=False, indent=2)
+            self.write_json_atomic(self.pending_file, self.pending.to_dict() if data is None else data)
             return True
         except Exception as e:
-            print(f"✗ Error saving pending: {e}")
+            server_log.error("Error saving pending: %s", e)
             return False
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.timer('save', 'pending').observe(elapsed)
+            add_stage('persist', elapsed)
+    
+    def compact(self):
+        """Fold the journal into dictionary.json / pending.json"""
+        # Chụp trạng thái và xoay journal trong cùng critical section để khớp nhau
+        with self.pending_lock:
+            with self.lock:
+                if self.journal.entries == 0:
+                    return
+                snapshot = self.snapshot
+                revision = self.pending.revision
+                # Chỉ chép hàng đợi khi nó đã đổi kể từ lần ghi trước
+                pending = None if revision == self._saved_pending_revision else self.pending.to_dict()
+                # Version và ID kế tiếp không nằm trong file JSON nên được giữ ở đầu segment mới
+                self.journal.rotate(checkpoint={'version': snapshot.version, 'next_pending_id': self.pending.next_id})
+        
+        # Ghi snapshot ngoài lock, request vẫn tiếp tục ghi vào segment mới; file không đổi thì bỏ qua
+        if snapshot.version != self._saved_version:
+            if not self.save_dictionary(snapshot):
+                return
+            self._saved_version = snapshot.version
+        if pending is not None:
+            if not self.save_pending(pending):
+                return
+            self._saved_pending_revision = revision
+        self.journal.discard_rotated()
+    
+    def _compact_loop(self):
+        while not self._stopping:
+            self._compact_event.wait()
+            self._compact_event.clear()
+            if self._stopping:
+                break
+            try:
+                self.compact()
+            except Exception as e:
+                server_log.error("Error compacting journal: %s", e)
+    
+    def stats(self):
+        """STATS payload: process metrics plus the size of the dictionary and queue"""
+        return dict(self.metrics.snapshot(), rate_limits=self.admission.status(), **self.state_gauges())
+    
+    def state_gauges(self):
+        snapshot = self.snapshot
+        return {"words": len(snapshot), "version": snapshot.version, "pending": len(self.pending)}
+    
+    def metrics_text(self):
+        """Prometheus text format of the same metrics"""
+        return self.metrics.prometheus(gauges=self.state_gauges())
+    
+    def replication_status(self):
+        """Role, version and followers (workers / replicas) of this server"""
+        followers = [f for service in self.writer_services for f in service.status()]
+        return {"role": "primary", "version": self.snapshot.version, "followers": followers}
+    
+    def slowlog_command(self, options):
+        """SLOWLOG [|limit=N] | reset | threshold=ms | profile[=COMMAND|off] [|sample=0.1]"""
+        if 'reset' in options:
+            self.slow_log.reset()
+            return "SUCCESS|Slow log cleared"
+        if 'threshold' in options:
+            if options['threshold'] is True:
+                raise ValueError("Option 'threshold' needs a value")
+            self.slow_log.threshold_ms = float(options['threshold'])
+            return f"SUCCESS|Slow log threshold set to {self.slow_log.threshold_ms}ms"
+        if 'profile' in options:
+            target = options['profile']
+            if target is True:
+                return f"SLOWLOG_PROFILE|{self.slow_log.profile_report()}"
+            if target.lower() == 'off':
+                return f"SLOWLOG_PROFILE|{self.slow_log.stop_profile()}"
+            sample = float(options.get('sample', 1.0))
+            if not 0 < sample <= 1:
+                raise ValueError("Option 'sample' must be in (0, 1]")
+            self.slow_log.start_profile(target.upper(), sample)
+            return f"SUCCESS|Profiling {target.upper()} (sample {sample})"
+        limit = int_option(options, 'limit', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        data = {"threshold_ms": self.slow_log.threshold_ms, "entries": self.slow_log.recent(limit)}
+        return f"SLOWLOG_DATA|{json.dumps(data, ensure_ascii=False)}"
+    
+    def suggest(self, word, limit=SUGGESTION_LIMIT):
+        """Nearest words by edit distance (none when the search indexes are off)"""
+        # Chi phí tìm tăng theo bình phương độ dài từ; từ quá dài không thể có trong từ điển
+        if not self.search_indexes or len(word) > MAX_WORD_LENGTH:
+            return []
+        # Từ ngắn chỉ chấp nhận sai 1 ký tự, tránh gợi ý vô nghĩa
+        max_distance = 1 if len(word) <= 4 else 2
+        return self.fuzzy_index.search(word, max_distance, limit)
+    
+    def select_pending(self, options):
+        """Request ids chosen by ids=a,b,c or by word= / user= / type= / before= filters
+
+        Trả về (ids theo thứ tự gửi, danh sách id không tồn tại); caller giữ pending_lock.
+        """
+        if 'ids' in options:
+            if options['ids'] is True:
+                raise ValueError("Option 'ids' needs a value")
+            requested = list(dict.fromkeys(i.strip() for i in options['ids'].split(',') if i.strip()))
+            if len(requested) > MAX_BATCH_SIZE:
+                raise ValueError(f"Too many ids (maximum {MAX_BATCH_SIZE})")
+            return [i for i in requested if i in self.pending], [i for i in requested if i not in self.pending]
+        
+        filters = self.pending_filters(options)
+        if not filters:
+            raise ValueError("Give ids=... or at least one filter (word, user, type, before)")
+        selected = [request_id for request_id, _ in self.pending.query(**filters)]
+        if len(selected) > MAX_BATCH_SIZE:
+            raise ValueError(f"Filter matches {len(selected)} requests (maximum {MAX_BATCH_SIZE})")
+        return selected, []
+    
+    def pending_filters(self, options):
+        """word= / user= / type= / before= options as PendingStore.query() arguments"""
+        filters = {}
+        for option, argument in (('word', 'word'), ('user', 'username'), ('type', 'type'), ('before', 'before')):
+            if option in options:
+                if options[option] is True:
+                    raise ValueError(f"Option '{option}' needs a value")
+                filters[argument] = options[option].lower() if option in ('word', 'type') else options[option]
+        return filters
+    
+    def pending_page(self, options):
+        """PENDING|word=..|user=..|type=..|before=..|offset=N|limit=M -> one page of requests"""
+        unknown = set(options) - {'word', 'user', 'type', 'before', 'offset', 'limit'}
+        if unknown:
+            raise ValueError(f"Unknown option '{sorted(unknown)[0]}'")
+        filters = self.pending_filters(options)
+        limit = int_option(options, 'limit', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        offset = int_option(options, 'offset', 0, sys.maxsize)
+        with self.pending_lock:
+            items = []
+            total = 0
+            for request_id, req in self.pending.query(**filters):
+                if offset <= total < offset + limit:
+                    items.append(dict(req, id=request_id))
+                total += 1
+        page = {"items": items, "offset": offset, "total": total}
+        return f"PENDING_PAGE|{json.dumps(page, ensure_ascii=False)}"
+    
+    def enqueue(self, request):
+        """Add a THEM/SUA request to the queue, return (request_id, ticket)
+
+        Nếu đã có yêu cầu giống hệt (cùng loại, từ và nghĩa) đang chờ thì trả về
+        (id của yêu cầu đó, None) và không thêm gì.
+        """
+        with self.pending_lock:
+            duplicate = self.pending.find_duplicate(request)
+            if duplicate is not None:
+                return duplicate, None
+            request_id = self.pending.add(request)
+            ticket = self.log_mutation({'op': 'submit', 'id': request_id, 'request': request})
+            self.notify('pending', request_id, {"op": "added", "item": dict(request, id=request_id)})
+        return request_id, ticket
+    
+    def resolve_batch(self, action, options):
+        """APPROVE_BATCH / REJECT_BATCH: one critical section, one journal record"""
+        with self.pending_lock:
+            request_ids, missing = self.select_pending(options)
+            # Duyệt theo thứ tự gửi: nhiều yêu cầu sửa cùng một từ thì yêu cầu mới nhất thắng
+            request_ids.sort(key=self.pending.submission_key)
+            results = [{"id": i, "status": "not_found"} for i in missing]
+            ticket = None
+            
+            if action == 'approve' and request_ids:
+                with self.lock:
+                    changes = {}
+                    items = []
+                    for request_id in request_ids:
+                        req = self.pending.pop(request_id)
+                        meaning = req['meaning'] if req['type'] == 'add' else req['new_meaning']
+                        changes[req['word']] = meaning
+                        items.append({'id': request_id, 'word': req['word'], 'meaning': meaning})
+                    self.publish(changes)
+                    ticket = self.log_mutation({'op': 'approve_batch', 'items': items, 'version': self.snapshot.version})
+            elif request_ids:
+                for request_id in request_ids:
+                    del self.pending[request_id]
+                ticket = self.log_mutation({'op': 'reject_batch', 'ids': request_ids})
+            
+            status = 'approved' if action == 'approve' else 'rejected'
+            for request_id in request_ids:
+                results.append({"id": request_id, "status": status})
+                self.notify('pending', request_id, {"op": status, "id": request_id})
+        
+        if ticket is not None:
+            self.wait_durable(ticket)
+        data = {status: len(request_ids), "not_found": len(missing), "results": results}
+        return f"BATCH_RESULT|{json.dumps(data, ensure_ascii=False)}"
+    
+    def list_data(self, if_version=None):
+        """Full LIST_DATA reply as bytes, encoded once per dictionary version
+
+        Có if_version (LIST|if_version=N): trả NOT_MODIFIED|N nếu client đã có
+        phiên bản hiện tại, ngược lại trả LIST_DATA kèm version ở trường cuối.
+        """
+        snapshot = self.snapshot
+        if if_version is not None and if_version == snapshot.version:
+            return f"NOT_MODIFIED|{snapshot.version}"
+        
+        cached = self._list_cache
+        if cached is None or cached[0] != snapshot.version:
+            # Nhiều client cùng tải lại sau một lần APPROVE: chỉ một thread mã hoá
+            with self._list_cache_lock:
+                cached = self._list_cache
+                if cached is None or cached[0] < snapshot.version:
+                    items = snapshot.items(snapshot.index)
+                    # Chuyển thành danh sách các object để Client dễ xử lý, header riêng là LIST_DATA
+                    data = [{"word": w, "meaning": m} for w, m in items]
+                    payload = f"LIST_DATA|{json.dumps(data, ensure_ascii=False)}".encode('utf-8')
+                    cached = self._list_cache = (snapshot.version, payload)
+        
+        version, payload = cached
+        if if_version is None:
+            return payload
+        return payload + f"|{version}".encode('utf-8')
+    
+    def list_page(self, options):
+        """LIST|offset=N|limit=M or LIST|cursor=C|limit=M -> one page of words"""
+        unknown = set(options) - {'offset', 'cursor', 'limit'}
+        if unknown:
+            raise ValueError(f"Unknown option '{sorted(unknown)[0]}'")
+        limit = int_option(options, 'limit', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        cursor = options.get('cursor')
+        if cursor is True:
+            raise ValueError("Option 'cursor' needs a value")
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except Exception:
+            raise ValueError("Invalid cursor")
+        
+        snapshot = self.snapshot
+        if after is not None:
+            start = snapshot.index.position_after(after)
+        else:
+            start = int_option(options, 'offset', 0, len(snapshot))
+        items = snapshot.items(snapshot.index.slice(start, limit))
+        total = len(snapshot)
+        
+        next_cursor = None
+        if items and start + len(items) < total:
+            next_cursor = encode_cursor(items[-1][0])
+        page = {
+            "items": [{"word": w, "meaning": m} for w, m in items],
+            "offset": start,
+            "total": total,
+            "next_cursor": next_cursor,
+            "version": snapshot.version,
+        }
+        return f"LIST_PAGE|{json.dumps(page, ensure_ascii=False)}"
+    
+    def stream_list(self, chunk_size):
+        """Yield the word list as LIST_CHUNK messages followed by LIST_END
+
+        Cả luồng đọc từ một snapshot cố định nên danh sách nhất quán dù có APPROVE
+        xen giữa, và không chặn TRA hay writer.
+        """
+        snapshot = self.snapshot
+        keys = snapshot.index.iter_from(0)
+        sent = 0
+        while True:
+            items = snapshot.items(itertools.islice(keys, chunk_size))
+            if not items:
+                break
+            sent += len(items)
+            chunk = [{"word": w, "meaning": m} for w, m in items]
+            yield f"LIST_CHUNK|{json.dumps(chunk, ensure_ascii=False)}"
+        yield f"LIST_END|{sent}|{snapshot.version}"
     
     def handle_client(self, client_socket, address):
         """Handle individual client connection"""
         client_id = self.client_count
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Client #{client_id} connected from {address}")
+        server_log.info("Client #%s connected from %s", client_id, address)
+        self.metrics.add('connections_total')
+        self.metrics.add('connections_active')
         
         user_role = None
         username = None
         
         try:
+            client_socket.settimeout(self.idle_timeout)
+            
             # Authentication
-            welcome = "WELCOME|Dictionary Server v2.0 - Please Login"
-            client_socket.send(welcome.encode('utf-8'))
+            client_socket.send(self.welcome_message().encode('utf-8'))
             
             # Wait for login
             auth_data = client_socket.recv(1024).decode('utf-8').strip()
-            auth_response = self.authenticate(auth_data)
+            auth_response, username, user_role, framed = self.handshake(auth_data)
             
-            if auth_response.startswith("SUCCESS"):
-                username = auth_data.split('|')[1]
-                user_role = self.users[username]['role']
-                print(f"[Client #{client_id}] User '{username}' logged in as {user_role}")
+            if username:
+                server_log.info("Client #%s: user '%s' logged in as %s", client_id, username, user_role)
             
             client_socket.send(auth_response.encode('utf-8'))
             
-            if not auth_response.startswith("SUCCESS"):
+            if not username:
+                return
+            
+            if framed:
+                self.serve_framed(client_socket, client_id, username, user_role)
                 return
             
             while True:
-                data = client_socket.recv(4096).decode('utf-8').strip()
+                raw = client_socket.recv(4096)
+                # Chế độ text không có header nên thời gian chờ recv là thời gian client im lặng: không tính
+                trace = RequestTrace()
+                self.metrics.add('bytes_in', len(raw))
+                data = raw.decode('utf-8').strip()
+                trace.lap('decode')
                 
                 if not data:
                     break
                 
-                print(f"[Client #{client_id}] {username} ({user_role}): {data}")
+                request_log.info(REQUEST_LOG_MESSAGE, client_id, username, user_role, data)
                 
                 # Process request with role
-                response = self.process_request(data, user_role, username)
+                response = self.process_request(data, user_role, username, trace)
+                if is_stream(response):
+                    # Không có framing thì client không phân biệt được các chunk
+                    response.close()
+                    response = "ERROR|Streaming requires the FRAMED protocol"
                 
-                client_socket.send(response.encode('utf-8'))
+                payload = encode_response(response)
+                trace.lap('serialize')
+                client_socket.sendall(payload)
+                trace.lap('send')
+                self.slow_log.finish(trace)
+                self.metrics.add('bytes_out', len(payload))
                 
                 if data.upper() == 'QUIT':
                     break
                     
+        except socket.timeout:
+            server_log.info("Client #%s idle timeout", client_id)
         except Exception as e:
-            print(f"[Client #{client_id}] Error: {e}")
+            server_log.warning("Client #%s error: %s", client_id, e)
         finally:
+            self.metrics.add('connections_active', -1)
             client_socket.close()
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Client #{client_id} disconnected")
+            server_log.info("Client #%s disconnected", client_id)
+    
+    def serve_framed(self, client_socket, client_id, username, user_role):
+        """Read framed requests and answer them out of order from the worker pool"""
+        # Chỉ thread writer của kết nối ghi socket: worker pool không bao giờ bị chặn bởi
+        # một client đọc chậm. outbox có tối đa max_inflight response (inflight nhả sau khi gửi)
+        outbox = queue.Queue()
+        inflight = threading.BoundedSemaphore(self.max_inflight)
+        subscription = None
+        
+        def send(request_id, message, trace=None):
+            frame = encode_frame(request_id, message)
+            if trace is not None:
+                trace.lap('serialize')
+            client_socket.sendall(frame)
+            if trace is not None:
+                trace.lap('send')
+            self.metrics.add('bytes_out', len(frame))
+        
+        def write(request_id, response, trace):
+            if is_stream(response):
+                # Chunk được dựng dần ngay khi gửi: client đọc chậm không làm dồn chunk trong bộ nhớ
+                try:
+                    for message in response:
+                        trace.lap('handler')
+                        send(request_id, message, trace)
+                except OSError:
+                    raise
+                except Exception as e:
+                    send(request_id, f"ERROR|Internal error: {e}")
+                    return
+                finally:
+                    response.close()
+            else:
+                send(request_id, response, trace)
+            if trace is not None:
+                self.slow_log.finish(trace)
+        
+        def writer():
+            broken = False
+            while True:
+                item = outbox.get()
+                if item is None:
+                    return
+                if item is DRAIN_EVENTS:
+                    # Event dồn trong Subscription (đã được gộp) trong lúc đang gửi response khác
+                    replies, counted = [(PUSH_ID, message, None) for message in subscription.drain()], False
+                else:
+                    request_id, response, trace, counted = item
+                    replies = [(request_id, response, trace)]
+                try:
+                    for request_id, response, trace in replies:
+                        if not broken:
+                            write(request_id, response, trace)
+                        elif is_stream(response):
+                            response.close()
+                except OSError:
+                    # Client đã ngắt / không đọc quá idle timeout: đóng để thread đọc thoát ra
+                    broken = True
+                    try:
+                        client_socket.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+                finally:
+                    if counted:
+                        inflight.release()
+        
+        def run(request_id, data, trace):
+            try:
+                response = self.process_request(data, user_role, username, trace)
+            except Exception as e:
+                response = f"ERROR|Internal error: {e}"
+            outbox.put((request_id, response, trace, True))
+        
+        writer_thread = threading.Thread(target=writer, daemon=True)
+        writer_thread.start()
+        try:
+            while True:
+                header = recv_header(client_socket)
+                if header is None:
+                    break
+                # Trace bắt đầu khi header đã tới: 'recv' là thời gian nhận phần payload
+                trace = RequestTrace()
+                length, request_id = header
+                payload = recv_exact(client_socket, length)
+                if payload is None:
+                    break
+                trace.lap('recv')
+                self.metrics.add('bytes_in', HEADER.size + length)
+                data = payload.decode('utf-8').strip()
+                trace.lap('decode')
+                request_log.info(FRAMED_REQUEST_LOG_MESSAGE, client_id, username, user_role, request_id, data)
+                
+                if data.upper() == 'QUIT':
+                    # Trả lời sau khi mọi request trước đó đã được gửi
+                    for _ in range(self.max_inflight):
+                        inflight.acquire()
+                    outbox.put((request_id, self.process_request(data, user_role, username), None, False))
+                    break
+                
+                if data.split('|', 1)[0].upper() in ('SUBSCRIBE', 'UNSUBSCRIBE'):
+                    first = subscription is None
+                    subscription, response = self.update_subscription(
+                        subscription, data, user_role, lambda: outbox.put(DRAIN_EVENTS))
+                    outbox.put((request_id, response, None, False))
+                    if first and subscription is not None:
+                        keep_alive(client_socket)
+                    # Kết nối chỉ nghe event thì im lặng là bình thường: không áp idle timeout
+                    client_socket.settimeout(None if subscription in self.events else self.idle_timeout)
+                    continue
+                
+                # Giới hạn số request đang xử lý / chờ gửi của một kết nối (backpressure)
+                inflight.acquire()
+                self.executor.submit(run, request_id, data, trace)
+        finally:
+            if subscription is not None:
+                self.events.unsubscribe(subscription)
+            # Gửi nốt các response đã xếp hàng rồi mới để caller đóng socket
+            outbox.put(None)
+            writer_thread.join()
+    
+    def welcome_message(self):
+        """Greeting sent on connect, advertises the optional framed protocol"""
+        return f"WELCOME|Dictionary Server v2.0 - Please Login|{FRAMED_FLAG}"
+    
+    def handshake(self, auth_data):
+        """Authenticate a LOGIN or RESUME line, return (response, username, role, framed)
+
+        Đăng nhập thành công trả thêm token phiên ở trường cuối: SUCCESS|role|message|token.
+        """
+        framed = False
+        parts = auth_data.split('|')
+        if parts[0].upper() == 'RESUME':
+            return self.resume(parts)
+        # Client mới gửi thêm cờ FRAMED sau mật khẩu: LOGIN|username|password|FRAMED
+        if len(parts) == 4 and parts[3].upper() == FRAMED_FLAG:
+            framed = True
+            auth_data = '|'.join(parts[:3])
+        
+        auth_response = self.authenticate(auth_data)
+        if not auth_response.startswith("SUCCESS"):
+            self.metrics.add('auth_failures')
+            return auth_response, None, None, False
+        
+        username = parts[1]
+        role = self.users[username]['role']
+        self.metrics.add('logins')
+        return f"{auth_response}|{self.sessions.issue(username, role)}", username, role, framed
+    
+    def resume(self, parts):
+        """RESUME|token[|FRAMED]: restore a session from its token, issue a fresh one"""
+        framed = len(parts) == 3 and parts[2].upper() == FRAMED_FLAG
+        session = self.sessions.verify(parts[1]) if len(parts) == 2 or framed else None
+        if session is None:
+            self.metrics.add('auth_failures')
+            return "ERROR|Invalid or expired session", None, None, False
+        username, role = session
+        self.metrics.add('session_resumes')
+        return f"SUCCESS|{role}|Session resumed as {role}|{self.sessions.issue(username, role)}", username, role, framed
     
     def authenticate(self, auth_data):
         """Authenticate user"""
@@ -172,7 +975,7 @@ class DictionaryServer:
             username = parts[1]
             password = parts[2]
             
-            if username in self.users and self.users[username]['password'] == password:
+            if username in self.users and verify_password(password, self.users[username]['password_hash']):
                 role = self.users[username]['role']
                 return f"SUCCESS|{role}|Login successful as {role}"
             else:
@@ -181,7 +984,47 @@ class DictionaryServer:
         except Exception as e:
             return f"ERROR|Authentication error: {e}"
     
-    def process_request(self, request, role, username):
+    def process_request(self, request, role, username, trace=None):
+        """Run one command and record its latency for STATS and its stages for SLOWLOG
+
+        Engine truyền `trace` đã đo recv/decode và tự gọi slow_log.finish() sau khi gửi;
+        không có trace (request từ worker/replica, benchmark) thì trace kết thúc ở đây.
+        """
+        own_trace = trace is None
+        if own_trace:
+            trace = RequestTrace()
+        else:
+            trace.lap('queue')  # Chờ trong thread pool
+        start = time.perf_counter()
+        command = request.partition('|')[0].upper()
+        if self.admission.enabled and role != 'admin' and command != 'QUIT':
+            # Trả lời ngay thay vì xếp hàng chờ pending_lock / đĩa
+            retry_after = self.admission.check(username, command)
+            if retry_after:
+                self.metrics.add('rate_limited')
+                return f"BUSY|{retry_after:.3f}|Rate limit exceeded, retry later"
+        trace.command, trace.request, trace.username = command, request, username
+        trace.lap('parse')
+        token = current_trace.set(trace)
+        profiler = self.slow_log.profiler(command) if command == self.slow_log.profile_command else None
+        try:
+            response = self.execute_request(request, role, username)
+        except JournalWriteError as e:
+            # Thay đổi đã có trong bộ nhớ, journal sẽ được ghi lại khi đĩa hết lỗi
+            server_log.error("Journal write failed: %s", e)
+            response = f"ERROR|Change could not be saved to disk yet: {e}"
+        finally:
+            if profiler is not None:
+                self.slow_log.collect(profiler)
+            current_trace.reset(token)
+        trace.lap('handler')
+        error = isinstance(response, str) and response.startswith('ERROR|')
+        self.metrics.observe_command(command, time.perf_counter() - start, error)
+        if own_trace:
+            self.slow_log.finish(trace)
+        return response
+    
+    def execute_request(self, request, role, username):
         parts = request.split('|', 1)
         if len(parts) < 1: return "ERROR|Invalid request format"
         command = parts[0].upper()
@@ -194,24 +1037,134 @@ class DictionaryServer:
                 return "ERROR|Usage: TRA|word"
             word = parts[1].lower().strip()
             
-            with self.lock:
-                if word in self.dictionary:
-                    return f"SUCCESS|{word}: {self.dictionary[word]}"
-                else:
-                    return f"NOTFOUND|Word '{word}' not found in dictionary"
+            meaning = self.snapshot.get(word)
+            if meaning is not None:
+                return f"SUCCESS|{word}: {meaning}"
+            
+            suggestions = self.suggest(word)
+            if suggestions:
+                # Trường thứ 3: các từ gần nhất, ngăn cách bởi dấu phẩy
+                return f"NOTFOUND|Word '{word}' not found in dictionary|{','.join(suggestions)}"
+            return f"NOTFOUND|Word '{word}' not found in dictionary"
                 
                 
         elif command == 'LIST':
-            with self.lock:
-                # Chuyển đổi dictionary thành danh sách các object để Client dễ xử lý
-                # Sắp xếp luôn theo key (word)
-                data = [{"word": w, "meaning": m} for w, m in sorted(self.dictionary.items())]
-                # Trả về với header riêng là LIST_DATA
-                return f"LIST_DATA|{json.dumps(data, ensure_ascii=False)}"
+            options = parse_options(parts[1]) if len(parts) > 1 else {}
+            if not options:
+                # Sắp xếp theo key (word), đọc từ snapshot nên không chặn ai
+                return self.list_data()
+            
+            try:
+                if 'if_version' in options:
+                    if len(options) > 1:
+                        raise ValueError("'if_version' cannot be combined with other options")
+                    return self.list_data(int_option(options, 'if_version', 0, sys.maxsize))
+                if 'stream' in options:
+                    unknown = set(options) - {'stream', 'chunk'}
+                    if unknown:
+                        raise ValueError(f"Unknown option '{sorted(unknown)[0]}'")
+                    return self.stream_list(int_option(options, 'chunk', DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE) or 1)
+                return self.list_page(options)
+            except ValueError as e:
+                return f"ERROR|Invalid LIST options: {e}"
+
+        # TRA_BATCH|w1,w2,... - tra nhiều từ trong một lần (phân cách bằng dấu phẩy hoặc xuống dòng)
+        elif command == 'TRA_BATCH':
+            if len(parts) < 2:
+                return "ERROR|Usage: TRA_BATCH|word1,word2,..."
+            words = []
+            seen = set()
+            for w in re.split(r'[,\n]', parts[1]):
+                w = w.lower().strip()
+                if w and w not in seen:
+                    seen.add(w)
+                    words.append(w)
+            if len(words) > MAX_BATCH_SIZE:
+                return f"ERROR|Too many words (maximum {MAX_BATCH_SIZE})"
+            
+            # Mọi từ được tra trên cùng một snapshot
+            snapshot = self.snapshot
+            found = {}
+            missing = []
+            for w in words:
+                meaning = snapshot.get(w)
+                if meaning is None:
+                    missing.append(w)
+                else:
+                    found[w] = meaning
+            return f"TRA_BATCH_DATA|{json.dumps({'found': found, 'missing': missing}, ensure_ascii=False)}"
+        
+        # PREFIX|abc|limit - các từ bắt đầu bằng abc (gợi ý khi gõ)
+        elif command == 'PREFIX':
+            args = parts[1].split('|') if len(parts) > 1 else []
+            if not args or not args[0].strip():
+                return "ERROR|Usage: PREFIX|prefix|limit"
+            try:
+                limit = limit_arg(args, 1, DEFAULT_PREFIX_LIMIT)
+            except ValueError as e:
+                return f"ERROR|Invalid limit: {e}"
+            
+            snapshot = self.snapshot
+            words = snapshot.index.prefix(args[0].lower().strip(), limit)
+            items = [{"word": w, "meaning": m} for w, m in snapshot.items(words)]
+            return f"PREFIX_DATA|{json.dumps(items, ensure_ascii=False)}"
+        
+        # RANGE|from|to|limit - các từ trong đoạn [from, to], bỏ trống = không giới hạn
+        elif command == 'RANGE':
+            args = parts[1].split('|') if len(parts) > 1 else []
+            if len(args) < 2:
+                return "ERROR|Usage: RANGE|from|to|limit"
+            try:
+                limit = limit_arg(args, 2, DEFAULT_PAGE_SIZE)
+            except ValueError as e:
+                return f"ERROR|Invalid limit: {e}"
+            
+            snapshot = self.snapshot
+            words = snapshot.index.range(args[0].lower().strip(), args[1].lower().strip(), limit)
+            items = [{"word": w, "meaning": m} for w, m in snapshot.items(words)]
+            return f"RANGE_DATA|{json.dumps(items, ensure_ascii=False)}"
+
+        # TIM|cụm từ tiếng Việt|limit - tra ngược từ tiếng Anh theo nghĩa (không cần dấu)
+        elif command == 'TIM':
+            args = parts[1].split('|') if len(parts) > 1 else []
+            if not args or not args[0].strip():
+                return "ERROR|Usage: TIM|meaning|limit"
+            try:
+                limit = limit_arg(args, 1, DEFAULT_SEARCH_LIMIT)
+            except ValueError as e:
+                return f"ERROR|Invalid limit: {e}"
+            if not self.search_indexes:
+                return "ERROR|Reverse search is disabled on this server (start it with --search-indexes on)"
+            
+            snapshot = self.snapshot
+            items = []
+            for w, score in self.meaning_index.search(args[0], limit):
+                meaning = snapshot.get(w)
+                if meaning is not None:
+                    items.append({"word": w, "meaning": meaning, "score": score})
+            return f"TIM_DATA|{json.dumps(items, ensure_ascii=False)}"
+
+        # CHANGES|version - các từ được thêm/sửa sau phiên bản client đang có
+        elif command == 'CHANGES':
+            if len(parts) < 2 or not parts[1].strip():
+                return "ERROR|Usage: CHANGES|since_version"
+            try:
+                since = int(parts[1])
+            except ValueError:
+                return "ERROR|Invalid version"
+            return self.changes_since(since)
 
         elif command == 'PENDING':
             if role != 'admin': return "ERROR|Access denied"
             
+            options = parse_options(parts[1]) if len(parts) > 1 else {}
+            if options:
+                # Có bộ lọc / phân trang: chỉ gửi phần admin cần
+                try:
+                    return self.pending_page(options)
+                except ValueError as e:
+                    return f"ERROR|Invalid PENDING options: {e}"
+            
             with self.pending_lock:
                 # Chuyển pending dict thành list có kèm ID để Client hiển thị
                 pending_list = []
@@ -237,23 +1190,23 @@ class DictionaryServer:
                 if not is_valid:
                     return f"ERROR|{error_msg}"
                 
-                with self.lock:
-                    if word in self.dictionary:
-                        return f"ERROR|Word '{word}' already exists"
+                if word in self.snapshot:
+                    return f"ERROR|Word '{word}' already exists"
                 
                 # Add to pending
-                with self.pending_lock:
-                    request_id = f"{word}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-                    self.pending[request_id] = {
-                        'type': 'add',
-                        'word': word,
-                        'meaning': meaning,
-                        'username': username,
-                        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    }
-                    self.save_pending()
-                    
-                return f"SUCCESS|Request submitted for approval\nWord: {word}\nMeaning: {meaning}"
+                request_id, ticket = self.enqueue({
+                    'type': 'add',
+                    'word': word,
+                    'meaning': meaning,
+                    'username': username,
+                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                })
+                if ticket is None:
+                    return f"ERROR|Same request is already pending (ID: {request_id})"
+                
+                # Chờ ghi đĩa sau khi đã nhả lock (group commit)
+                self.wait_durable(ticket)
+                return f"SUCCESS|Request submitted for approval\nWord: {word}\nMeaning: {meaning}\nID: {request_id}"
                         
             except ValueError:
                 return "ERROR|Invalid format. Use: THEM|word:meaning"
@@ -273,78 +1226,28 @@ class DictionaryServer:
                 if not is_valid:
                     return f"ERROR|{error_msg}"
                 
-                with self.lock:
-                    if word not in self.dictionary:
-                        return f"ERROR|Word '{word}' not found"
-                    old_meaning = self.dictionary[word]
+                old_meaning = self.snapshot.get(word)
+                if old_meaning is None:
+                    return f"ERROR|Word '{word}' not found"
                 
                 # Add to pending
-                with self.pending_lock:
-                    request_id = f"{word}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-                    self.pending[request_id] = {
-                        'type': 'update',
-                        'word': word,
-                        'old_meaning': old_meaning,
-                        'new_meaning': meaning,
-                        'username': username,
-                        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    }
-                    self.save_pending()
-                    
-                return f"SUCCESS|Update request submitted for approval\nWord: {word}\nOld: {old_meaning}\nNew: {meaning}"
+                request_id, ticket = self.enqueue({
+                    'type': 'update',
+                    'word': word,
+                    'old_meaning': old_meaning,
+                    'new_meaning': meaning,
+                    'username': username,
+                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                })
+                if ticket is None:
+                    return f"ERROR|Same request is already pending (ID: {request_id})"
+                
+                self.wait_durable(ticket)
+                return f"SUCCESS|Update request submitted for approval\nWord: {word}\nOld: {old_meaning}\nNew: {meaning}\nID: {request_id}"
                         
             except ValueError:
                 return "ERROR|Invalid format. Use: SUA|word:meaning"
         
-        # LIST all words (both roles)
-        elif command == 'LIST':
-            with self.lock:
-                if not self.dictionary:
-                    return "SUCCESS|Dictionary is empty"
-                
-                word_list = '\n'.join([f"  • {word}: {meaning}" 
-                                      for word, meaning in sorted(self.dictionary.items())])
-                return f"SUCCESS|Dictionary ({len(self.dictionary)} words):\n{word_list}"
-        
-        # LIST pending requests (admin only)
-        elif command == 'PENDING':
-            if role != 'admin':
-                return "ERROR|Access denied. Admin only"
-            
-            with self.pending_lock:
-                # Ensure pending is a dictionary
-                if not isinstance(self.pending, dict):
-                    self.pending = {}
-                    self.save_pending()
-                
-                if not self.pending:
-                    return "SUCCESS|No pending requests"
-                
-                pending_list = []
-                try:
-                    for req_id, req in self.pending.items():
-                        if req['type'] == 'add':
-                            pending_list.append(
-                                f"  [{req_id}]\n"
-                                f"    Type: ADD\n"
-                                f"    Word: {req['word']}\n"
-                                f"    Meaning: {req['meaning']}\n"
-                                f"    By: {req['username']} at {req['timestamp']}"
-                            )
-                        else:
-                            pending_list.append(
-                                f"  [{req_id}]\n"
-                                f"    Type: UPDATE\n"
-                                f"    Word: {req['word']}\n"
-                                f"    Old: {req['old_meaning']}\n"
-                                f"    New: {req['new_meaning']}\n"
-                                f"    By: {req['username']} at {req['timestamp']}"
-                            )
-                    
-                    return f"SUCCESS|Pending Requests ({len(self.pending)}):\n" + '\n\n'.join(pending_list)
-                except Exception as e:
-                    return f"ERROR|Failed to process pending requests: {str(e)}"
-        
         # APPROVE request (admin only)
         elif command == 'APPROVE':
             if role != 'admin':
@@ -363,18 +1266,21 @@ class DictionaryServer:
                 
                 with self.lock:
                     if req['type'] == 'add':
-                        self.dictionary[req['word']] = req['meaning']
-                        result = f"Added '{req['word']}': {req['meaning']}"
+                        meaning = req['meaning']
+                        result = f"Added '{req['word']}': {meaning}"
                     else:
-                        self.dictionary[req['word']] = req['new_meaning']
-                        result = f"Updated '{req['word']}' to: {req['new_meaning']}"
+                        meaning = req['new_meaning']
+                        result = f"Updated '{req['word']}' to: {meaning}"
                     
-                    self.save_dictionary()
-                
-                del self.pending[request_id]
-                self.save_pending()
-                
-                return f"SUCCESS|Request approved!\n{result}"
+                    self.publish({req['word']: meaning})
+                    del self.pending[request_id]
+                    # Một bản ghi journal cho cả từ điển và hàng đợi
+                    ticket = self.log_mutation({'op': 'approve', 'id': request_id, 'word': req['word'], 'meaning': meaning,
+                                                'version': self.snapshot.version})
+                self.notify('pending', request_id, {"op": "approved", "id": request_id})
+            
+            self.wait_durable(ticket)
+            return f"SUCCESS|Request approved!\n{result}"
         
         # REJECT request (admin only)
         elif command == 'REJECT':
@@ -392,9 +1298,52 @@ class DictionaryServer:
                 
                 req = self.pending[request_id]
                 del self.pending[request_id]
-                self.save_pending()
-                
-                return f"SUCCESS|Request rejected\nWord: {req['word']}"
+                ticket = self.log_mutation({'op': 'reject', 'id': request_id})
+                self.notify('pending', request_id, {"op": "rejected", "id": request_id})
+            
+            self.wait_durable(ticket)
+            return f"SUCCESS|Request rejected\nWord: {req['word']}"
+        
+        # APPROVE_BATCH|ids=a,b,c hoặc APPROVE_BATCH|user=u|type=add|before=2024-05-01 (admin only)
+        elif command in ('APPROVE_BATCH', 'REJECT_BATCH'):
+            if role != 'admin':
+                return "ERROR|Access denied. Admin only"
+            options = parse_options(parts[1]) if len(parts) > 1 else {}
+            try:
+                return self.resolve_batch('approve' if command == 'APPROVE_BATCH' else 'reject', options)
+            except ValueError as e:
+                return f"ERROR|{e}"
+        
+        # REPLICATION - vai trò của server và độ trễ của worker / replica (admin only)
+        elif command == 'REPLICATION':
+            if role != 'admin':
+                return "ERROR|Access denied. Admin only"
+            return f"REPLICATION_DATA|{json.dumps(self.replication_status(), ensure_ascii=False)}"
+        
+        # STATS - số liệu của tiến trình (admin only); STATS|prometheus trả dạng text
+        elif command == 'STATS':
+            if role != 'admin':
+                return "ERROR|Access denied. Admin only"
+            output = parts[1].strip().lower() if len(parts) > 1 else ''
+            if output == 'prometheus':
+                return f"STATS_TEXT|{self.metrics_text()}"
+            if output:
+                return "ERROR|Usage: STATS or STATS|prometheus"
+            return f"STATS_DATA|{json.dumps(self.stats(), ensure_ascii=False)}"
+        
+        # SLOWLOG - request chậm hơn ngưỡng kèm thời gian từng giai đoạn (admin only)
+        elif command == 'SLOWLOG':
+            if role != 'admin':
+                return "ERROR|Access denied. Admin only"
+            options = parse_options(parts[1]) if len(parts) > 1 else {}
+            try:
+                return self.slowlog_command(options)
+            except ValueError as e:
+                return f"ERROR|Invalid SLOWLOG options: {e}"
+        
+        # SUBSCRIBE/UNSUBSCRIBE do engine xử lý trên kết nối FRAMED
+        elif command in ('SUBSCRIBE', 'UNSUBSCRIBE'):
+            return "ERROR|Subscriptions require the FRAMED protocol"
         
         # QUIT
         elif command == 'QUIT':
@@ -403,27 +1352,48 @@ class DictionaryServer:
         else:
             return f"ERROR|Unknown command: {command}"
     
+    def print_banner(self, engine):
+        """Print startup information"""
+        print(f"\n{'='*60}")
+        print(f"📖 Dictionary Server Started (v2.0)")
+        print(f"{'='*60}")
+        print(f"Engine: {engine}")
+        print(f"Host: {self.host}")
+        print(f"Port: {self.port}")
+        print(f"Backlog: {self.backlog}")
+        print(f"Idle timeout: {self.idle_timeout or 'off'}")
+        print(f"Dictionary file: {self.dict_file}")
+        print(f"Pending file: {self.pending_file}")
+        print(f"Journal: {self.journal_file} (sync: {self.sync_policy})")
+        print(f"Words in dictionary: {len(self.snapshot)}")
+        print(f"Search indexes (suggestions, TIM): {'on' if self.search_indexes else 'off'}")
+        print(f"Pending requests: {len(self.pending)}")
+        print(f"\nAccounts ({self.users_file}):")
+        for user, info in self.users.items():
+            print(f"  {user} ({info['role']})")
+        print(f"\nWaiting for connections...\n")
+    
+    def shutdown(self):
+        """Release resources once the listener has stopped"""
+        self.executor.shutdown(wait=True)
+        self._stopping = True
+        self._compact_event.set()
+        self._compactor.join()
+        self.compact()
+        self.journal.close()
+    
     def start(self):
-        """Start the server"""
+        """Start the server (one thread per connection)"""
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reuse_port:
+            # Kernel chia kết nối mới cho các tiến trình cùng nghe cổng này
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         
         try:
             server_socket.bind((self.host, self.port))
-            server_socket.listen(5)
-            print(f"\n{'='*60}")
-            print(f"📖 Dictionary Server Started (v2.0)")
-            print(f"{'='*60}")
-            print(f"Host: {self.host}")
-            print(f"Port: {self.port}")
-            print(f"Dictionary file: {self.dict_file}")
-            print(f"Pending file: {self.pending_file}")
-            print(f"Words in dictionary: {len(self.dictionary)}")
-            print(f"Pending requests: {len(self.pending)}")
-            print(f"\nAccounts:")
-            for user, info in self.users.items():
-                print(f"  {user} ({info['role']}) - password: {info['password']}")
-            print(f"\nWaiting for connections...\n")
+            server_socket.listen(self.backlog)
+            self.print_banner('threads')
             
             while True:
                 client_socket, address = server_socket.accept()
@@ -442,8 +1412,106 @@ class DictionaryServer:
             print(f"Server error: {e}")
         finally:
             server_socket.close()
+            self.shutdown()
             print("Server closed")
 
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Dictionary Server")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--dict-file', default='dictionary.json',
+                        help="File từ điển: .json, hoặc .sst (bảng sắp xếp đọc qua mmap, tạo bằng convert_dictionary.py)")
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--engine', choices=['threads', 'asyncio'], default='threads',
+                        help="threads: một thread cho mỗi kết nối; asyncio: một event loop cho mọi kết nối")
+    parser.add_argument('--backlog', type=int, default=128, help="Độ dài hàng đợi accept của socket")
+    parser.add_argument('--idle-timeout', type=float, default=300,
+                        help="Đóng kết nối im lặng quá số giây này (0 = tắt)")
+    parser.add_argument('--sync', choices=SYNC_POLICIES, default='always',
+                        help="always: fsync trước khi trả lời; interval: fsync định kỳ; shutdown: fsync khi tắt")
+    parser.add_argument('--sync-interval-ms', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Số tiến trình phụ cùng nghe cổng (SO_REUSEPORT) để phục vụ lệnh đọc; "
+                             "lệnh ghi được chuyển về tiến trình chính")
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    parser.add_argument('--log-file', help="Ghi log vào file thay vì stdout")
+    parser.add_argument('--log-format', choices=['text', 'json'], default='text')
+    parser.add_argument('--request-log-sample', type=float, default=1.0,
+                        help="Tỉ lệ request được ghi log (1 = tất cả, 0.01 = 1%%, 0 = tắt log từng request)")
+    parser.add_argument('--users-file', default='users.json',
+                        help="Tài khoản (mật khẩu đã hash); tạo bằng tài khoản demo nếu chưa có, sửa bằng auth.py")
+    parser.add_argument('--session-secret', default=os.environ.get('DICT_SESSION_SECRET'),
+                        help="Khoá ký token phiên, giống nhau ở primary và replica (mặc định: biến môi trường "
+                             "DICT_SESSION_SECRET, không có thì tạo ngẫu nhiên và lưu vào session.key)")
+    parser.add_argument('--session-ttl', type=int, default=SESSION_TTL, help="Số giây token phiên còn hiệu lực")
+    parser.add_argument('--user-read-rate', type=float, default=0,
+                        help="Số lệnh đọc mỗi giây cho mỗi user (0 = không giới hạn; tính riêng từng tiến trình)")
+    parser.add_argument('--user-write-rate', type=float, default=DEFAULT_USER_WRITE_RATE,
+                        help="Số lệnh ghi (THEM, SUA...) mỗi giây cho mỗi user (0 = không giới hạn)")
+    parser.add_argument('--global-read-rate', type=float, default=0, help="Số lệnh đọc mỗi giây cho cả server")
+    parser.add_argument('--global-write-rate', type=float, default=DEFAULT_GLOBAL_WRITE_RATE, help="Số lệnh ghi mỗi giây cho cả server")
+    parser.add_argument('--search-indexes', choices=['auto', 'on', 'off'], default='auto',
+                        help="Index gợi ý chính tả và tra ngược TIM, cỡ 3 KB RAM mỗi từ "
+                             "(auto: bật với JSON, tắt với .sst)")
+    parser.add_argument('--slowlog-threshold-ms', type=float, default=DEFAULT_SLOWLOG_THRESHOLD_MS,
+                        help="Ghi vào SLOWLOG các request chậm hơn số ms này (âm = tắt)")
+    parser.add_argument('--slowlog-size', type=int, default=DEFAULT_SLOWLOG_SIZE,
+                        help="Số request chậm gần nhất được giữ lại")
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help="Mở endpoint HTTP /metrics (định dạng Prometheus) trên cổng này (0 = tắt)")
+    parser.add_argument('--replication-port', type=int, default=0,
+                        help="Cổng cho replica nối vào (0 = tắt)")
+    parser.add_argument('--replica-of', metavar='HOST:PORT',
+                        help="Chạy như replica của primary tại HOST:PORT (cổng --replication-port của primary)")
+    parser.add_argument('--replication-key', default=os.environ.get('DICT_REPLICATION_KEY'),
+                        help="Khoá chung giữa primary và replica (mặc định: biến môi trường DICT_REPLICATION_KEY)")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    server = DictionaryServer(host='localhost', port=5555)
-    server.start()
\ No newline at end of file
+    args = parse_args()
+    if args.engine == 'asyncio':
+        from async_server import AsyncDictionaryServer as server_class
+    else:
+        server_class = DictionaryServer
+    options = dict(host=args.host, port=args.port, dict_file=args.dict_file, backlog=args.backlog,
+                   idle_timeout=args.idle_timeout, sync_policy=args.sync, sync_interval_ms=args.sync_interval_ms,
+                   slowlog_threshold_ms=args.slowlog_threshold_ms, slowlog_size=args.slowlog_size,
+                   users_file=args.users_file, session_ttl=args.session_ttl,
+                   search_indexes={'auto': None, 'on': True, 'off': False}[args.search_indexes],
+                   session_secret=args.session_secret.encode('utf-8') if args.session_secret else None,
+                   rate_limits=dict(user_read=args.user_read_rate, user_write=args.user_write_rate,
+                                    global_read=args.global_read_rate, global_write=args.global_write_rate))
+    if args.workers and not hasattr(socket, 'SO_REUSEPORT'):
+        sys.exit("--workers requires SO_REUSEPORT (Linux, BSD, macOS)")
+    if (args.replica_of or args.replication_port) and not args.replication_key:
+        sys.exit("--replica-of / --replication-port need --replication-key (or DICT_REPLICATION_KEY)")
+    
+    if args.replica_of:
+        from prefork import with_engine
+        from replication import ReplicaMixin, parse_address
+        server = with_engine(ReplicaMixin, args.engine)(writer_address=parse_address(args.replica_of),
+                                                        authkey=args.replication_key.encode('utf-8'),
+                                                        reuse_port=args.workers > 0, **options)
+    else:
+        server = server_class(reuse_port=args.workers > 0, **options)
+    log_options = dict(level=args.log_level, log_file=args.log_file, log_format=args.log_format,
+                       request_sample=args.request_log_sample)
+    log_writer = setup_logging(metrics=server.metrics, **log_options)
+    if args.metrics_port:
+        start_http_exporter((args.host, args.metrics_port), server.metrics_text)
+    if args.replication_port:
+        from prefork import WriterService
+        service = WriterService(server, (args.host, args.replication_port), args.replication_key.encode('utf-8'))
+        service.start()
+        server.writer_services.append(service)
+    if args.workers:
+        from prefork import WriterService, start_workers
+        service = WriterService(server)
+        service.start()
+        server.writer_services.append(service)
+        start_workers(args.workers, args.engine, options, service, log_options)
+    try:
+        server.start()
+    finally:
+        log_writer.stop()
@@ -0,0 +1,152 @@
+import collections
+import contextvars
+import cProfile
+import io
+import itertools
+import pstats
+import random
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_SLOWLOG_THRESHOLD_MS = 100
+DEFAULT_SLOWLOG_SIZE = 128
+REQUEST_PREVIEW = 200  # Số ký tự của request được giữ trong mỗi entry
+PROFILE_LINES = 30  # Số hàm in ra trong báo cáo cProfile
+
+# Trace của request đang chạy trên thread / task hiện tại (lock, journal ghi thời gian vào đây)
+current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+def add_stage(stage, seconds):
+    """Add `seconds` to `stage` of the current request, if any"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+class RequestTrace:
+    """Stage timings of one request, measured as laps from its first byte
+
+    Engine gọi lap('recv'), lap('decode')... khi xong từng giai đoạn; các giai đoạn
+    lồng trong handler (chờ lock, ghi đĩa) được cộng qua add_stage(). Chỉ lưu mốc
+    thời gian, việc tính từng giai đoạn để dành cho request thực sự chậm.
+    """
+
+    __slots__ = ('started', 'marks', 'nested', 'command', 'request', 'username')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks = []  # (giai đoạn, thời điểm kết thúc)
+        self.nested = []  # (giai đoạn lồng trong handler, số giây)
+        self.command = None
+        self.request = None
+        self.username = None
+
+    def add(self, stage, seconds):
+        self.nested.append((stage, seconds))
+
+    def lap(self, stage):
+        """Mark the end of `stage` (it started where the previous lap ended)"""
+        self.marks.append((stage, time.perf_counter()))
+
+    def stages(self):
+        """Seconds per stage; 'handler' excludes the nested stages"""
+        stages = {}
+        previous = self.started
+        for stage, at in self.marks:
+            stages[stage] = stages.get(stage, 0.0) + at - previous
+            previous = at
+        for stage, seconds in self.nested:
+            stages[stage] = stages.get(stage, 0.0) + seconds
+            if 'handler' in stages:
+                stages['handler'] -= seconds
+        return stages
+
+
+class SlowLog:
+    """Bounded log of requests slower than a threshold, plus an optional cProfile sampler
+
+    Threshold âm thì không ghi gì. Profiler chỉ bật cho một loại lệnh, với tỉ lệ
+    `sample` request của lệnh đó; kết quả các request được cộng dồn vào một pstats.
+    """
+
+    def __init__(self, threshold_ms=DEFAULT_SLOWLOG_THRESHOLD_MS, size=DEFAULT_SLOWLOG_SIZE):
+        self.threshold_ms = threshold_ms
+        self.entries = collections.deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.profile_command = None
+        self.profile_sample = 1.0
+        self._profile_stats = None
+        self._profiled = 0
+
+    def finish(self, trace):
+        """Record `trace` if the whole request took longer than the threshold"""
+        total = time.perf_counter() - trace.started
+        if self.threshold_ms < 0 or total * 1000 < self.threshold_ms:
+            return
+        entry = {
+            "id": next(self._ids),
+            "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "command": trace.command,
+            "request": (trace.request or '')[:REQUEST_PREVIEW],
+            "user": trace.username,
+            "total_ms": round(total * 1000, 3),
+            "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in trace.stages().items()},
+        }
+        with self._lock:
+            self.entries.append(entry)
+
+    def recent(self, limit=None):
+        """Newest entries first"""
+        with self._lock:
+            entries = list(self.entries)
+        entries.reverse()
+        return entries[:limit] if limit is not None else entries
+
+    def reset(self):
+        with self._lock:
+            self.entries.clear()
+
+    def start_profile(self, command, sample=1.0):
+        with self._lock:
+            self.profile_command = command
+            self.profile_sample = sample
+            self._profile_stats = None
+            self._profiled = 0
+
+    def stop_profile(self):
+        """Turn profiling off and return the report"""
+        report = self.profile_report()
+        with self._lock:
+            self.profile_command = None
+        return report
+
+    def profiler(self, command):
+        """A started cProfile.Profile when this request should be sampled, else None"""
+        if command != self.profile_command or random.random() >= self.profile_sample:
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def collect(self, profiler):
+        profiler.disable()
+        with self._lock:
+            if self._profile_stats is None:
+                self._profile_stats = pstats.Stats(profiler)
+            else:
+                self._profile_stats.add(profiler)
+            self._profiled += 1
+
+    def profile_report(self, lines=PROFILE_LINES):
+        with self._lock:
+            stats = self._profile_stats
+            header = f"command={self.profile_command} sample={self.profile_sample} requests={self._profiled}\n"
+            if stats is None:
+                return header
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats('cumulative').print_stats(lines)
+        return header + out.getvalue()
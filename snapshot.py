@@ -0,0 +1,94 @@
+import heapq
+
+from indexes import MergedIndex, SortedIndex
+
+
+class DictionarySnapshot:
+    """Immutable view of the dictionary published to readers
+
+    Reader chỉ cần đọc tham chiếu server.snapshot, không cần lock và không bao
+    giờ phải chờ writer hay I/O. Writer (APPROVE) gọi with_changes() để dựng
+    snapshot kế tiếp rồi gán đè tham chiếu (atomic trong CPython).
+
+    Để không phải sao chép cả từ điển mỗi lần duyệt, dữ liệu gồm `base` (lớn,
+    dùng chung giữa các snapshot) và `delta` (nhỏ, chứa thay đổi gần đây);
+    khi delta vượt MERGE_THRESHOLD thì gộp vào base mới. Nếu base là SSTable
+    (chỉ đọc, nằm trên đĩa) thì delta được gộp vào `overlay` thay vì base.
+
+    `version` tăng 1 sau mỗi lần thay đổi, client dùng nó để biết dữ liệu đã cũ chưa.
+    """
+
+    MERGE_THRESHOLD = 4096
+
+    def __init__(self, base, delta=None, index=None, version=0, overlay=None):
+        self.base = base
+        self.overlay = overlay or {}
+        self.delta = delta or {}
+        if index is None:
+            if isinstance(base, dict):
+                index = SortedIndex(base)
+            else:
+                index = MergedIndex(base, SortedIndex(w for w in self.overlay if w not in base))
+        self.index = index
+        self.version = version
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, word):
+        return word in self.delta or word in self.overlay or word in self.base
+
+    def get(self, word, default=None):
+        meaning = self.delta.get(word)
+        if meaning is None:
+            meaning = self.overlay.get(word)
+        if meaning is None:
+            meaning = self.base.get(word, default)
+        return meaning
+
+    def items(self, words):
+        """(word, meaning) pairs for the given words, skipping unknown ones"""
+        result = []
+        for word in words:
+            meaning = self.get(word)
+            if meaning is not None:
+                result.append((word, meaning))
+        return result
+
+    def iter_items(self):
+        """Every (word, meaning) pair in word order"""
+        if isinstance(self.base, dict):
+            for word in self.index:
+                yield word, self.get(word)
+            return
+        # Quét tuần tự SSTable rồi trộn với các thay đổi (ít) đã sắp xếp
+        changes = dict(self.overlay)
+        changes.update(self.delta)
+        added = sorted((w, m) for w, m in changes.items() if w not in self.base)
+        base_items = ((w, changes.get(w, m)) for w, m in self.base.items())
+        yield from heapq.merge(base_items, added)
+
+    def to_dict(self):
+        """Full word -> meaning dict (O(n))"""
+        if not isinstance(self.base, dict):
+            return dict(self.iter_items())
+        data = dict(self.base)
+        data.update(self.delta)
+        return data
+
+    def with_changes(self, changes, version=None):
+        """Next snapshot with `changes` (word -> meaning) applied, as `version` (default: next)"""
+        new_words = [word for word in changes if word not in self]
+        delta = dict(self.delta)
+        delta.update(changes)
+        base, overlay = self.base, self.overlay
+        if len(delta) > self.MERGE_THRESHOLD:
+            if isinstance(base, dict):
+                base = dict(base)
+                base.update(delta)
+            else:
+                overlay = dict(overlay)
+                overlay.update(delta)
+            delta = {}
+        index = self.index.inserted(new_words) if new_words else self.index
+        return DictionarySnapshot(base, delta, index, self.version + 1 if version is None else version, overlay)
@@ -0,0 +1,155 @@
+import mmap
+import os
+import struct
+
+from indexes import SortedKeys
+
+# Bố cục file .sst (mọi số nguyên little-endian):
+#   MAGIC
+#   bản ghi: [u32 độ dài key][key UTF-8][u32 độ dài nghĩa][nghĩa UTF-8], sắp xếp theo key
+#   bảng offset: n * u64, offset của từng bản ghi
+#   footer: [u64 n][u64 vị trí bảng offset]
+# Key so sánh theo byte UTF-8, cùng thứ tự với so sánh chuỗi của Python.
+SSTABLE_SUFFIX = '.sst'
+MAGIC = b'DICTSST1'
+LENGTH = struct.Struct('<I')
+OFFSET = struct.Struct('<Q')
+FOOTER = struct.Struct('<QQ')
+
+
+class SSTableError(Exception):
+    """Raised when a file is not a valid sorted string table"""
+
+
+def write_sstable(path, items):
+    """Write (word, meaning) pairs, already sorted by word, to `path` atomically"""
+    tmp_path = path + '.tmp'
+    offsets = bytearray()
+    count = 0
+    previous = None
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        position = len(MAGIC)
+        for word, meaning in items:
+            key = word.encode('utf-8')
+            if previous is not None and key <= previous:
+                raise ValueError(f"Keys must be unique and sorted (got '{word}' after '{previous.decode('utf-8')}')")
+            value = meaning.encode('utf-8')
+            record = LENGTH.pack(len(key)) + key + LENGTH.pack(len(value)) + value
+            f.write(record)
+            offsets += OFFSET.pack(position)
+            position += len(record)
+            count += 1
+            previous = key
+        f.write(offsets)
+        f.write(FOOTER.pack(count, position))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return count
+
+
+class SSTable(SortedKeys):
+    """Read-only word -> meaning table read lazily through mmap
+
+    Mở file chỉ đọc footer, không nạp gì vào bộ nhớ: tra từ là tìm nhị phân trên
+    bảng offset, chỉ những trang được chạm tới mới được OS đọc lên. Vì vậy khởi
+    động gần như tức thì và RSS chỉ bằng một phần nhỏ so với dict Python.
+    Dùng được như một index đã sắp xếp (position, iter_from, prefix, range...).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < len(MAGIC) + FOOTER.size:
+                raise SSTableError(f"{path} is too small to be a dictionary table")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise SSTableError(f"{path} is not a dictionary table")
+        self.size, self._index_start = FOOTER.unpack_from(self._mm, size - FOOTER.size)
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def _offset(self, i):
+        return OFFSET.unpack_from(self._mm, self._index_start + i * OFFSET.size)[0]
+
+    def _key_bytes(self, offset):
+        (length,) = LENGTH.unpack_from(self._mm, offset)
+        start = offset + LENGTH.size
+        return self._mm[start:start + length], start + length
+
+    def _record(self, offset):
+        """(key bytes, value bytes, offset of the next record)"""
+        key, value_pos = self._key_bytes(offset)
+        (length,) = LENGTH.unpack_from(self._mm, value_pos)
+        start = value_pos + LENGTH.size
+        return key, self._mm[start:start + length], start + length
+
+    def key_at(self, i):
+        return self._key_bytes(self._offset(i))[0].decode('utf-8')
+
+    def _bisect(self, key, after=False):
+        """First position whose key is >= key (> key when after=True)"""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = self._key_bytes(self._offset(mid))[0]
+            if probe < key or (after and probe == key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def position(self, key, after=False):
+        return self._bisect(key.encode('utf-8'), after)
+
+    def _find(self, word):
+        key = word.encode('utf-8')
+        i = self._bisect(key)
+        if i < self.size:
+            probe, value, _ = self._record(self._offset(i))
+            if probe == key:
+                return value
+        return None
+
+    def get(self, word, default=None):
+        value = self._find(word)
+        return default if value is None else value.decode('utf-8')
+
+    def __getitem__(self, word):
+        value = self._find(word)
+        if value is None:
+            raise KeyError(word)
+        return value.decode('utf-8')
+
+    def __contains__(self, word):
+        return self._find(word) is not None
+
+    def _iter_records(self, start):
+        if start >= self.size:
+            return
+        offset = self._offset(start)
+        for _ in range(self.size - start):
+            key, value, offset = self._record(offset)
+            yield key, value
+
+    def iter_from(self, start):
+        """Iterate keys from position `start` (sequential scan, no index lookups)"""
+        for key, _ in self._iter_records(start):
+            yield key.decode('utf-8')
+
+    def items(self):
+        """(word, meaning) pairs in word order"""
+        for key, value in self._iter_records(0):
+            yield key.decode('utf-8'), value.decode('utf-8')
@@ -0,0 +1,87 @@
+"""Tests for the asyncio engine (same protocol as the threads engine)"""
+import asyncio
+import contextlib
+import io
+import socket
+import threading
+import unittest
+
+from async_server import AsyncDictionaryServer
+from testsupport import ServerTestCase
+
+
+class AsyncServerTestCase(ServerTestCase):
+    def start_async_server(self, **options):
+        """Run an AsyncDictionaryServer on a free port in a background event loop, return the port"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            server = AsyncDictionaryServer(
+                dict_file=self.path('dictionary.json'), pending_file=self.path('pending.json'),
+                journal_file=self.path('journal.log'), users_file=self.path('users.json'),
+                session_key_file=self.path('session.key'), **options)
+        server.indexes_ready.wait(5)
+        started = threading.Event()
+        state = {}
+
+        async def serve():
+            listener = await asyncio.start_server(server._on_connect, 'localhost', 0)
+            state['port'] = listener.sockets[0].getsockname()[1]
+            state['stop'] = asyncio.Event()
+            state['loop'] = asyncio.get_running_loop()
+            started.set()
+            await state['stop'].wait()
+            await server._graceful_stop(listener)
+
+        thread = threading.Thread(target=asyncio.run, args=(serve(),), daemon=True)
+        thread.start()
+        self.assertTrue(started.wait(5))
+
+        def stop():
+            state['loop'].call_soon_threadsafe(state['stop'].set)
+            thread.join(10)
+            self.shutdown(server)
+
+        self.addCleanup(stop)
+        return server, state['port']
+
+
+class AsyncServerTest(AsyncServerTestCase):
+    def test_text_protocol(self):
+        _, port = self.start_async_server()
+        with socket.create_connection(('localhost', port), timeout=5) as sock:
+            self.assertTrue(sock.recv(1024).startswith(b'WELCOME'))
+            sock.sendall(b'LOGIN|user1|user123')
+            self.assertTrue(sock.recv(1024).startswith(b'SUCCESS|user'))
+            sock.sendall(b'TRA|hello')
+            self.assertEqual(sock.recv(1024), 'SUCCESS|hello: xin chào'.encode('utf-8'))
+            sock.sendall(b'QUIT')
+            self.assertTrue(sock.recv(1024).startswith(b'SUCCESS'))
+
+    def test_framed_pipeline_and_writes(self):
+        server, port = self.start_async_server()
+        client = self.connect(port)
+        self.assertTrue(client.framed)
+        replies = client.pipeline(["TRA|hello", "TRA|helo", "THEM|zebra:ngựa vằn", "TRA|world"], timeout=5)
+        self.assertEqual(replies[0], "SUCCESS|hello: xin chào")
+        # TRA không thấy từ chạy trong executor (tìm gợi ý) nhưng vẫn trả đúng thứ tự theo id
+        self.assertEqual(replies[1], "NOTFOUND|Word 'helo' not found in dictionary|hello")
+        self.assertTrue(replies[2].startswith('SUCCESS'), replies[2])
+        self.assertEqual(replies[3], "SUCCESS|world: thế giới")
+
+        admin = self.connect(port, 'admin', 'admin123')
+        request_id = replies[2].rpartition('\nID: ')[2]
+        self.assertTrue(admin.request(f"APPROVE|{request_id}", timeout=5).startswith('SUCCESS'))
+        self.assertEqual(client.request("TRA|zebra", timeout=5), "SUCCESS|zebra: ngựa vằn")
+        stream = list(client.stream("LIST|stream|chunk=2", timeout=5))
+        self.assertTrue(stream[-1].split('|', 1)[0].endswith('_END'), stream[-1])
+
+    def test_idle_connection_closed(self):
+        _, port = self.start_async_server(idle_timeout=0.3)
+        client = self.connect(port)
+        closed = threading.Event()
+        client.on_close = closed.set
+        self.assertTrue(closed.wait(5))
+        self.assertTrue(client.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Tests for password hashing and signed session tokens (LOGIN / RESUME)"""
+import json
+import unittest
+from unittest import mock
+
+import auth
+from auth import SessionTokens, b64decode, b64encode, hash_password, verify_password
+from testsupport import ServerTestCase
+
+
+class PasswordTest(unittest.TestCase):
+    def test_hash_and_verify(self):
+        stored = hash_password('user123', iterations=1000)
+        self.assertTrue(verify_password('user123', stored))
+        self.assertFalse(verify_password('user124', stored))
+        self.assertNotEqual(stored, hash_password('user123', iterations=1000))  # Salt ngẫu nhiên
+        self.assertFalse(verify_password('user123', 'plain-text'))
+        self.assertFalse(verify_password('user123', 'md5$1$a$b'))
+
+
+class SessionTokenTest(unittest.TestCase):
+    def setUp(self):
+        self.tokens = SessionTokens(b'secret', ttl=60)
+
+    def test_verify(self):
+        self.assertEqual(self.tokens.verify(self.tokens.issue('user1', 'user')), ('user1', 'user'))
+
+    def test_expired(self):
+        token = self.tokens.issue('user1', 'user')
+        with mock.patch.object(auth.time, 'time', return_value=auth.time.time() + 61):
+            self.assertIsNone(self.tokens.verify(token))
+
+    def test_tampered(self):
+        token = self.tokens.issue('user1', 'user')
+        payload, _, signature = token.partition('.')
+        # Tự nâng quyền: sửa role trong payload nhưng giữ chữ ký cũ
+        data = json.loads(b64decode(payload))
+        data['r'] = 'admin'
+        forged = b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        self.assertIsNone(self.tokens.verify(f"{forged}.{signature}"))
+        flipped = signature[:-1] + ('B' if signature.endswith('A') else 'A')
+        self.assertIsNone(self.tokens.verify(f"{payload}.{flipped}"))
+        self.assertIsNone(SessionTokens(b'other secret').verify(token))
+        for garbage in ('', '.', 'abc', 'abc.def', 'ngựa.vằn', token + '.x'):
+            self.assertIsNone(self.tokens.verify(garbage), garbage)
+
+
+class ResumeTest(ServerTestCase):
+    def test_resume_with_login_token(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        response, username, role, framed = server.handshake('LOGIN|user1|user123|FRAMED')
+        self.assertEqual((username, role, framed), ('user1', 'user', True))
+        token = response.rpartition('|')[2]
+        response, username, role, framed = server.handshake(f'RESUME|{token}|FRAMED')
+        self.assertTrue(response.startswith('SUCCESS|user'), response)
+        self.assertEqual((username, role, framed), ('user1', 'user', True))
+        self.assertEqual(server.handshake('RESUME|not-a-token'),
+                         ("ERROR|Invalid or expired session", None, None, False))
+        self.assertEqual(server.handshake('LOGIN|user1|wrong')[1:], (None, None, False))
+
+
+if __name__ == '__main__':
+    unittest.main()
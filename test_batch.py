@@ -0,0 +1,64 @@
+"""Tests for APPROVE_BATCH / REJECT_BATCH
+
+Chạy: python -m unittest (hoặc python -m pytest) trong thư mục gốc.
+"""
+import json
+import unittest
+
+from testsupport import ServerTestCase
+
+
+class BatchCommandTest(ServerTestCase):
+    def result(self, response):
+        header, _, body = response.partition('|')
+        self.assertEqual(header, 'BATCH_RESULT', response)
+        return json.loads(body)
+
+    def test_approve_batch_is_one_version_and_one_record(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        ids = [self.submit(server, f"THEM|word{i}:nghĩa {i}") for i in range(3)]
+        entries = server.journal.entries
+        data = self.result(self.admin(server, f"APPROVE_BATCH|ids={','.join(ids)},404"))
+        self.assertEqual((data['approved'], data['not_found']), (3, 1))
+        self.assertEqual({r['id']: r['status'] for r in data['results']},
+                         dict({i: 'approved' for i in ids}, **{'404': 'not_found'}))
+        self.assertEqual(server.snapshot.version, 1)
+        self.assertEqual(server.journal.entries, entries + 1)
+        self.assertEqual(len(server.pending), 0)
+
+    def test_reject_batch_by_filter(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        self.submit(server, "THEM|zebra:ngựa vằn", 'user1')
+        self.submit(server, "THEM|yak:bò Tây Tạng", 'user1')
+        kept = self.submit(server, "THEM|ant:con kiến", 'user2')
+        data = self.result(self.admin(server, "REJECT_BATCH|user=user1"))
+        self.assertEqual(data['rejected'], 2)
+        self.assertEqual(list(server.pending), [kept])
+        self.assertEqual(server.snapshot.version, 0)
+
+    def test_admin_only_and_needs_a_selection(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        self.assertEqual(server.process_request("APPROVE_BATCH|ids=1", 'user', 'user1'),
+                         "ERROR|Access denied. Admin only")
+        self.assertTrue(self.admin(server, "APPROVE_BATCH").startswith('ERROR|'))
+
+    def test_batch_replayed_after_restart(self):
+        server = self.start_server()
+        ids = [self.submit(server, f"THEM|word{i}:nghĩa {i}") for i in range(2)]
+        rejected = self.submit(server, "THEM|typo:sai chính tả")
+        self.admin(server, f"APPROVE_BATCH|ids={','.join(ids)}")
+        self.admin(server, f"REJECT_BATCH|ids={rejected}")
+        self.crash(server)
+
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        self.assertEqual(self.lookup(server, 'word1'), "SUCCESS|word1: nghĩa 1")
+        self.assertEqual(server.snapshot.version, 1)
+        self.assertEqual(len(server.pending), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
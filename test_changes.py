@@ -0,0 +1,67 @@
+"""Tests for the CHANGES command and the bounded change log
+
+Chạy: python -m unittest (hoặc python -m pytest) trong thư mục gốc.
+"""
+import json
+import unittest
+from unittest import mock
+
+import server_auth
+from testsupport import ServerTestCase
+
+
+class ChangesTest(ServerTestCase):
+    def approve(self, server, word, meaning):
+        self.admin(server, f"APPROVE|{self.submit(server, f'THEM|{word}:{meaning}')}")
+
+    def test_changes_since_version(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        self.approve(server, 'zebra', 'ngựa vằn')
+        self.approve(server, 'yak', 'bò Tây Tạng')
+        header, _, body = server.process_request("CHANGES|1", 'user', 'user1').partition('|')
+        self.assertEqual(header, 'CHANGES_DATA')
+        data = json.loads(body)
+        self.assertEqual(data['version'], 2)
+        self.assertEqual([c['word'] for c in data['changes']], ['yak'])
+
+    def test_resync_below_the_floor(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        with mock.patch.object(server_auth, 'CHANGE_LOG_SIZE', 2):
+            for i in range(4):
+                self.approve(server, f"word{i}", f"nghĩa {i}")
+        self.assertEqual(server._changes_floor, 2)
+        self.assertEqual(server.process_request("CHANGES|1", 'user', 'user1'), "RESYNC|4")
+        data = json.loads(server.process_request("CHANGES|2", 'user', 'user1').partition('|')[2])
+        self.assertEqual([c['word'] for c in data['changes']], ['word2', 'word3'])
+
+    def test_floor_survives_restart(self):
+        server = self.start_server()
+        self.approve(server, 'zebra', 'ngựa vằn')
+        server.compact()
+        self.approve(server, 'yak', 'bò Tây Tạng')
+        self.crash(server)
+
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        # Thay đổi trước lần compact không còn trong log: client ở version 0 phải tải lại
+        self.assertEqual(server.process_request("CHANGES|0", 'user', 'user1'), "RESYNC|2")
+        data = json.loads(server.process_request("CHANGES|1", 'user', 'user1').partition('|')[2])
+        self.assertEqual([c['word'] for c in data['changes']], ['yak'])
+
+    def test_word_changed_twice_sent_once(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        self.approve(server, 'zebra', 'ngựa vằn')
+        self.approve(server, 'yak', 'bò Tây Tạng')
+        self.admin(server, f"APPROVE|{self.submit(server, 'SUA|zebra:con ngựa vằn')}")
+        data = json.loads(server.process_request("CHANGES|0", 'user', 'user1').partition('|')[2])
+        self.assertEqual(data['changes'], [{"word": "zebra", "meaning": "con ngựa vằn", "op": "add"},
+                                           {"word": "yak", "meaning": "bò Tây Tạng", "op": "add"}])
+        self.assertEqual(server.process_request("CHANGES|3", 'user', 'user1'),
+                         'CHANGES_DATA|{"version": 3, "changes": []}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Tests for event subscriptions: coalescing for slow subscribers and delivery over FRAMED"""
+import json
+import queue
+import unittest
+
+from events import RESYNC_EVENT, EventBus, Subscription
+from testsupport import ServerTestCase
+
+
+class SubscriptionTest(unittest.TestCase):
+    def test_wakes_once_and_coalesces_same_key(self):
+        wakeups = []
+        subscription = Subscription(['dict'], lambda: wakeups.append(1))
+        subscription.push('dict', 'zebra', 'v1')
+        subscription.push('dict', 'yak', 'v2')
+        subscription.push('dict', 'zebra', 'v3')
+        self.assertEqual(len(wakeups), 1)
+        self.assertEqual(subscription.drain(), ['v2', 'v3'])
+        self.assertEqual(subscription.coalesced, 1)
+        subscription.push('dict', 'zebra', 'v4')
+        self.assertEqual(len(wakeups), 2)
+
+    def test_overflow_becomes_resync(self):
+        subscription = Subscription(['dict'], lambda: None, max_events=3)
+        for i in range(5):
+            subscription.push('dict', str(i), f'v{i}')
+        self.assertEqual(subscription.drain(), [RESYNC_EVENT, 'v4'])
+        self.assertEqual(subscription.drain(), [])
+
+    def test_bus_filters_by_topic(self):
+        bus = EventBus()
+        pending, words = Subscription(['pending'], lambda: None), Subscription(['dict'], lambda: None)
+        bus.subscribe(pending)
+        bus.subscribe(words)
+        bus.publish('dict', 'zebra', 'EVENT|dict|{}')
+        bus.unsubscribe(words)
+        bus.publish('dict', 'yak', 'EVENT|dict|{}')
+        self.assertEqual((pending.drain(), words.drain()), ([], ['EVENT|dict|{}']))
+
+
+class SubscribeTest(ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = self.start_server()
+        self.addCleanup(self.shutdown, self.server)
+        self.port = self.listen(self.server)
+
+    def subscribe(self, username, password, topics):
+        client = self.connect(self.port, username, password)
+        events = queue.Queue()
+        client.on_push = events.put
+        return client, events, client.request(f"SUBSCRIBE|{topics}", timeout=5)
+
+    def next_event(self, events):
+        topic, _, body = events.get(timeout=5).partition('|')[2].partition('|')
+        return topic, json.loads(body)
+
+    def test_pending_and_dict_events(self):
+        _, events, response = self.subscribe('admin', 'admin123', 'pending,dict')
+        self.assertEqual(response, "SUBSCRIBED|pending,dict")
+        request_id = self.submit(self.server, "THEM|zebra:ngựa vằn")
+        topic, event = self.next_event(events)
+        self.assertEqual((topic, event['op'], event['item']['word']), ('pending', 'added', 'zebra'))
+        self.admin(self.server, f"APPROVE|{request_id}")
+        received = dict(self.next_event(events) for _ in range(2))
+        self.assertEqual(received['dict'], {"op": "add", "word": "zebra", "meaning": "ngựa vằn", "version": 1})
+
+    def test_user_cannot_watch_pending_queue(self):
+        client, events, response = self.subscribe('user1', 'user123', 'pending')
+        self.assertEqual(response, "ERROR|Access denied. Admin only")
+        self.assertEqual(client.request("SUBSCRIBE|dict", timeout=5), "SUBSCRIBED|dict")
+        self.assertEqual(client.request("UNSUBSCRIBE", timeout=5), "UNSUBSCRIBED")
+        self.admin(self.server, f"APPROVE|{self.submit(self.server, 'THEM|zebra:ngựa vằn')}")
+        self.assertEqual(client.request("TRA|zebra", timeout=5), "SUCCESS|zebra: ngựa vằn")
+        self.assertTrue(events.empty())
+
+
+if __name__ == '__main__':
+    unittest.main()
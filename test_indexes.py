@@ -0,0 +1,139 @@
+"""Tests for the sorted key indexes and the fuzzy / meaning search indexes"""
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from indexes import FuzzyIndex, InvertedIndex, MergedIndex, SortedIndex
+from sstable import SSTable, write_sstable
+from testsupport import ServerTestCase
+
+
+class SortedIndexTest(unittest.TestCase):
+    def test_inserted_is_copy_on_write(self):
+        rng = random.Random(1)
+        keys = sorted({f"w{rng.randrange(10 ** 6)}" for _ in range(3000)})
+        index = SortedIndex(keys[::2])
+        extra = keys[1::2]
+        grown = index.inserted(extra)
+        self.assertEqual(list(grown), keys)
+        self.assertEqual(list(index), keys[::2])
+        self.assertTrue(all(len(chunk) <= 2 * SortedIndex.CHUNK_SIZE for chunk in grown.chunks))
+        for i in (0, 1, 511, 512, 1500, len(keys) - 1):
+            self.assertEqual(grown.key_at(i), keys[i])
+            self.assertEqual(grown.position(keys[i]), i)
+            self.assertEqual(grown.position_after(keys[i]), i + 1)
+
+    def test_prefix_and_range(self):
+        index = SortedIndex(['apple', 'apply', 'banana', 'band', 'cat'])
+        self.assertEqual(index.prefix('app', 10), ['apple', 'apply'])
+        self.assertEqual(index.prefix('ban', 1), ['banana'])
+        self.assertEqual(index.range('apply', 'band', 10), ['apply', 'banana', 'band'])
+        self.assertEqual(index.range('', 'b', 10), ['apple', 'apply'])
+
+
+class MergedIndexTest(unittest.TestCase):
+    def check(self, base_keys, extra_keys, base=None):
+        merged = MergedIndex(base or SortedIndex(base_keys), SortedIndex(extra_keys))
+        expected = sorted(base_keys + extra_keys)
+        self.assertEqual(len(merged), len(expected))
+        for start in range(len(expected) + 1):
+            # _split phải chia đúng số key lấy từ base / extra tại mọi vị trí
+            self.assertEqual(list(merged.iter_from(start)), expected[start:], start)
+        for i, key in enumerate(expected):
+            self.assertEqual(merged.position(key), i)
+            self.assertEqual(merged.key_at(i), key)
+
+    def test_interleaved(self):
+        self.check(['b', 'd', 'f', 'h'], ['a', 'c', 'e', 'g', 'i'])
+
+    def test_extra_all_before_or_after(self):
+        self.check(['m', 'n', 'o'], ['a', 'b'])
+        self.check(['a', 'b'], ['x', 'y', 'z'])
+
+    def test_empty_sides(self):
+        self.check([], ['a', 'b'])
+        self.check(['a', 'b'], [])
+
+    def test_random_against_sstable(self):
+        rng = random.Random(7)
+        keys = sorted({f"{rng.randrange(10 ** 5):05d}" for _ in range(400)})
+        rng.shuffle(keys)
+        base_keys, extra_keys = sorted(keys[:300]), sorted(keys[300:])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'words.sst')
+            write_sstable(path, [(k, k) for k in base_keys])
+            table = SSTable(path)
+            try:
+                self.check(base_keys, extra_keys, base=table)
+            finally:
+                table.close()
+
+    def test_inserted_ignores_keys_in_base(self):
+        merged = MergedIndex(SortedIndex(['a', 'c'])).inserted(['b', 'c'])
+        self.assertEqual(list(merged), ['a', 'b', 'c'])
+
+
+class FuzzyIndexTest(unittest.TestCase):
+    def test_suggestions_nearest_first(self):
+        index = FuzzyIndex(['hello', 'help', 'world', 'word', 'python'])
+        self.assertEqual(index.search('helo', 2, 5), ['hello', 'help'])
+        self.assertEqual(index.search('wrold', 2, 5), ['world'])  # Đảo chỗ: 2 lỗi
+        self.assertEqual(index.search('java', 1, 5), [])
+        index.add('hello')
+        self.assertEqual(len(index), 5)
+
+
+class InvertedIndexTest(unittest.TestCase):
+    def test_search_without_diacritics_and_reindex(self):
+        index = InvertedIndex([('computer', 'máy tính'), ('calculator', 'máy tính bỏ túi'), ('dog', 'con chó')])
+        self.assertEqual([w for w, _ in index.search('may tinh', 5)], ['computer', 'calculator'])
+        index.set('dog', 'chó nhà')
+        self.assertEqual(index.search('con', 5), [])
+        self.assertEqual([w for w, _ in index.search('cho', 5)], ['dog'])
+
+
+class PrefixRangeCommandTest(ServerTestCase):
+    def test_prefix_and_range_see_approved_words(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        self.admin(server, f"APPROVE|{self.submit(server, 'THEM|help:giúp đỡ')}")
+        self.assertEqual(server.process_request("PREFIX|hel|1", 'user', 'user1'),
+                         'PREFIX_DATA|[{"word": "hello", "meaning": "xin chào"}]')
+        self.assertEqual(server.process_request("RANGE|hello|network", 'user', 'user1'),
+                         'RANGE_DATA|[{"word": "hello", "meaning": "xin chào"}, {"word": "help", "meaning": "giúp đỡ"}, '
+                         '{"word": "network", "meaning": "mạng máy tính"}]')
+
+
+class SuggestTest(ServerTestCase):
+    def test_lookup_suggests_near_words(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        self.assertEqual(self.lookup(server, 'helo'), "NOTFOUND|Word 'helo' not found in dictionary|hello")
+
+    def test_no_suggestions_for_overlong_word(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        word = 'a' * 5000
+        self.assertEqual(server.suggest(word), [])
+        self.assertEqual(self.lookup(server, word), f"NOTFOUND|Word '{word}' not found in dictionary")
+
+
+class ReverseSearchTest(ServerTestCase):
+    def test_tim_finds_approved_meaning(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        self.admin(server, f"APPROVE|{self.submit(server, 'THEM|laptop:máy tính xách tay')}")
+        header, _, body = server.process_request("TIM|may tinh xach tay", 'user', 'user1').partition('|')
+        self.assertEqual(header, 'TIM_DATA')
+        self.assertEqual(json.loads(body)[0]['word'], 'laptop')
+
+    def test_tim_disabled_without_indexes(self):
+        server = self.start_server(search_indexes=False)
+        self.addCleanup(self.shutdown, server)
+        self.assertTrue(server.process_request("TIM|may tinh", 'user', 'user1').startswith('ERROR|'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""Tests for the journal: replay, rotation after a failed compaction, write errors
+
+Chạy: python -m unittest (hoặc python -m pytest) trong thư mục gốc.
+"""
+import errno
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import journal
+from journal import CHECKPOINT_OP, Journal, JournalWriteError
+
+
+class JournalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'journal.log')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open_journal(self, policy='always'):
+        j = Journal(self.path, policy, 0.01)
+        self.addCleanup(j.close)
+        return j
+
+    def replay_all(self):
+        """Every record a restarted server would replay"""
+        j = Journal(self.path)
+        records = list(j.replay())
+        j.close()
+        return records
+
+
+class ReplayTest(JournalTestCase):
+    def test_replays_records_in_order(self):
+        j = self.open_journal()
+        for i in range(3):
+            j.wait(j.append({'op': 'submit', 'id': str(i)}))
+        j.close()
+        self.assertEqual([r['id'] for r in self.replay_all()], ['0', '1', '2'])
+
+    def test_skips_torn_last_line(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"op":"submit","id":"1"}\n{"op":"approve","id"')
+        j = self.open_journal()
+        self.assertEqual(list(j.replay()), [{'op': 'submit', 'id': '1'}])
+
+    def test_checkpoint_not_counted_as_entry(self):
+        j = self.open_journal()
+        j.wait(j.append({'op': 'submit', 'id': '1'}))
+        j.rotate(checkpoint={'version': 4, 'next_pending_id': 2})
+        j.wait(j.append({'op': 'reject', 'id': '1'}))
+        j.close()
+        replayed = Journal(self.path)
+        records = list(replayed.replay())
+        replayed.close()
+        self.assertEqual([r['op'] for r in records], ['submit', CHECKPOINT_OP, 'reject'])
+        self.assertEqual(replayed.entries, 1)
+
+
+class RotateTest(JournalTestCase):
+    def test_rotate_after_failed_compaction_keeps_both_segments(self):
+        # Compact thất bại: segment cũ (.1) còn đó, lần rotate sau phải nối vào chứ không ghi đè
+        j = self.open_journal()
+        j.wait(j.append({'op': 'submit', 'id': '1'}))
+        j.rotate()
+        j.wait(j.append({'op': 'submit', 'id': '2'}))
+        j.rotate()
+        j.wait(j.append({'op': 'submit', 'id': '3'}))
+        j.close()
+        self.assertTrue(os.path.exists(j.rotated_path))
+        self.assertEqual([r['id'] for r in self.replay_all()], ['1', '2', '3'])
+
+    def test_discard_rotated(self):
+        j = self.open_journal()
+        j.wait(j.append({'op': 'submit', 'id': '1'}))
+        j.rotate()
+        j.discard_rotated()
+        self.assertFalse(os.path.exists(j.rotated_path))
+        self.assertEqual(j.entries, 0)
+
+
+class WriteErrorTest(JournalTestCase):
+    def failing_fsync(self):
+        """Patch fsync to fail with ENOSPC while the returned event is set"""
+        real_fsync = os.fsync
+        failing = threading.Event()
+        failing.set()
+
+        def fsync(fd):
+            if failing.is_set():
+                raise OSError(errno.ENOSPC, 'No space left on device')
+            return real_fsync(fd)
+
+        patcher = mock.patch.object(journal.os, 'fsync', fsync)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return failing
+
+    def test_wait_raises_and_record_is_retried(self):
+        failing = self.failing_fsync()
+        with mock.patch.object(journal, 'RETRY_DELAY', 0.01), mock.patch.object(journal, 'server_log'):
+            j = self.open_journal()
+            ticket = j.append({'op': 'submit', 'id': '1'})
+            with self.assertRaises(JournalWriteError):
+                j.wait(ticket)
+            failing.clear()
+            j.flush()
+            j.wait(ticket)
+        j.close()
+        # Có thể có dòng lặp lại (ghi được nhưng fsync lỗi); replay áp dụng lại vô hại
+        self.assertEqual({r['id'] for r in self.replay_all()}, {'1'})
+
+    def test_persistent_error_logged_once_per_interval(self):
+        failing = self.failing_fsync()
+        with mock.patch.object(journal, 'RETRY_DELAY', 0.01), mock.patch.object(journal, 'server_log') as log:
+            j = self.open_journal()
+            ticket = j.append({'op': 'submit', 'id': '1'})
+            time.sleep(0.3)  # Hàng chục lần thử lại
+            failing.clear()
+            # Thread nền tự ghi lại được thì báo đã hồi phục
+            while log.info.call_count == 0:
+                time.sleep(0.01)
+            j.wait(ticket)
+            j.close()
+        self.assertEqual(log.error.call_count, 1)
+        log.info.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+"""Tests for LIST pagination (offset / cursor) and streaming
+
+Chạy: python -m unittest (hoặc python -m pytest) trong thư mục gốc.
+"""
+import json
+import unittest
+
+from testsupport import ServerTestCase
+
+
+class ListOptionsTest(ServerTestCase):
+    def test_cursor_pages_and_validation(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        first = json.loads(server.process_request("LIST|limit=2", 'user', 'user1').partition('|')[2])
+        second = json.loads(server.process_request(f"LIST|cursor={first['next_cursor']}|limit=2", 'user', 'user1')
+                            .partition('|')[2])
+        words = [i['word'] for i in first['items'] + second['items']]
+        self.assertEqual(words, sorted(words))
+        self.assertEqual(len(set(words)), 4)
+        self.assertEqual(server.process_request("LIST|cursor=%%%", 'user', 'user1'),
+                         "ERROR|Invalid LIST options: Invalid cursor")
+        self.assertEqual(server.process_request("LIST|limt=5", 'user', 'user1'),
+                         "ERROR|Invalid LIST options: Unknown option 'limt'")
+
+    def test_offset_page(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        page = json.loads(server.process_request("LIST|offset=4|limit=2", 'user', 'user1').partition('|')[2])
+        self.assertEqual([i['word'] for i in page['items']], ['world'])
+        self.assertEqual((page['total'], page['next_cursor']), (5, None))
+
+    def test_stream_chunks(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        messages = list(server.process_request("LIST|stream|chunk=2", 'user', 'user1'))
+        self.assertEqual([m.partition('|')[0] for m in messages], ['LIST_CHUNK'] * 3 + ['LIST_END'])
+        words = [i['word'] for m in messages[:-1] for i in json.loads(m.partition('|')[2])]
+        self.assertEqual(words, ['computer', 'hello', 'network', 'python', 'world'])
+        self.assertEqual(server.process_request("LIST|stream|limit=2", 'user', 'user1'),
+                         "ERROR|Invalid LIST options: Unknown option 'limit'")
+
+
+if __name__ == '__main__':
+    unittest.main()
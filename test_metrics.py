@@ -0,0 +1,40 @@
+"""Tests for the latency histograms and the Prometheus exposition"""
+import unittest
+
+from metrics import Histogram, Metrics
+
+
+class HistogramTest(unittest.TestCase):
+    def test_percentiles_within_bucket(self):
+        histogram = Histogram()
+        for _ in range(99):
+            histogram.observe(0.001)
+        histogram.observe(0.5)
+        self.assertEqual(histogram.count, 100)
+        self.assertLessEqual(histogram.percentile(50), 0.001)
+        self.assertGreater(histogram.percentile(100), 0.2)
+        self.assertEqual(histogram.summary()['max_ms'], 500.0)
+
+
+class CommandLabelTest(unittest.TestCase):
+    def test_unknown_commands_share_one_label(self):
+        metrics = Metrics({'TRA'})
+        metrics.observe_command('TRA', 0.001)
+        for i in range(100):
+            metrics.observe_command(f'JUNK{i}', 0.001, error=True)
+        self.assertEqual(sorted(metrics.snapshot()['commands']), ['OTHER', 'TRA'])
+        self.assertEqual(metrics.snapshot()['commands']['OTHER']['errors'], 100)
+
+    def test_label_values_escaped(self):
+        metrics = Metrics({'TRA'})
+        metrics.observe_command('X"} 1\nfake_metric{a="', 0.001)
+        metrics.timer('save', 'a\\b"c').observe(0.001)
+        text = metrics.prometheus()
+        self.assertNotIn('fake_metric', text)
+        self.assertIn('name="a\\\\b\\"c"', text)
+        for line in text.splitlines():
+            self.assertTrue(line.startswith(('#', 'dictionary_')), line)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Tests for PendingStore ids, secondary indexes and queries"""
+import unittest
+
+from pending_store import PendingStore
+from testsupport import ServerTestCase
+
+
+def request(word, username='user1', type='add', meaning=None, timestamp='2024-05-01 10:00:00'):
+    meaning = meaning or f"nghĩa của {word}"
+    if type == 'add':
+        return {'type': 'add', 'word': word, 'meaning': meaning, 'username': username, 'timestamp': timestamp}
+    return {'type': 'update', 'word': word, 'old_meaning': 'cũ', 'new_meaning': meaning,
+            'username': username, 'timestamp': timestamp}
+
+
+class PendingStoreTest(unittest.TestCase):
+    def test_ids_are_monotonic_and_skip_loaded_ids(self):
+        store = PendingStore({'7': request('a'), 'b_1700000000': request('b')})
+        self.assertEqual(store.add(request('c')), '8')
+        store.pop('8')
+        self.assertEqual(store.add(request('d')), '9')
+
+    def test_indexes_follow_add_and_pop(self):
+        store = PendingStore()
+        first = store.add(request('apple', 'user1'))
+        second = store.add(request('apple', 'user2', 'update'))
+        store.add(request('pear', 'user2'))
+        self.assertEqual([i for i, _ in store.query(word='apple')], [first, second])
+        self.assertEqual([i for i, _ in store.query(word='apple', username='user2')], [second])
+        store.pop(first)
+        self.assertEqual([i for i, _ in store.query(word='apple')], [second])
+        store.pop(second)
+        self.assertNotIn('apple', store.indexes['word'])
+        self.assertEqual(len(store), 1)
+
+    def test_query_before_and_type(self):
+        store = PendingStore()
+        old = store.add(request('a', timestamp='2024-04-30 23:59:59'))
+        store.add(request('b', timestamp='2024-05-01 00:00:00'))
+        store.add(request('c', type='update', timestamp='2024-04-01 00:00:00'))
+        self.assertEqual([i for i, _ in store.query(type='add', before='2024-05-01')], [old])
+
+    def test_find_duplicate(self):
+        store = PendingStore()
+        request_id = store.add(request('apple', meaning='táo'))
+        self.assertEqual(store.find_duplicate(request('apple', 'user2', meaning='táo')), request_id)
+        self.assertIsNone(store.find_duplicate(request('apple', meaning='quả táo')))
+        store.pop(request_id)
+        self.assertIsNone(store.find_duplicate(request('apple', meaning='táo')))
+
+    def test_submission_key_orders_numeric_ids_as_numbers(self):
+        store = PendingStore({'w_2': request('w', timestamp='2024-01-02 00:00:00'),
+                              'w_1': request('w', timestamp='2024-01-01 00:00:00')})
+        for _ in range(10):
+            store.add(request('x'))
+        ids = list(reversed(list(store)))
+        self.assertEqual(sorted(ids, key=store.submission_key), ['w_1', 'w_2'] + [str(i) for i in range(1, 11)])
+
+
+class SubmissionOrderTest(ServerTestCase):
+    def test_newest_request_wins_across_id_lengths(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        server.pending.next_id = 9
+        older = self.submit(server, "SUA|hello:older meaning", 'user1')
+        newer = self.submit(server, "SUA|hello:newer meaning", 'user2')
+        self.assertEqual((older, newer), ('9', '10'))
+        response = self.admin(server, "APPROVE_BATCH|word=hello")
+        self.assertTrue(response.startswith('BATCH_RESULT'), response)
+        self.assertEqual(self.lookup(server, 'hello'), "SUCCESS|hello: newer meaning")
+
+    def test_legacy_ids_sort_before_numeric_ids(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        legacy = {'type': 'update', 'word': 'hello', 'old_meaning': 'xin chào', 'new_meaning': 'legacy',
+                  'username': 'user1', 'timestamp': '2024-01-01 00:00:00'}
+        server.pending.add(legacy, 'hello_1704067200')
+        numeric = self.submit(server, "SUA|hello:numeric")
+        ids = sorted([numeric, 'hello_1704067200'], key=server.pending.submission_key)
+        self.assertEqual(ids, ['hello_1704067200', numeric])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""Tests for read workers following the writer process (run here in one process)"""
+import contextlib
+import io
+import threading
+import unittest
+from unittest import mock
+
+import server_auth
+from prefork import ReadWorkerMixin, WriterService, with_engine
+from testsupport import ServerTestCase
+
+
+class QuietWorkerMixin(ReadWorkerMixin):
+    def writer_lost(self, error):
+        # Worker thật thoát cả tiến trình; ở đây thread theo dõi chỉ dừng lại (writer đóng lúc cleanup)
+        threading.Event().wait()
+
+
+class ReadWorkerTest(ServerTestCase):
+    def start_worker(self, writer, **options):
+        service = WriterService(writer)
+        service.start()
+        self.addCleanup(service.close)
+        writer.writer_services.append(service)
+        with contextlib.redirect_stdout(io.StringIO()):
+            worker = with_engine(QuietWorkerMixin, 'threads')(
+                writer_address=service.address, authkey=service.authkey, dict_file=self.path('dictionary.json'),
+                users_file=self.path('users.json'), session_key_file=self.path('session.key'), **options)
+        self.addCleanup(worker.shutdown)
+        self.assertTrue(worker.indexes_ready.wait(5))
+        return worker
+
+    def test_worker_sees_approved_word(self):
+        writer = self.start_server()
+        self.addCleanup(self.shutdown, writer)
+        worker = self.start_worker(writer)
+        request_id = worker.process_request("THEM|zebra:ngựa vằn", 'user', 'user1').rpartition('\nID: ')[2]
+        # Worker chờ snapshot của nó theo kịp version của writer rồi mới trả lời
+        self.assertTrue(worker.process_request(f"APPROVE|{request_id}", 'admin', 'admin').startswith('SUCCESS'))
+        self.assertEqual(self.lookup(worker, 'zebra'), "SUCCESS|zebra: ngựa vằn")
+
+    def test_search_indexes_off(self):
+        writer = self.start_server(search_indexes=False)
+        self.addCleanup(self.shutdown, writer)
+        with mock.patch.object(server_auth.server_log, 'error') as log_error:
+            worker = self.start_worker(writer, search_indexes=False)
+            worker.apply_changes(None, None)  # Dựng lại snapshot như khi tụt quá xa writer
+        log_error.assert_not_called()
+        self.assertIsNone(worker.fuzzy_index)
+        self.assertEqual(self.lookup(worker, 'helo'), "NOTFOUND|Word 'helo' not found in dictionary")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Tests for the FRAMED protocol: framing, pipelining, slow readers
+
+Chạy: python -m unittest (hoặc python -m pytest) trong thư mục gốc.
+"""
+import socket
+import unittest
+
+from protocol import FRAMED_FLAG, PUSH_ID, encode_frame, recv_frame, send_frame
+from testsupport import ServerTestCase
+
+
+class FramingTest(unittest.TestCase):
+    def test_frames_round_trip(self):
+        left, right = socket.socketpair()
+        self.addCleanup(left.close)
+        self.addCleanup(right.close)
+        send_frame(left, 7, "TRA|xin chào")
+        left.sendall(encode_frame(PUSH_ID, b''))
+        self.assertEqual(recv_frame(right), (7, "TRA|xin chào".encode('utf-8')))
+        self.assertEqual(recv_frame(right), (PUSH_ID, b''))
+        left.close()
+        self.assertIsNone(recv_frame(right))
+
+
+class PipelineTest(ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write_dictionary({f'word{i}': f'nghĩa {i}' for i in range(20000)})
+        self.server = self.start_server(worker_threads=2, search_indexes=False)
+        self.addCleanup(self.shutdown, self.server)
+        self.port = self.listen(self.server)
+
+    def test_replies_match_requests(self):
+        client = self.connect(self.port)
+        self.assertTrue(client.framed)
+        words = [f'word{i}' for i in range(50)] + ['missing']
+        replies = client.pipeline([f"TRA|{word}" for word in words], timeout=10)
+        self.assertEqual(replies[:50], [f"SUCCESS|word{i}: nghĩa {i}" for i in range(50)])
+        self.assertTrue(replies[-1].startswith('NOTFOUND'), replies[-1])
+
+    def test_stream_interleaves_with_requests(self):
+        client = self.connect(self.port)
+        stream = client.stream("LIST|stream|chunk=1000", timeout=10)
+        first = next(stream)
+        self.assertEqual(client.request("TRA|word1", timeout=10), "SUCCESS|word1: nghĩa 1")
+        messages = [first] + list(stream)
+        self.assertTrue(messages[-1].split('|', 1)[0].endswith('_END'), messages[-1])
+
+    def test_slow_reader_does_not_block_other_clients(self):
+        # Client gửi nhiều LIST|stream rồi không đọc: socket của nó đầy, nhưng worker pool
+        # (chỉ 2 thread) vẫn phải phục vụ client khác
+        slow = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.addCleanup(slow.close)
+        slow.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        slow.connect(('localhost', self.port))
+        slow.recv(1024)
+        slow.sendall(f"LOGIN|user1|user123|{FRAMED_FLAG}".encode('utf-8'))
+        self.assertTrue(slow.recv(1024).startswith(b'SUCCESS'))
+        for request_id in range(1, 9):
+            send_frame(slow, request_id, "LIST|stream")
+
+        client = self.connect(self.port, 'user2')
+        replies = client.pipeline([f"TRA|word{i}" for i in range(10)], timeout=5)
+        self.assertEqual(replies[0], "SUCCESS|word0: nghĩa 0")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Tests for the token-bucket rate limits"""
+import unittest
+from unittest import mock
+
+import ratelimit
+from ratelimit import AdmissionControl, RateLimiter
+from testsupport import ServerTestCase
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimitTestCase(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.clock = FakeClock()
+        patcher = mock.patch.object(ratelimit.time, 'monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class RateLimiterTest(RateLimitTestCase):
+    def test_burst_then_refill(self):
+        limiter = RateLimiter(5, burst_seconds=2)
+        self.assertEqual([limiter.take('u') for _ in range(10)], [0.0] * 10)
+        self.assertAlmostEqual(limiter.take('u'), 0.2)
+        self.clock.now += 0.2
+        self.assertEqual(limiter.take('u'), 0.0)
+        self.assertGreater(limiter.take('u'), 0)
+
+    def test_refill_is_capped_at_burst(self):
+        limiter = RateLimiter(1, burst_seconds=3)
+        self.clock.now += 3600
+        self.assertEqual([limiter.take('u') for _ in range(3)], [0.0] * 3)
+        self.assertGreater(limiter.take('u'), 0)
+
+    def test_zero_rate_is_unlimited(self):
+        limiter = RateLimiter(0)
+        self.assertEqual([limiter.take('u') for _ in range(1000)], [0.0] * 1000)
+        self.assertEqual(len(limiter), 0)
+
+    def test_keys_are_bounded(self):
+        limiter = RateLimiter(1, burst_seconds=1, max_keys=2)
+        for key in ('a', 'b', 'a', 'c'):
+            limiter.take(key)
+        # 'b' ít dùng nhất bị bỏ, quay lại thì có bucket đầy
+        self.assertEqual(len(limiter), 2)
+        self.assertEqual(limiter.take('b'), 0.0)
+        self.assertGreater(limiter.take('c'), 0)
+
+
+class AdmissionControlTest(RateLimitTestCase):
+    def test_defaults_are_unlimited(self):
+        admission = AdmissionControl()
+        self.assertFalse(admission.enabled)
+        self.assertEqual([admission.check('u', 'THEM') for _ in range(500)], [0.0] * 500)
+
+    def test_reads_and_writes_have_separate_budgets(self):
+        admission = AdmissionControl(user_write=1)
+        self.assertEqual(admission.check('u', 'THEM'), 0.0)
+        self.assertEqual(admission.check('u', 'SUA'), 0.0)
+        self.assertGreater(admission.check('u', 'APPROVE'), 0)
+        self.assertEqual(admission.check('u', 'TRA'), 0.0)
+        self.assertEqual(admission.check('other', 'THEM'), 0.0)
+
+    def test_rejected_user_does_not_spend_global_budget(self):
+        admission = AdmissionControl(user_write=1, global_write=2)
+        admission.check('noisy', 'THEM')
+        admission.check('noisy', 'THEM')
+        for _ in range(10):
+            self.assertGreater(admission.check('noisy', 'THEM'), 0)
+        self.assertEqual(admission.check('quiet', 'THEM'), 0.0)
+        self.assertEqual(admission.check('quiet', 'THEM'), 0.0)
+
+
+
+class ServerAdmissionTest(RateLimitTestCase, ServerTestCase):
+    def test_busy_reply_for_users_not_admin(self):
+        server = self.start_server(rate_limits={'user_write': 0.5})
+        self.addCleanup(self.shutdown, server)
+        request_id = self.submit(server, "THEM|zebra:ngựa vằn")
+        response = server.process_request("THEM|yak:bò Tây Tạng", 'user', 'user1')
+        self.assertTrue(response.startswith('BUSY|2.000|'), response)
+        # Người khác và lệnh đọc vẫn được phục vụ; admin không bị giới hạn
+        self.submit(server, "THEM|yak:bò Tây Tạng", 'user2')
+        self.assertEqual(self.lookup(server, 'hello'), "SUCCESS|hello: xin chào")
+        self.assertTrue(self.admin(server, f"APPROVE|{request_id}").startswith('SUCCESS'))
+        self.clock.now += 2
+        self.submit(server, "THEM|ant:con kiến")
+
+
+if __name__ == '__main__':
+    unittest.main()
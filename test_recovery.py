@@ -0,0 +1,66 @@
+"""Tests for recovery from the journal: replay, compaction, restart
+
+Chạy: python -m unittest (hoặc python -m pytest) trong thư mục gốc.
+"""
+import os
+import unittest
+from unittest import mock
+
+from testsupport import ServerTestCase
+
+
+class RecoveryTest(ServerTestCase):
+    def test_replay_after_failed_compaction(self):
+        server = self.start_server()
+        first = self.submit(server, "THEM|zebra:ngựa vằn")
+        self.admin(server, f"APPROVE|{first}")
+        second = self.submit(server, "THEM|yak:bò Tây Tạng")
+        # Ghi snapshot thất bại: journal đã xoay nhưng segment cũ phải được giữ lại
+        with mock.patch.object(server, 'save_dictionary', return_value=False):
+            server.compact()
+        self.assertTrue(os.path.exists(server.journal.rotated_path))
+        third = self.submit(server, "SUA|zebra:con ngựa vằn")
+        self.admin(server, f"APPROVE|{third}")
+        self.crash(server)
+
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        self.assertEqual(self.lookup(server, 'zebra'), "SUCCESS|zebra: con ngựa vằn")
+        self.assertEqual(list(server.pending), [second])
+        self.assertEqual(server.snapshot.version, 2)
+        # ID đã cấp không được dùng lại sau khi khởi động lại
+        self.assertGreater(int(self.submit(server, "THEM|ant:con kiến")), int(third))
+
+    def test_state_survives_compaction_and_restart(self):
+        server = self.start_server()
+        request_id = self.submit(server, "THEM|zebra:ngựa vằn")
+        self.admin(server, f"APPROVE|{request_id}")
+        server.compact()
+        self.assertFalse(os.path.exists(server.journal.rotated_path))
+        self.crash(server)
+
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        self.assertEqual(self.lookup(server, 'zebra'), "SUCCESS|zebra: ngựa vằn")
+        self.assertEqual(server.snapshot.version, 1)
+        self.assertGreater(int(self.submit(server, "THEM|ant:con kiến")), int(request_id))
+
+
+    def test_compact_skips_unchanged_files(self):
+        server = self.start_server()
+        self.addCleanup(self.shutdown, server)
+        request_id = self.submit(server, "THEM|zebra:ngựa vằn")
+        self.admin(server, f"APPROVE|{request_id}")
+        server.compact()
+        # Chỉ có yêu cầu mới: dictionary.json giữ nguyên, chỉ pending.json được ghi lại
+        self.submit(server, "THEM|yak:bò Tây Tạng")
+        with mock.patch.object(server, 'save_dictionary') as save_dictionary, \
+                mock.patch.object(server, 'save_pending', return_value=True) as save_pending:
+            server.compact()
+        save_dictionary.assert_not_called()
+        save_pending.assert_called_once()
+        self.assertFalse(os.path.exists(server.journal.rotated_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""Tests for primary / replica replication, run as local server processes
+
+Chạy: python -m unittest (hoặc python -m pytest) trong thư mục gốc.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from protocol import FramedClient
+from replication import parse_address
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server_auth.py')
+KEY = 'replication-test-key'
+SECRET = 'session-test-secret'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+
+class ReplicationTest(unittest.TestCase):
+    def start_process(self, *args):
+        """Run server_auth.py in its own temp directory (dictionary, journal, users...)"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        process = subprocess.Popen([sys.executable, SERVER, '--host', 'localhost', '--log-level', 'WARNING',
+                                    '--replication-key', KEY, '--session-secret', SECRET, *args],
+                                   cwd=directory.name, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        def stop():
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+        self.addCleanup(stop)
+        return process
+
+    def connect(self, port, username, password, timeout=20):
+        """Log in once the server accepts connections"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                client = FramedClient('localhost', port)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+        self.addCleanup(client.close)
+        response = client.login(username, password)
+        self.assertTrue(response.startswith('SUCCESS'), response)
+        return client
+
+    def wait_for(self, client, request, expected, timeout=10):
+        deadline = time.monotonic() + timeout
+        while True:
+            response = client.request(request, timeout=5)
+            if response == expected or time.monotonic() > deadline:
+                return response
+            time.sleep(0.1)
+
+    def test_replica_follows_primary_and_forwards_writes(self):
+        primary_port, replication_port, replica_port = free_port(), free_port(), free_port()
+        self.start_process('--port', str(primary_port), '--replication-port', str(replication_port))
+        primary = self.connect(primary_port, 'admin', 'admin123')
+        self.start_process('--port', str(replica_port), '--replica-of', f'localhost:{replication_port}')
+        replica = self.connect(replica_port, 'user1', 'user123')
+
+        # Lệnh ghi gửi tới replica được chuyển về primary
+        response = replica.request("THEM|zebra:ngựa vằn", timeout=10)
+        self.assertTrue(response.startswith('SUCCESS'), response)
+        request_id = response.rpartition('\nID: ')[2]
+        self.assertTrue(primary.request(f"APPROVE|{request_id}", timeout=10).startswith('SUCCESS'))
+        self.assertEqual(self.wait_for(replica, "TRA|zebra", "SUCCESS|zebra: ngựa vằn"), "SUCCESS|zebra: ngựa vằn")
+
+        status = json.loads(primary.request("REPLICATION", timeout=10).partition('|')[2])
+        self.assertEqual(status['version'], 1)
+        self.assertEqual([f['name'] for f in status['followers']], [f"replica localhost:{replica_port}"])
+
+        # Token phiên của primary dùng được ở replica (cùng --session-secret)
+        resumed = FramedClient('localhost', replica_port)
+        self.addCleanup(resumed.close)
+        self.assertTrue(resumed.resume(primary.token).startswith('SUCCESS|admin'))
+
+
+class ParseAddressTest(unittest.TestCase):
+    def test_parse_address(self):
+        self.assertEqual(parse_address('10.0.0.2:6000'), ('10.0.0.2', 6000))
+        self.assertEqual(parse_address(':6000'), ('localhost', 6000))
+        with self.assertRaises(ValueError):
+            parse_address('primary')
+
+
+if __name__ == '__main__':
+    unittest.main()
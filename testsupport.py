@@ -0,0 +1,84 @@
+"""Shared helpers for the test modules (not collected as tests itself)"""
+import contextlib
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from protocol import FramedClient
+from server_auth import DictionaryServer
+
+
+class ServerTestCase(unittest.TestCase):
+    """Runs an in-process DictionaryServer on files in a fresh temp directory"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def write_dictionary(self, words):
+        with open(self.path('dictionary.json'), 'w', encoding='utf-8') as f:
+            json.dump(words, f)
+
+    def start_server(self, **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            server = DictionaryServer(dict_file=self.path('dictionary.json'), pending_file=self.path('pending.json'),
+                                      journal_file=self.path('journal.log'), users_file=self.path('users.json'),
+                                      session_key_file=self.path('session.key'), **options)
+        server.indexes_ready.wait(5)
+        return server
+
+    def crash(self, server):
+        """Stop a server's threads without the final compaction (like a kill -9 after fsync)"""
+        server._stopping = True
+        server._compact_event.set()
+        server._compactor.join()
+        server.executor.shutdown(wait=True)
+        server.journal.close()
+
+    def shutdown(self, server):
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.shutdown()
+
+    def submit(self, server, request, username='user1'):
+        response = server.process_request(request, 'user', username)
+        self.assertTrue(response.startswith('SUCCESS'), response)
+        return response.rpartition('\nID: ')[2]
+
+    def admin(self, server, request):
+        return server.process_request(request, 'admin', 'admin')
+
+    def lookup(self, server, word):
+        return server.process_request(f"TRA|{word}", 'user', 'user1')
+
+    def listen(self, server):
+        """Accept connections for `server` on a free port (like server.start()), return the port"""
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(('localhost', 0))
+        listener.listen(16)
+
+        def accept():
+            while True:
+                try:
+                    client_socket, address = listener.accept()
+                except OSError:
+                    return
+                threading.Thread(target=server.handle_client, args=(client_socket, address), daemon=True).start()
+
+        threading.Thread(target=accept, daemon=True).start()
+        self.addCleanup(listener.close)
+        return listener.getsockname()[1]
+
+    def connect(self, port, username='user1', password='user123'):
+        """Logged-in FramedClient, closed at cleanup"""
+        client = FramedClient('localhost', port)
+        self.addCleanup(client.close)
+        response = client.login(username, password)
+        self.assertTrue(response.startswith('SUCCESS'), response)
+        return client